@@ -1,9 +1,11 @@
 import os
 import re
-import time
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+from page_archive import list_pages, read_page, save_page
+from corpus_catalog import content_hash, record_article
+from seen_urls import SeenSet, canonicalize_url
+from retry_policy import fetch, pause, record_failure
 
 def extract_and_save_articles():
     # Create directory for saving article HTML files
@@ -18,19 +20,22 @@ def extract_and_save_articles():
     # Source directory containing HTML files with article links
     html_dir = "pages"
     
-    # Track links to avoid duplicates
+    # Relative article links are resolved against the site root
+    base_url = "https://www.tarjumanulquran.org/"
+    
+    # Track links to avoid duplicates, in this run and across earlier runs
     processed_links = set()
+    downloaded = SeenSet(article_html_dir)
     
     # Process each HTML file in the source directory
-    for filename in os.listdir(html_dir):
-        if filename.endswith('.html'):
-            file_path = os.path.join(html_dir, filename)
+    for file_path in list_pages(html_dir):
+        if file_path.endswith('.html'):
+            filename = os.path.basename(file_path)
             
             print(f"Processing file: {filename}")
             
             # Read the HTML file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                html_content = file.read()
+            html_content = read_page(file_path)
             
             # Parse HTML
             soup = BeautifulSoup(html_content, 'html.parser')
@@ -40,51 +45,59 @@ def extract_and_save_articles():
             for link in soup.find_all('a', href=True):
                 href = link['href']
                 if '/articles/' in href:
-                    article_links.append(href)
+                    article_links.append(urljoin(base_url, href))
             
             print(f"Found {len(article_links)} article links in {filename}")
             
             # Process each article link
             for article_url in article_links:
-                # Skip already processed links
-                if article_url in processed_links:
+                # Skip already processed links, comparing canonical forms
+                link_key = canonicalize_url(article_url)
+                if link_key in processed_links or link_key in downloaded:
                     continue
                     
-                processed_links.add(article_url)
+                processed_links.add(link_key)
+                
+                # Create a safe filename from the URL
+                url_parts = urlparse(article_url)
+                article_slug = url_parts.path.split('/')[-1]
+                
+                if not article_slug:  # Handle trailing slash case
+                    article_slug = url_parts.path.split('/')[-2]
+                
+                # Clean the filename to ensure it's valid
+                safe_filename = re.sub(r'[\\/*?:"<>|]', '_', article_slug)
+                if not safe_filename.endswith('.html'):
+                    safe_filename += '.html'
+                article_file_path = os.path.join(article_html_dir, safe_filename)
                 
                 try:
                     print(f"Downloading: {article_url}")
                     
                     # Download the article HTML
-                    response = requests.get(article_url, headers=headers)
-                    response.raise_for_status()
-                    
-                    # Create a safe filename from the URL
-                    url_parts = urlparse(article_url)
-                    article_slug = url_parts.path.split('/')[-1]
-                    
-                    if not article_slug:  # Handle trailing slash case
-                        article_slug = url_parts.path.split('/')[-2]
-                    
-                    # Clean the filename to ensure it's valid
-                    safe_filename = re.sub(r'[\\/*?:"<>|]', '_', article_slug)
-                    if not safe_filename.endswith('.html'):
-                        safe_filename += '.html'
+                    response = fetch(article_url, headers=headers)
                     
                     # Save the article HTML
-                    article_file_path = os.path.join(article_html_dir, safe_filename)
-                    with open(article_file_path, 'w', encoding='utf-8') as file:
-                        file.write(response.text)
+                    save_page(article_file_path, response.text, url=article_url)
+                    record_article(article_url, stage="downloaded", site="tarjumanulquran.org",
+                                   listing_page=filename, blob=article_file_path,
+                                   content_hash=content_hash(response.text))
+                    downloaded.add(article_url)
                     
                     print(f"Saved: {safe_filename}")
                     
                     # Be polite to the server
-                    time.sleep(1)
+                    pause(1)
                 
                 except Exception as e:
                     print(f"Error downloading {article_url}: {e}")
+                    record_failure(article_url, e, article_file_path, headers=headers,
+                                   record=dict(stage="downloaded", site="tarjumanulquran.org",
+                                               listing_page=filename, blob=article_file_path))
     
+    downloaded.save()
     print(f"Total articles processed: {len(processed_links)}")
+    print(f"Articles downloaded so far: {len(downloaded)}")
 
 if __name__ == "__main__":
     extract_and_save_articles()
\ No newline at end of file
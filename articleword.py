@@ -1,11 +1,17 @@
 import os
-import glob
 import re
+import argparse
+from concurrent.futures import as_completed
 from bs4 import BeautifulSoup
-from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.shared import RGBColor, Pt
 from urllib.parse import unquote
+from page_archive import get_archive, list_pages, read_page
+from corpus_catalog import mark_stage
+from urdu_normalize import normalize
+from near_duplicates import content_area as find_content_area, duplicate_of
+from boilerplate import BoilerplateFilter, site_filter
+from worker_pool import get_pool, new_document
 
 # Input and output directories
 INPUT_DIR = "rasailomasail_articles"
@@ -27,24 +33,23 @@ def get_readable_filename(html_filename):
     base_name = os.path.splitext(html_filename)[0]
     
     # URL decode the filename (convert %xx sequences to characters)
-    decoded = unquote(base_name)
+    decoded = normalize(unquote(base_name))
     
     # Replace any remaining problematic chars with underscores
     safe_name = ''.join(c if c.isalnum() or c in '-_ ' else '_' for c in decoded)
     
     return safe_name + '.docx'
 
-def convert_html_to_word(html_path, word_path):
+def convert_html_to_word(html_path, word_path, boilerplate=None):
     """Convert HTML article to Word document with proper formatting"""
     # Read the HTML file
-    with open(html_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+    html_content = read_page(html_path)
     
     # Parse HTML
     soup = BeautifulSoup(html_content, 'html.parser')
     
     # Create a Word document
-    doc = Document()
+    doc = new_document()
     
     # Set RTL direction for the entire document (for Urdu text)
     for section in doc.sections:
@@ -73,11 +78,11 @@ def convert_html_to_word(html_path, word_path):
     # Extract title text
     title = ""
     if title_element:
-        title = title_element.get_text(strip=True)
+        title = normalize(title_element.get_text(strip=True))
     else:
         # Fallback: Use filename as title
         title = os.path.splitext(os.path.basename(html_path))[0]
-        title = unquote(title)  # URL decode
+        title = normalize(unquote(title))  # URL decode
     
     # Add title to document
     if title:
@@ -88,31 +93,8 @@ def convert_html_to_word(html_path, word_path):
             run.font.size = Pt(16)
         heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
     
-    # Find the main content area
-    content_area = None
-    content_selectors = [
-        ('div', {'class_': 'entry-content'}),
-        ('div', {'class_': 'post-content'}),
-        ('div', {'class_': 'article-content'}),
-        ('div', {'class_': 'content'}),
-        ('article', {}),
-        ('main', {})
-    ]
-    
-    for selector, attrs in content_selectors:
-        content_area = soup.find(selector, **attrs)
-        if content_area:
-            break
-    
-    # Fallback to body if no content area found
-    if not content_area:
-        content_area = soup.body
-        
-        # Remove unwanted elements from body
-        for unwanted in content_area.find_all(['nav', 'header', 'footer', 'aside', 
-                                              'script', 'style', 'meta', 'link', 
-                                              'form', 'iframe', 'ins']):
-            unwanted.decompose()
+    # Find the main content area, falling back to the body without navigation
+    content_area = find_content_area(soup)
     
     # Process content - first find all paragraphs and headings
     content_elements = []
@@ -121,13 +103,28 @@ def convert_html_to_word(html_path, word_path):
         content_elements = content_area.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 
                                                 'blockquote', 'ul', 'ol', 'div'], recursive=True)
     
+    # Paragraphs repeated across the site at the start or end of the article,
+    # counting only the paragraphs that are written out below
+    paragraphs = [i for i, element in enumerate(content_elements)
+                  if element.name in ['p', 'div', 'blockquote'] and element.get_text(strip=True)
+                  and not element.find_parent(['nav', 'footer', 'header'])
+                  and not (element.name == 'div' and element.find(['p', 'div'], recursive=False))]
+    repeated = set()
+    if boilerplate:
+        texts = [content_elements[i].get_text(strip=True) for i in paragraphs]
+        repeated = {paragraphs[j] for j in boilerplate.edge_boilerplate(texts)}
+    
     # Process each element
     current_paragraph = None
     
-    for element in content_elements:
+    for i, element in enumerate(content_elements):
         # Skip empty elements and navigation
         if not element.get_text(strip=True) or element.find_parent(['nav', 'footer', 'header']):
             continue
+        
+        # Skip site text around the article
+        if i in repeated:
+            continue
             
         # Process headings
         if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
@@ -137,7 +134,7 @@ def convert_html_to_word(html_path, word_path):
                 
             # Get heading level
             level = int(element.name[1])
-            heading_text = element.get_text(strip=True)
+            heading_text = normalize(element.get_text(strip=True))
             
             # Add heading
             heading = doc.add_heading(heading_text, level=min(level+1, 9))
@@ -147,7 +144,7 @@ def convert_html_to_word(html_path, word_path):
             
         # Process paragraphs
         elif element.name == 'p' or (element.name == 'div' and not element.find(['p', 'div'], recursive=False)):
-            text = element.get_text(strip=True)
+            text = normalize(element.get_text(strip=True))
             if text:
                 p = doc.add_paragraph()
                 p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
@@ -176,7 +173,7 @@ def convert_html_to_word(html_path, word_path):
                 p = doc.add_paragraph(style='List Bullet' if element.name == 'ul' else 'List Number')
                 p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
                 
-                text = li.get_text(strip=True)
+                text = normalize(li.get_text(strip=True))
                 run = p.add_run(text)
                 run.font.rtl = True
         
@@ -186,7 +183,7 @@ def convert_html_to_word(html_path, word_path):
             p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
             p.style = 'Quote' if 'Quote' in doc.styles else 'Normal'
             
-            text = element.get_text(strip=True)
+            text = normalize(element.get_text(strip=True))
             run = p.add_run(text)
             run.font.rtl = True
     
@@ -195,49 +192,93 @@ def convert_html_to_word(html_path, word_path):
     print(f"Converted {html_path} to {word_path}")
     return True
 
-def process_volume_5():
-    """Process all HTML articles in volume 5 directory"""
+def convert_article(html_file, output_dir, boilerplate=None, prefix=""):
+    """Convert one article page to Word, returning the .docx path, or None if it was skipped"""
+    # Get the filename without extension
+    base_name = os.path.basename(html_file)
+    # Create readable docx filename
+    word_filename = get_readable_filename(base_name)
+    word_path = os.path.join(output_dir, word_filename)
+    
+    # Skip articles that are near-duplicates of another copy
+    canonical = duplicate_of(html_file)
+    if canonical:
+        print(f"{prefix}Skipping {base_name}: duplicate of {canonical}")
+        return None
+    
+    print(f"{prefix}Converting: {base_name} → {word_filename}")
+    
+    # Convert HTML to Word
+    if not convert_html_to_word(html_file, word_path, boilerplate):
+        return None
+    mark_stage("converted", blob=html_file, docx_path=word_path)
+    return word_path
+
+def _convert_job(html_file, output_dir, site, prefix=""):
+    """Convert an article in a pool worker; returns the .docx path and the boilerplate it dropped"""
+    boilerplate = site_filter(site)
+    paragraphs, chars = boilerplate.removed()
+    word_path = convert_article(html_file, output_dir, boilerplate, prefix)
+    removed_paragraphs, removed_chars = boilerplate.removed()
+    return word_path, removed_paragraphs - paragraphs, removed_chars - chars
+
+def process_volume_5(workers=None):
+    """Process all HTML articles in volume 5 directory, on the shared worker pool if workers is given"""
     volume_num = 5
     input_dir = os.path.join(INPUT_DIR, f"volume_{volume_num:02d}")
     output_dir = os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}")
     
     print(f"\nProcessing Volume {volume_num}...")
     
-    if not os.path.exists(input_dir):
+    if not os.path.exists(input_dir) and not get_archive(input_dir).exists():
         print(f"Input directory {input_dir} not found. Skipping.")
         return
     
     # Get all HTML files in the volume directory
-    html_files = glob.glob(os.path.join(input_dir, '*.html'))
+    html_files = list_pages(input_dir)
     
     print(f"Found {len(html_files)} HTML articles to convert")
     
+    # Paragraphs repeated across the site are left out
+    boilerplate = BoilerplateFilter("rasailomasail.net")
+    
     # Process each HTML file
     successful = 0
-    for i, html_file in enumerate(html_files, 1):
-        # Get the filename without extension
-        base_name = os.path.basename(html_file)
-        # Create readable docx filename
-        word_filename = get_readable_filename(base_name)
-        word_path = os.path.join(output_dir, word_filename)
-        
-        print(f"[{i}/{len(html_files)}] Converting: {base_name} → {word_filename}")
-        
-        # Convert HTML to Word
-        if convert_html_to_word(html_file, word_path):
-            successful += 1
+    if workers:
+        executor = get_pool(workers)
+        futures = {executor.submit(_convert_job, html_file, output_dir, boilerplate.site,
+                                   f"[{i}/{len(html_files)}] "): html_file
+                   for i, html_file in enumerate(html_files, 1)}
+        for future in as_completed(futures):
+            try:
+                word_path, paragraphs, chars = future.result()
+            except Exception as e:
+                print(f"Error converting {futures[future]}: {e}")
+                continue
+            boilerplate.add_removed(paragraphs, chars)
+            if word_path:
+                successful += 1
+    else:
+        for i, html_file in enumerate(html_files, 1):
+            if convert_article(html_file, output_dir, boilerplate, f"[{i}/{len(html_files)}] "):
+                successful += 1
     
     print(f"Volume {volume_num} conversion completed: {successful}/{len(html_files)} articles converted successfully")
+    boilerplate.report()
 
 def main():
     """Main function to convert volume 5 HTML articles to Word documents"""
+    parser = argparse.ArgumentParser(description="Convert Rasail-o-Masail volume 5 articles to Word")
+    parser.add_argument("--workers", type=int, help="convert on the shared worker pool with this many processes")
+    args = parser.parse_args()
+    
     print("Starting HTML article to Word conversion for Volume 5...")
     
     # Create output directory for volume 5
     create_output_dirs()
     
     # Process only volume 5
-    process_volume_5()
+    process_volume_5(args.workers)
     
     print("\nConversion complete! Volume 5 articles have been converted to Word documents.")
 
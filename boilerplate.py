@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import hashlib
+import numpy as np
+from bs4 import BeautifulSoup
+from page_archive import iter_pages
+from corpus_catalog import DIR_SITES
+from urdu_normalize import fold
+
+# Directory holding one paragraph-frequency sketch per site
+SKETCH_DIR = "boilerplate"
+
+# Count-Min sketch size: 4 rows of 2^18 counters, 4 MB per site whatever the corpus size
+SKETCH_DEPTH = 4
+SKETCH_WIDTH = 1 << 18
+
+# A paragraph is boilerplate when it occurs in at least this share of a site's
+# pages, and in at least MIN_PAGES pages so small sites keep their text
+BOILERPLATE_FRACTION = 0.05
+MIN_PAGES = 10
+
+# Repeated site text sits around an article, while short lines that recur inside
+# articles (salutations, the سوال and جواب headings, Quranic formulae) are part of
+# them; so only paragraphs of at least MIN_CHARS characters among the first or
+# last EDGE_PARAGRAPHS paragraphs of a body are dropped
+MIN_CHARS = 40
+EDGE_PARAGRAPHS = 3
+
+# Filters loaded by this process, so pool workers read each sketch once
+_filters = {}
+
+def paragraph_texts(html):
+    """Return the texts of the paragraph-like elements the converters turn into paragraphs"""
+    soup = BeautifulSoup(html, 'html.parser')
+    texts = []
+    for element in soup.find_all(['p', 'li', 'blockquote', 'div']):
+        if element.name == 'div' and element.find(['p', 'div'], recursive=False):
+            continue
+        text = element.get_text(strip=True)
+        if text:
+            texts.append(text)
+    return texts
+
+def sketch_positions(text):
+    """Return the counter index in each sketch row for a paragraph's comparison key"""
+    digest = hashlib.blake2b(fold(text).encode('utf-8'), digest_size=8).digest()
+    h1 = int.from_bytes(digest[:4], 'little')
+    h2 = int.from_bytes(digest[4:], 'little') | 1
+    return [(h1 + row * h2) % SKETCH_WIDTH for row in range(SKETCH_DEPTH)]
+
+def sketch_path(site):
+    return os.path.join(SKETCH_DIR, f"{site}.npz")
+
+def site_directories(site):
+    """Return the page directories that belong to a site"""
+    return [directory for directory, dir_site in DIR_SITES.items() if dir_site == site]
+
+def scan_site(site, directories=None):
+    """Count in how many pages of a site each paragraph occurs and save the sketch
+
+    Each distinct paragraph is counted once per page, with conservative
+    updates so frequent paragraphs do not inflate the estimates of others.
+    """
+    start = time.perf_counter()
+    counts = np.zeros((SKETCH_DEPTH, SKETCH_WIDTH), dtype=np.uint32)
+    rows = np.arange(SKETCH_DEPTH)
+    pages = paragraphs = 0
+
+    for directory in directories or site_directories(site):
+        for path, content in iter_pages(directory):
+            try:
+                texts = paragraph_texts(str(content, 'utf-8'))
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                continue
+            pages += 1
+            seen = set()
+            for text in texts:
+                positions = tuple(sketch_positions(text))
+                if positions in seen:
+                    continue
+                seen.add(positions)
+                current = counts[rows, positions]
+                minimum = current.min()
+                counts[rows, positions] = np.maximum(current, minimum + 1)
+            paragraphs += len(seen)
+
+    os.makedirs(SKETCH_DIR, exist_ok=True)
+    np.savez_compressed(sketch_path(site), counts=counts, pages=pages)
+    elapsed = time.perf_counter() - start
+    print(f"{site}: counted {paragraphs:,} distinct paragraphs in {pages} pages ({elapsed:.2f}s)")
+
+class BoilerplateFilter:
+    """Recognizes a site's repeated paragraphs during conversion and tallies what was dropped
+
+    Without a saved sketch for the site nothing is treated as boilerplate.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        self.counts = None
+        self.min_count = None
+        self.removed_paragraphs = 0
+        self.removed_chars = 0
+        path = sketch_path(site)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.counts = data["counts"]
+                pages = int(data["pages"])
+            self.min_count = max(MIN_PAGES, int(pages * BOILERPLATE_FRACTION))
+
+    def page_count(self, text):
+        """Return the estimated number of pages containing a paragraph"""
+        positions = sketch_positions(text)
+        return int(min(self.counts[row, pos] for row, pos in enumerate(positions)))
+
+    def is_boilerplate(self, text):
+        """Check whether a paragraph recurs across the site, counting it as removed if so
+
+        Paragraphs shorter than MIN_CHARS are never boilerplate.
+        """
+        if self.counts is None or len(text) < MIN_CHARS or self.page_count(text) < self.min_count:
+            return False
+        self.removed_paragraphs += 1
+        self.removed_chars += len(text)
+        return True
+
+    def edge_boilerplate(self, texts):
+        """Return the indexes of the repeated paragraphs at the start or end of an article body"""
+        edges = sorted(set(range(min(EDGE_PARAGRAPHS, len(texts))))
+                       | set(range(max(0, len(texts) - EDGE_PARAGRAPHS), len(texts))))
+        return {i for i in edges if self.is_boilerplate(texts[i])}
+
+    def removed(self):
+        """Return the paragraphs and characters dropped so far"""
+        return self.removed_paragraphs, self.removed_chars
+
+    def add_removed(self, paragraphs, chars):
+        """Count paragraphs dropped by another process's filter for the same site"""
+        self.removed_paragraphs += paragraphs
+        self.removed_chars += chars
+
+    def report(self):
+        """Print how much boilerplate was dropped"""
+        if self.counts is None:
+            print(f"No boilerplate sketch for {self.site}; run 'boilerplate.py scan {self.site}' first.")
+            return
+        print(f"Removed {self.removed_paragraphs} boilerplate paragraphs "
+              f"({self.removed_chars / 1024:.1f} KB of text) from {self.site} pages")
+
+def site_filter(site):
+    """Return this process's filter for a site, loading its sketch on first use"""
+    if site not in _filters:
+        _filters[site] = BoilerplateFilter(site)
+    return _filters[site]
+
+def selftest():
+    """Check that site text around articles is dropped and lines recurring inside them are kept"""
+    import tempfile
+
+    global SKETCH_DIR
+    salutation = "السلام علیکم ورحمۃ اللہ"
+    notice = "اس مضمون کو دوسروں تک پہنچائیے، جملہ حقوق محفوظ ہیں، ادارہ ترجمان القرآن"
+    pages = [[notice, f"سوال {n} کا متن یہاں ہے", salutation, "سوال", f"جواب {n} کی تفصیل یہاں ہے",
+              f"دوسرا پیراگراف {n}", f"تیسرا پیراگراف {n}", salutation, notice]
+             for n in range(40)]
+
+    failures = []
+    saved_dir = SKETCH_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        SKETCH_DIR = directory
+        try:
+            page_dir = os.path.join(directory, "pages")
+            os.makedirs(page_dir)
+            for n, texts in enumerate(pages):
+                with open(os.path.join(page_dir, f"page_{n}.html"), 'w', encoding='utf-8') as file:
+                    file.write("<html><body>" + "".join(f"<p>{text}</p>" for text in texts) + "</body></html>")
+            scan_site("test", [page_dir])
+            boilerplate = BoilerplateFilter("test")
+            texts = pages[0]
+            dropped = boilerplate.edge_boilerplate(texts)
+        finally:
+            SKETCH_DIR = saved_dir
+
+    kept = [text for i, text in enumerate(texts) if i not in dropped]
+    if dropped != {0, len(texts) - 1}:
+        failures.append("notice around the article not dropped")
+    if kept.count(salutation) != 2 or "سوال" not in kept:
+        failures.append("recurring lines inside the article dropped")
+    print(f"Dropped {len(dropped)} of {len(texts)} paragraphs; kept: {' | '.join(kept)}")
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("Only the repeated site notice was dropped.")
+
+def main():
+    """Build the paragraph sketches of the given sites or of every site, or run 'selftest'"""
+    if len(sys.argv) > 1 and sys.argv[1] == "selftest":
+        selftest()
+        return
+    if len(sys.argv) < 2 or sys.argv[1] != "scan":
+        print("Usage: boilerplate.py scan [SITE ...] | selftest")
+        return
+    sites = sys.argv[2:] or sorted(set(DIR_SITES.values()))
+    for site in sites:
+        scan_site(site)
+
+if __name__ == "__main__":
+    main()
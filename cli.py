@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+
+# Subcommands by group, each naming the module and function that implement it.
+# Modules are imported only when their subcommand runs, so a command pays for
+# its own dependencies and not for requests, bs4, docx or selenium elsewhere.
+COMMANDS = {
+    "crawl": {
+        "articles": ("srapper", "main", "crawl tarjumanulquran.org listings, articles and PDFs"),
+        "article-pages": ("article_scraper", "extract_and_save_articles",
+                          "download the article pages linked from saved listings"),
+        "pdfs": ("download_pdfs", "download_article_pdfs", "download the PDFs of saved article pages"),
+        "rasail": ("rasailomasail", "main", "crawl the Rasail-o-Masail volume listings"),
+        "rasail-articles": ("extractarticles", "main", "download the Rasail-o-Masail volume 5 articles"),
+        "books": ("maududi_book_scraper", "main", "download readmaududi.com book pages"),
+        "readmaududi": ("readm", "scrape_with_selenium", "crawl readmaududi.com with Selenium"),
+        "failed": ("retry_policy", "main", "replay, list or benchmark failed downloads"),
+        "discover": ("wp_discovery", "main", "list WordPress posts through the REST API or sitemaps"),
+        "all": ("fetch_scheduler", "main", "crawl every site at once, polite to each host"),
+    },
+    "extract": {
+        "articles": ("extract_articles", "main", "extract article text from saved listing pages"),
+        "pdf-text": ("pdf_text", "main", "extract the text of downloaded PDFs"),
+        "boilerplate": ("boilerplate", "main", "count repeated paragraphs per site"),
+    },
+    "convert": {
+        "rasail": ("articleword", "main", "convert Rasail-o-Masail articles to Word"),
+        "books": ("htmltoword", "main", "convert readmaududi.com books to Word"),
+        "optimize": ("optimize_docx", "main", "shrink merged Word documents"),
+    },
+    "merge": {
+        "volumes": ("merge_documents", "main", "merge Word documents by volume"),
+        "volume5": ("merge_volume5", "main", "merge Rasail-o-Masail volume 5"),
+        "stream": ("stream_volume", "main", "crawl, convert and merge a volume concurrently"),
+        "pdfs": ("compile_pdfs", "main", "compile article PDFs into bundles"),
+    },
+    "report": {
+        "catalog": ("corpus_catalog", "main", "catalog status, pending articles or backfill"),
+        "stats": ("corpus_stats", "main", "corpus statistics per site and volume"),
+        "search": ("search_index", "main", "update or query the full-text index"),
+        "duplicates": ("near_duplicates", "main", "find or show near-duplicate articles"),
+        "inventory": ("docx_index", "main", "inventory of the Word documents"),
+        "seen": ("seen_urls", "main", "canonical URLs and seen-set sizes"),
+        "archive": ("page_archive", "main", "pack, look up or benchmark page archives"),
+        "export": ("export_corpus", "main", "columnar export of the corpus"),
+        "normalize": ("urdu_normalize", "main", "normalize Urdu text or benchmark normalization"),
+        "pool": ("worker_pool", "main", "benchmark the shared worker pool"),
+    },
+    "pipeline": ("pipeline", "main", "run every stage whose inputs changed"),
+}
+
+def load(module_name, function_name):
+    """Import a subcommand's module and return its entry point"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    return getattr(importlib.import_module(module_name), function_name)
+
+def iter_commands():
+    """Yield (command words, module, function) for every subcommand"""
+    for group, commands in COMMANDS.items():
+        if isinstance(commands, tuple):
+            yield [group], commands[0], commands[1]
+            continue
+        for name, (module_name, function_name, _) in commands.items():
+            yield [group, name], module_name, function_name
+
+def measure_startup(repeat=3):
+    """Print how long a fresh interpreter takes to import each subcommand's module"""
+    import subprocess
+
+    def best_time(code):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000, result
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    baseline, _ = best_time("pass")
+    cli_time, _ = best_time(f"import sys; sys.path.insert(0, {script_dir!r}); import cli")
+    print(f"{'interpreter':28}{baseline:>9.0f} ms")
+    print(f"{'cli.py':28}{cli_time - baseline:>9.0f} ms")
+    for words, module_name, function_name in iter_commands():
+        elapsed, result = best_time(f"import sys; sys.path.insert(0, {script_dir!r}); import cli; "
+                                    f"cli.load({module_name!r}, {function_name!r})")
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+            print(f"{' '.join(words):28}{'-':>9}    {error}")
+        else:
+            print(f"{' '.join(words):28}{elapsed - baseline:>9.0f} ms")
+
+def run_command(module_name, function_name, argv):
+    """Run a subcommand's entry point as if its script had been started with argv"""
+    entry = load(module_name, function_name)
+    sys.argv = [f"{module_name}.py"] + argv
+    entry()
+
+def main():
+    """Run a subcommand, passing the remaining arguments to its script"""
+    # Known commands are dispatched directly so every remaining argument,
+    # including options like --help, reaches the script unchanged
+    argv = sys.argv[1:]
+    commands = COMMANDS.get(argv[0]) if argv else None
+    if isinstance(commands, tuple):
+        return run_command(commands[0], commands[1], argv[1:])
+    if commands and len(argv) > 1 and argv[1] in commands:
+        module_name, function_name, _ = commands[argv[1]]
+        return run_command(module_name, function_name, argv[2:])
+
+    # Otherwise argparse prints the help or the usage error
+    parser = argparse.ArgumentParser(prog="cli.py", description="Tarjuman-ul-Quran corpus tools")
+    groups = parser.add_subparsers(dest="group", metavar="GROUP", required=True)
+    for group, commands in COMMANDS.items():
+        if isinstance(commands, tuple):
+            groups.add_parser(group, help=commands[2])
+            continue
+        group_parser = groups.add_parser(group, help=f"{group} commands")
+        subcommands = group_parser.add_subparsers(dest="command", metavar="COMMAND", required=True)
+        for name, (_, _, help_text) in commands.items():
+            subcommands.add_parser(name, help=help_text)
+    startup_parser = groups.add_parser("startup", help="measure the import time of every subcommand")
+    startup_parser.add_argument("--repeat", type=int, default=3, help="runs per subcommand, best is kept")
+    args = parser.parse_args()
+
+    if args.group == "startup":
+        measure_startup(args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+import os
+import re
+import json
+import time
+import argparse
+from collections import deque
+from corpus_catalog import connect
+from pdf_text import PDF_DIRS, pdf_hash
+from urdu_normalize import fold
+
+# pypdf parses the source PDFs; the bundles themselves are written directly
+try:
+    from pypdf import PdfReader
+    from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                               NullObject, NumberObject, StreamObject, create_string_object)
+except ImportError:
+    PdfReader = None
+
+# Directory holding the compiled bundles and their manifests
+OUTPUT_DIR = "compiled_pdfs"
+
+# Object numbers reserved in every bundle: the catalog, the root of the page
+# tree and the root of the outline. Later updates rewrite these in place.
+CATALOG_ID = 1
+PAGES_ID = 2
+OUTLINES_ID = 3
+
+PDF_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+
+def ref(obj_id):
+    """Return a reference to an object of the bundle"""
+    return IndirectObject(obj_id, 0, None)
+
+class BundleWriter:
+    """Writes PDF objects straight to the bundle file, keeping only their offsets in memory
+
+    Source PDFs are copied one at a time, so memory use depends on the
+    largest single PDF rather than on the size of the bundle.
+    """
+
+    def __init__(self, file, next_id):
+        self.file = file
+        self.next_id = next_id
+        self.offsets = {}
+
+    def allocate(self):
+        """Reserve the next object number"""
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, obj):
+        """Write an object at the end of the file and remember its offset"""
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode())
+        obj.write_to_stream(self.file)
+        self.file.write(b"\nendobj\n")
+
+    def copy_pdf(self, path, parent_id):
+        """Copy the pages of a PDF with everything they reference; returns the new page ids"""
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        pages = list(reader.pages)
+        mapping = {}
+        pending = deque()
+
+        def new_ref(indirect):
+            key = (indirect.idnum, indirect.generation)
+            if key not in mapping:
+                mapping[key] = self.allocate()
+                pending.append(indirect)
+            return ref(mapping[key])
+
+        def remap(obj):
+            # Rebuild containers with references renumbered for the bundle
+            if isinstance(obj, IndirectObject):
+                return new_ref(obj)
+            if isinstance(obj, StreamObject):
+                copy = obj.__class__()
+                copy._data = obj._data  # still encoded, so nothing is recompressed
+                copy.update({key: remap(value) for key, value in obj.items()})
+                return copy
+            if isinstance(obj, DictionaryObject):
+                return DictionaryObject({key: remap(value) for key, value in obj.items()})
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(remap(value) for value in obj)
+            return obj
+
+        page_ids = [new_ref(page.indirect_reference).idnum for page in pages]
+        page_keys = {(page.indirect_reference.idnum, page.indirect_reference.generation) for page in pages}
+        while pending:
+            indirect = pending.popleft()
+            obj_id = mapping[(indirect.idnum, indirect.generation)]
+            obj = indirect.get_object()
+            if (indirect.idnum, indirect.generation) in page_keys:
+                # Inherited attributes were already copied onto the page when reading
+                obj = remap(DictionaryObject({key: value for key, value in obj.items() if key != "/Parent"}))
+                obj[NameObject("/Parent")] = ref(parent_id)
+            elif obj is None or isinstance(obj, DictionaryObject) and obj.get("/Type") == "/Pages":
+                # The source page tree is replaced by the bundle's own
+                obj = NullObject()
+            else:
+                obj = remap(obj)
+            self.write_object(obj_id, obj)
+        return page_ids
+
+    def write_xref(self, size, prev=None):
+        """Write the cross-reference section and trailer for the objects written so far"""
+        xref_offset = self.file.tell()
+        lines = ["xref\n", "0 1\n0000000000 65535 f \n"]
+        ids = sorted(self.offsets)
+        start = 0
+        while start < len(ids):
+            end = start
+            while end + 1 < len(ids) and ids[end + 1] == ids[end] + 1:
+                end += 1
+            lines.append(f"{ids[start]} {end - start + 1}\n")
+            lines.extend(f"{self.offsets[i]:010d} 00000 n \n" for i in ids[start:end + 1])
+            start = end + 1
+        self.file.write("".join(lines).encode())
+
+        trailer = DictionaryObject({NameObject("/Size"): NumberObject(size),
+                                    NameObject("/Root"): ref(CATALOG_ID)})
+        if prev is not None:
+            trailer[NameObject("/Prev")] = NumberObject(prev)
+        self.file.write(b"trailer\n")
+        trailer.write_to_stream(self.file)
+        self.file.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        return xref_offset
+
+def outline_item(article, prev_id, next_id):
+    """Return the outline entry pointing at the first page of an article"""
+    item = DictionaryObject({
+        NameObject("/Title"): create_string_object(article["title"]),
+        NameObject("/Parent"): ref(OUTLINES_ID),
+        NameObject("/Dest"): ArrayObject([ref(article["first_page"]), NameObject("/Fit")]),
+    })
+    if prev_id is not None:
+        item[NameObject("/Prev")] = ref(prev_id)
+    if next_id is not None:
+        item[NameObject("/Next")] = ref(next_id)
+    return item
+
+def write_trees(writer, articles):
+    """Write the page tree root and the outline root over all articles of the bundle"""
+    writer.write_object(PAGES_ID, DictionaryObject({
+        NameObject("/Type"): NameObject("/Pages"),
+        NameObject("/Kids"): ArrayObject(ref(a["node"]) for a in articles),
+        NameObject("/Count"): NumberObject(sum(a["pages"] for a in articles)),
+    }))
+    outlines = DictionaryObject({NameObject("/Type"): NameObject("/Outlines"),
+                                 NameObject("/Count"): NumberObject(len(articles))})
+    if articles:
+        outlines[NameObject("/First")] = ref(articles[0]["outline"])
+        outlines[NameObject("/Last")] = ref(articles[-1]["outline"])
+    writer.write_object(OUTLINES_ID, outlines)
+
+def append_articles(writer, sources, articles):
+    """Copy source PDFs into the bundle as one page tree node and outline entry each"""
+    added = []
+    for source in sources:
+        node_id = writer.allocate()
+        try:
+            page_ids = writer.copy_pdf(source["path"], node_id)
+        except Exception as e:
+            print(f"  Error reading {source['path']}: {e}")
+            continue
+        if not page_ids:
+            print(f"  No pages in {source['path']}")
+            continue
+        writer.write_object(node_id, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Parent"): ref(PAGES_ID),
+            NameObject("/Kids"): ArrayObject(ref(i) for i in page_ids),
+            NameObject("/Count"): NumberObject(len(page_ids)),
+        }))
+        article = dict(source, node=node_id, first_page=page_ids[0], pages=len(page_ids),
+                       outline=writer.allocate())
+        articles.append(article)
+        added.append(article)
+        print(f"  Added {os.path.basename(source['path'])} ({len(page_ids)} pages)")
+
+    # Link the new outline entries, rewriting the previous last entry to point at them
+    first_new = len(articles) - len(added)
+    for i in range(max(first_new - 1, 0), len(articles)):
+        prev_id = articles[i - 1]["outline"] if i > 0 else None
+        next_id = articles[i + 1]["outline"] if i + 1 < len(articles) else None
+        writer.write_object(articles[i]["outline"], outline_item(articles[i], prev_id, next_id))
+    return added
+
+def bundle_path(name):
+    """Return the path of a compiled bundle"""
+    return os.path.join(OUTPUT_DIR, f"{name}.pdf")
+
+def manifest_path(name):
+    """Return the path of the manifest recording the articles of a bundle"""
+    return os.path.join(OUTPUT_DIR, f"{name}.json")
+
+def load_manifest(name):
+    """Load the manifest of a bundle, or None if there is none"""
+    path = manifest_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_manifest(name, manifest):
+    """Save a bundle's manifest: its articles, next free object number and last xref offset"""
+    tmp_path = manifest_path(name) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(name))
+
+def build_bundle(name, sources):
+    """Write a bundle from scratch; returns its manifest"""
+    output = bundle_path(name)
+    tmp_path = output + ".tmp"
+    articles = []
+    with open(tmp_path, 'wb') as file:
+        file.write(PDF_HEADER)
+        writer = BundleWriter(file, OUTLINES_ID + 1)
+        append_articles(writer, sources, articles)
+        write_trees(writer, articles)
+        writer.write_object(CATALOG_ID, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): ref(PAGES_ID),
+            NameObject("/Outlines"): ref(OUTLINES_ID),
+            NameObject("/PageMode"): NameObject("/UseOutlines"),
+        }))
+        startxref = writer.write_xref(writer.next_id)
+    os.replace(tmp_path, output)
+    return {"bundle": name, "next_id": writer.next_id, "startxref": startxref,
+            "file_size": os.path.getsize(output), "articles": articles}
+
+def append_to_bundle(name, manifest, sources):
+    """Add sources to an existing bundle as an incremental update at the end of the file
+
+    Only the new objects, the two tree roots and the previous last outline
+    entry are written, followed by a cross-reference section that points
+    back to the previous one, so the existing bytes are left untouched.
+    """
+    output = bundle_path(name)
+    articles = manifest["articles"]
+    with open(output, 'r+b') as file:
+        file.seek(0, os.SEEK_END)
+        original_size = file.tell()
+        try:
+            writer = BundleWriter(file, manifest["next_id"])
+            added = append_articles(writer, sources, articles)
+            if not added:
+                file.truncate(original_size)
+                return manifest
+            write_trees(writer, articles)
+            startxref = writer.write_xref(writer.next_id, prev=manifest["startxref"])
+        except BaseException:
+            # Leave the bundle as it was before this update
+            file.truncate(original_size)
+            raise
+    manifest.update(next_id=writer.next_id, startxref=startxref, file_size=os.path.getsize(output))
+    return manifest
+
+def source_changed(known, source):
+    """Check whether a source PDF differs from the copy recorded in the manifest"""
+    if known["size"] == source["size"] and known["mtime_ns"] == source["mtime_ns"]:
+        return False
+    source["hash"] = pdf_hash(source["path"])
+    return known["hash"] != source["hash"]
+
+def compile_bundle(name, sources, rebuild=False):
+    """Bring a bundle up to date with its sources, appending new PDFs when possible"""
+    start = time.perf_counter()
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest = None if rebuild else load_manifest(name)
+    output = bundle_path(name)
+    if manifest is not None and (not os.path.exists(output)
+                                 or os.path.getsize(output) != manifest["file_size"]):
+        print(f"{name}: bundle does not match its manifest, rebuilding")
+        manifest = None
+
+    if manifest is not None:
+        known = {article["path"]: article for article in manifest["articles"]}
+        current = {source["path"] for source in sources}
+        changed = [s["path"] for s in sources if s["path"] in known and source_changed(known[s["path"]], s)]
+        removed = [path for path in known if path not in current]
+        if changed or removed:
+            # Pages cannot be taken out of an incremental update, so start over
+            print(f"{name}: {len(changed)} changed and {len(removed)} removed PDFs, rebuilding")
+            manifest = None
+        else:
+            new_sources = [s for s in sources if s["path"] not in known]
+            if not new_sources:
+                print(f"{name}: up to date ({len(known)} articles)")
+                return manifest
+            for source in new_sources:
+                source.setdefault("hash", pdf_hash(source["path"]))
+            print(f"{name}: appending {len(new_sources)} new PDFs")
+            manifest = append_to_bundle(name, manifest, new_sources)
+
+    if manifest is None:
+        for source in sources:
+            source.setdefault("hash", pdf_hash(source["path"]))
+        print(f"{name}: compiling {len(sources)} PDFs")
+        manifest = build_bundle(name, sources)
+
+    save_manifest(name, manifest)
+    pages = sum(article["pages"] for article in manifest["articles"])
+    print(f"{name}: {len(manifest['articles'])} articles, {pages} pages, "
+          f"{manifest['file_size'] / 1e6:.1f} MB ({time.perf_counter() - start:.2f}s)")
+    return manifest
+
+def issue_year(date):
+    """Return the year of an issue date in Urdu or Latin digits, or None"""
+    match = re.search(r'\b(1[89]\d\d|20\d\d)\b', fold(date or ''))
+    return int(match.group(1)) if match else None
+
+def bundle_name(key):
+    """Return a file name for a bundle key such as an author or an issue range"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', key).strip('_.')[:100] or "bundle"
+
+def group_sources(directories, by="category", years=1):
+    """Return {bundle name: sources} for the PDFs in the directories
+
+    Bundles are per author (the listing category of the article) or per
+    range of issue years, from the catalog entries of the PDFs.
+    """
+    catalog = {row["pdf_path"]: row for row in connect().execute(
+        "SELECT id, pdf_path, title, date, category FROM articles WHERE pdf_path IS NOT NULL")}
+
+    groups = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.lower().endswith('.pdf'):
+                continue
+            path = os.path.join(directory, file_name)
+            row = catalog.get(path)
+            if by == "year":
+                year = issue_year(row["date"]) if row else None
+                if year is None:
+                    key = "undated"
+                else:
+                    first = year - year % years
+                    key = str(first) if years == 1 else f"{first}-{first + years - 1}"
+            else:
+                key = (row["category"] if row else None) or "uncategorized"
+
+            stat = os.stat(path)
+            groups.setdefault(bundle_name(key), []).append({
+                "path": path,
+                "title": (row["title"] if row else None) or os.path.splitext(file_name)[0],
+                "year": issue_year(row["date"]) if row else None,
+                "order": row["id"] if row else 0,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            })
+
+    for sources in groups.values():
+        sources.sort(key=lambda s: (s["year"] or 0, s["order"], s["path"]))
+    return groups
+
+def main():
+    """Compile the downloaded article PDFs into bundles per author or issue range"""
+    parser = argparse.ArgumentParser(description="Compile article PDFs into bundles with an outline")
+    parser.add_argument("directories", nargs="*", default=PDF_DIRS, help="directories with PDFs")
+    parser.add_argument("--by", choices=["category", "year"], default="category",
+                        help="bundle per author/category or per issue year range")
+    parser.add_argument("--years", type=int, default=1, help="issue years per bundle with --by year")
+    parser.add_argument("--only", nargs="+", help="compile only these bundles")
+    parser.add_argument("--rebuild", action="store_true", help="rewrite bundles instead of appending")
+    args = parser.parse_args()
+
+    if PdfReader is None:
+        print("pypdf is required to compile PDFs: pip install pypdf")
+        return
+
+    groups = group_sources(args.directories, args.by, max(args.years, 1))
+    print(f"Found {sum(len(s) for s in groups.values())} PDFs in {len(groups)} bundles")
+    for name, sources in sorted(groups.items()):
+        if args.only and name not in args.only:
+            continue
+        compile_bundle(name, sources, args.rebuild)
+
+if __name__ == "__main__":
+    main()
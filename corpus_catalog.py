@@ -0,0 +1,286 @@
+import os
+import re
+import sys
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# SQLite database shared by every stage of the pipeline
+CATALOG_FILE = "corpus_catalog.db"
+
+# Processing stages tracked for each article, in pipeline order
+STAGES = ("downloaded", "extracted", "converted", "merged")
+
+# Stage that must be done before each stage can run; text extraction and
+# Word conversion both work from the downloaded page
+PREREQUISITES = {"extracted": "downloaded", "converted": "downloaded", "merged": "converted"}
+
+# Columns that stages may fill in besides the stage status
+FIELDS = ("site", "listing_page", "title", "date", "category", "volume",
+          "blob", "content_hash", "text_path", "docx_path", "pdf_path")
+
+# Sites of the page directories, used when backfilling from existing archives
+DIR_SITES = {
+    "articles": "tarjumanulquran.org",
+    "article_html_files": "tarjumanulquran.org",
+    "rasailomasail_articles/volume_05": "rasailomasail.net",
+    "maududi_books_html": "readmaududi.com",
+    "readmaududi_scrape/books": "readmaududi.com",
+}
+
+# Columns identifying an article whose URL is unknown, in the order they are tried
+PATH_KEYS = ("blob", "pdf_path", "text_path")
+
+# Canonical URL a saved page declares for itself
+CANONICAL_RE = re.compile(rb'<link[^>]+rel=["\']canonical["\'][^>]*href=["\']([^"\']+)'
+                          rb'|<meta[^>]+property=["\']og:url["\'][^>]*content=["\']([^"\']+)', re.I)
+
+ARTICLES_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE,
+    site TEXT,
+    listing_page TEXT,
+    title TEXT,
+    date TEXT,
+    category TEXT,
+    volume INTEGER,
+    blob TEXT,
+    content_hash TEXT,
+    text_path TEXT,
+    docx_path TEXT,
+    pdf_path TEXT,
+    downloaded TEXT NOT NULL DEFAULT 'pending',
+    extracted TEXT NOT NULL DEFAULT 'pending',
+    converted TEXT NOT NULL DEFAULT 'pending',
+    merged TEXT NOT NULL DEFAULT 'pending',
+    updated_at TEXT
+);
+"""
+
+SCHEMA = ARTICLES_TABLE.format(table="articles") + """
+CREATE INDEX IF NOT EXISTS idx_articles_site ON articles(site, volume);
+CREATE INDEX IF NOT EXISTS idx_articles_blob ON articles(blob);
+CREATE INDEX IF NOT EXISTS idx_articles_docx ON articles(docx_path);
+CREATE INDEX IF NOT EXISTS idx_articles_pdf ON articles(pdf_path);
+CREATE INDEX IF NOT EXISTS idx_articles_text ON articles(text_path);
+CREATE INDEX IF NOT EXISTS idx_articles_hash ON articles(content_hash);
+CREATE INDEX IF NOT EXISTS idx_articles_downloaded ON articles(downloaded, site);
+CREATE INDEX IF NOT EXISTS idx_articles_extracted ON articles(extracted, site);
+CREATE INDEX IF NOT EXISTS idx_articles_converted ON articles(converted, site);
+CREATE INDEX IF NOT EXISTS idx_articles_merged ON articles(merged, site);
+"""
+
+_connections = {}
+
+def connect(path=CATALOG_FILE):
+    """Return a connection to the catalog, creating the schema on first use
+
+    Connections are cached per process and thread and run in autocommit
+    mode with WAL journaling, so several stages, worker processes and
+    threads can write at once.
+    """
+    key = (os.getpid(), threading.get_ident(), path)
+    if key not in _connections:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        _migrate(connection)
+        _connections[key] = connection
+    return _connections[key]
+
+def _migrate(connection):
+    """Let a catalog created when every article needed a URL hold articles without one
+
+    File paths and listing tabs stored as URLs by earlier versions are
+    cleared, so they no longer stand in for the real URLs.
+    """
+    if not connection.execute("SELECT \"notnull\" FROM pragma_table_info('articles') WHERE name = 'url'").fetchone()[0]:
+        return
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have migrated while this one waited for the lock
+        if connection.execute("SELECT \"notnull\" FROM pragma_table_info('articles') WHERE name = 'url'").fetchone()[0]:
+            connection.execute(ARTICLES_TABLE.format(table="articles_new"))
+            connection.execute("INSERT INTO articles_new SELECT * FROM articles")
+            connection.execute("UPDATE articles_new SET url = NULL WHERE url NOT LIKE 'http%'")
+            connection.execute("DROP TABLE articles")
+            connection.execute("ALTER TABLE articles_new RENAME TO articles")
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    connection.executescript(SCHEMA)
+
+def content_hash(content):
+    """Return the SHA-256 hex digest of page content"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _check_fields(fields):
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown catalog fields: {', '.join(sorted(unknown))}")
+
+def record_article(url, stage=None, status="done", **fields):
+    """Insert or update an article by URL, optionally marking a stage
+
+    An article whose URL is unknown is recorded with url None and found by
+    its stored page, PDF or text file instead. Fields that are None keep
+    their previous value.
+    """
+    _check_fields(fields)
+    if stage is not None and stage not in STAGES:
+        raise ValueError(f"Unknown stage: {stage}")
+    if url is None:
+        _record_by_path(stage, status, fields)
+        return
+    if fields.get("blob"):
+        # A page recorded before its URL was known is the same article
+        connect().execute(
+            "UPDATE articles SET url = ? WHERE url IS NULL AND blob = ? "
+            "AND NOT EXISTS (SELECT 1 FROM articles WHERE url = ?)", (url, fields["blob"], url))
+    columns = ["url", "updated_at"] + list(fields)
+    values = [url, _now()] + list(fields.values())
+    if stage is not None:
+        columns.append(stage)
+        values.append(status)
+
+    updates = ", ".join(f"{c} = COALESCE(excluded.{c}, {c})" for c in columns[1:])
+    connect().execute(
+        f"INSERT INTO articles ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(url) DO UPDATE SET {updates}",
+        values,
+    )
+
+def mark_stage(stage, status="done", url=None, blob=None, docx_path=None, pdf_path=None, **fields):
+    """Mark a stage for the article identified by URL, stored page, Word document or PDF path
+
+    Converters and mergers only know their input files, so they can find
+    the article by the path of its stored page (blob), its .docx or its PDF;
+    the first one given is used for the lookup. With stage None only the
+    given fields are updated. Returns the number of articles updated.
+    """
+    if stage is not None and stage not in STAGES:
+        raise ValueError(f"Unknown stage: {stage}")
+    _check_fields(fields)
+
+    # The first identifier given selects the article; the others are stored
+    identifiers = {"url": url, "blob": blob, "docx_path": docx_path, "pdf_path": pdf_path}
+    key_column = next((column for column, value in identifiers.items() if value is not None), None)
+    if key_column is None:
+        raise ValueError("An article URL, blob, docx_path or pdf_path is required")
+    where, key = f"{key_column} = ?", identifiers.pop(key_column)
+    fields.update({column: value for column, value in identifiers.items() if value is not None})
+
+    assignments = ["updated_at = ?"] + [f"{c} = ?" for c in fields]
+    values = [_now()] + list(fields.values())
+    if stage is not None:
+        assignments.append(f"{stage} = ?")
+        values.append(status)
+    values.append(key)
+    cursor = connect().execute(f"UPDATE articles SET {', '.join(assignments)} WHERE {where}", values)
+    return cursor.rowcount
+
+def stage_done(url, stage):
+    """Check whether a stage has completed for an article"""
+    row = connect().execute(f"SELECT {stage} FROM articles WHERE url = ?", (url,)).fetchone()
+    return row is not None and row[0] == "done"
+def _record_by_path(stage, status, fields):
+    """Insert or update an article without a URL, found by the first of its paths given"""
+    key_column = next((column for column in PATH_KEYS if fields.get(column)), None)
+    if key_column is None:
+        raise ValueError(f"An article without a URL needs one of: {', '.join(PATH_KEYS)}")
+    fields = {column: value for column, value in fields.items() if value is not None}
+    if stage is not None:
+        fields[stage] = status
+    connection = connect()
+    cursor = connection.execute(
+        f"UPDATE articles SET {', '.join(f'{c} = ?' for c in ['updated_at'] + list(fields))} "
+        f"WHERE {key_column} = ?", [_now()] + list(fields.values()) + [fields[key_column]])
+    if cursor.rowcount == 0:
+        columns = ["updated_at"] + list(fields)
+        connection.execute(f"INSERT INTO articles ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                           [_now()] + list(fields.values()))
+
+def page_url(content):
+    """Return the canonical URL a saved page declares, or None"""
+    match = CANONICAL_RE.search(bytes(content[:65536]))
+    if not match:
+        return None
+    url = (match.group(1) or match.group(2)).decode('utf-8', 'replace')
+    return url if url.startswith('http') else None
+
+def stored_page(url):
+    """Return the path of an article's stored page as recorded in the catalog, or None"""
+    row = connect().execute("SELECT blob FROM articles WHERE url = ?", (url,)).fetchone()
+    return row[0] if row else None
+
+def pending(stage, site=None, volume=None):
+    """Return the articles whose prerequisite stage is done but this one is not"""
+    if stage not in STAGES:
+        raise ValueError(f"Unknown stage: {stage}")
+    conditions = [f"{stage} != 'done'"]
+    if stage in PREREQUISITES:
+        conditions.append(f"{PREREQUISITES[stage]} = 'done'")
+    values = []
+    if site is not None:
+        conditions.append("site = ?")
+        values.append(site)
+    if volume is not None:
+        conditions.append("volume = ?")
+        values.append(volume)
+    return connect().execute(
+        f"SELECT * FROM articles WHERE {' AND '.join(conditions)} ORDER BY id", values).fetchall()
+
+def summary():
+    """Return per-site counts of articles and completed stages"""
+    done = ", ".join(f"SUM({s} = 'done') AS {s}" for s in STAGES)
+    return connect().execute(
+        f"SELECT site, COUNT(*) AS articles, {done} FROM articles GROUP BY site ORDER BY site").fetchall()
+
+def backfill():
+    """Record the pages already stored by earlier runs as downloaded articles
+
+    The URL comes from the page's archive entry or its canonical link; pages
+    with neither are recorded without one rather than under a made-up key.
+    """
+    from page_archive import get_archive, iter_pages
+
+    added = 0
+    for directory, site in DIR_SITES.items():
+        archive = get_archive(directory)
+        for path, view in iter_pages(directory):
+            entry = archive.entry(os.path.basename(path)) if archive.exists() else None
+            url = (entry or {}).get("url") or page_url(view)
+            record_article(url, stage="downloaded", site=site, blob=path, content_hash=content_hash(view))
+            added += 1
+    print(f"Recorded {added} stored pages in the catalog")
+
+def main():
+    """Print a summary of the catalog, list pending articles for a stage, or backfill it"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "backfill":
+        backfill()
+    elif command == "pending":
+        stage = sys.argv[2]
+        site = sys.argv[3] if len(sys.argv) > 3 else None
+        rows = pending(stage, site)
+        for row in rows:
+            print(f"{row['site'] or '-'}\t{row['url']}\t{row['title'] or ''}")
+        print(f"{len(rows)} articles pending for stage '{stage}'")
+    else:
+        print(f"{'site':24}{'articles':>10}" + "".join(f"{s:>12}" for s in STAGES))
+        for row in summary():
+            print(f"{row['site'] or '-':24}{row['articles']:>10}" + "".join(f"{row[s] or 0:>12}" for s in STAGES))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import time
+import argparse
+from collections import Counter
+import numpy as np
+from search_index import read_docx_text
+from urdu_normalize import fold
+
+# Saved tokenization state: metadata as JSON, per-document term counts as NumPy arrays
+STATE_FILE = "corpus_stats.json"
+ARRAYS_FILE = "corpus_stats.npz"
+
+# Extracted text and converted Word documents, with the site each directory belongs to
+SOURCE_DIRS = {
+    "articles_text": "tarjumanulquran.org",
+    "rasailomasail_word": "rasailomasail.net",
+    "maududi_books_word": "readmaududi.com",
+}
+
+# Common Urdu function words left out of the top terms
+STOPWORDS = set("""
+کے کی کا کو میں سے نے ہے ہیں اور پر بھی یہ وہ کہ تو ہو جو اس ان کر تھا تھے تھی گیا
+ہی نہیں ایک جس لیے لئے کیا کسی اگر یا ہوں ہوتا ہوتی ہوتے جا رہا رہے گے گی والے
+""".split())
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Deleted documents are compacted away once they make up this share of the arrays
+COMPACT_FRACTION = 0.25
+
+def document_group(path):
+    """Return the (site, volume) a document is reported under"""
+    parts = os.path.normpath(path).split(os.sep)
+    site = SOURCE_DIRS.get(parts[0], parts[0])
+    volume = None
+    match = re.match(r'volume_(\d+)$', parts[1]) if len(parts) > 2 else None
+    if match:
+        volume = int(match.group(1))
+    return site, volume
+
+def read_text(path):
+    """Return the text of an extracted .txt file or a converted .docx"""
+    if path.endswith('.docx'):
+        return '\n'.join(read_docx_text(path))
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+class CorpusStats:
+    """Tokenized corpus kept as flat NumPy arrays of per-document term counts
+
+    Document i owns term_ids/term_counts[starts[i]:starts[i + 1]]. Changed
+    and deleted documents are only flagged dead, so updates append new
+    documents without touching the rest.
+    """
+
+    def __init__(self):
+        self.vocab = {}
+        self.groups = []
+        self.docs = {}
+        self.doc_group = np.zeros(0, dtype=np.int32)
+        self.doc_words = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.starts = np.zeros(1, dtype=np.int64)
+        self.term_ids = np.zeros(0, dtype=np.int32)
+        self.term_counts = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def load(cls):
+        """Return the saved state, or an empty one"""
+        stats = cls()
+        if os.path.exists(STATE_FILE) and os.path.exists(ARRAYS_FILE):
+            with open(STATE_FILE, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            stats.vocab = {term: i for i, term in enumerate(state["vocab"])}
+            stats.groups = [tuple(group) for group in state["groups"]]
+            stats.docs = state["docs"]
+            with np.load(ARRAYS_FILE) as arrays:
+                for name in ("doc_group", "doc_words", "alive", "starts", "term_ids", "term_counts"):
+                    setattr(stats, name, arrays[name])
+        return stats
+
+    def save(self):
+        """Write the arrays and the vocabulary, group and document metadata"""
+        np.savez(ARRAYS_FILE, doc_group=self.doc_group, doc_words=self.doc_words, alive=self.alive,
+                 starts=self.starts, term_ids=self.term_ids, term_counts=self.term_counts)
+        tmp_file = STATE_FILE + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as file:
+            json.dump({"vocab": list(self.vocab), "groups": self.groups, "docs": self.docs},
+                      file, ensure_ascii=False)
+        os.replace(tmp_file, STATE_FILE)
+
+    def update(self, directories):
+        """Tokenize new and changed documents and retire deleted ones, returning (added, removed)"""
+        found = set()
+        new_groups, new_words, new_ids, new_counts = [], [], [], []
+        for directory in directories:
+            for root, _, files in os.walk(directory):
+                for name in sorted(files):
+                    if not name.endswith(('.txt', '.docx')):
+                        continue
+                    path = os.path.join(root, name)
+                    found.add(path)
+                    stat = os.stat(path)
+                    known = self.docs.get(path)
+                    if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                        continue
+                    try:
+                        counts = Counter(TOKEN_RE.findall(fold(read_text(path))))
+                    except Exception as e:
+                        print(f"Error reading {path}: {e}")
+                        continue
+                    if known:
+                        self.alive[known[2]] = False
+
+                    group = document_group(path)
+                    if group not in self.groups:
+                        self.groups.append(group)
+                    ids = np.fromiter((self.vocab.setdefault(term, len(self.vocab)) for term in counts),
+                                      dtype=np.int32, count=len(counts))
+                    self.docs[path] = [stat.st_size, stat.st_mtime_ns, len(self.alive) + len(new_words)]
+                    new_groups.append(self.groups.index(group))
+                    new_words.append(sum(counts.values()))
+                    new_ids.append(ids)
+                    new_counts.append(np.fromiter(counts.values(), dtype=np.int32, count=len(counts)))
+
+        removed = 0
+        scanned = tuple(os.path.join(d, '') for d in directories)
+        for path in [p for p in self.docs if p.startswith(scanned) and p not in found]:
+            self.alive[self.docs.pop(path)[2]] = False
+            removed += 1
+
+        if new_words:
+            lengths = np.array([len(ids) for ids in new_ids], dtype=np.int64)
+            self.doc_group = np.concatenate([self.doc_group, np.array(new_groups, dtype=np.int32)])
+            self.doc_words = np.concatenate([self.doc_words, np.array(new_words, dtype=np.int64)])
+            self.alive = np.concatenate([self.alive, np.ones(len(new_words), dtype=bool)])
+            self.starts = np.concatenate([self.starts, self.starts[-1] + np.cumsum(lengths)])
+            self.term_ids = np.concatenate([self.term_ids] + new_ids)
+            self.term_counts = np.concatenate([self.term_counts] + new_counts)
+
+        if len(self.alive) and np.count_nonzero(~self.alive) > COMPACT_FRACTION * len(self.alive):
+            self.compact()
+        return len(new_words), removed
+
+    def compact(self):
+        """Drop the term counts of dead documents and renumber the rest"""
+        keep = np.flatnonzero(self.alive)
+        lengths = np.diff(self.starts)
+        entry_alive = np.repeat(self.alive, lengths)
+        renumber = np.cumsum(self.alive) - 1
+        for doc in self.docs.values():
+            doc[2] = int(renumber[doc[2]])
+        self.term_ids = self.term_ids[entry_alive]
+        self.term_counts = self.term_counts[entry_alive]
+        self.starts = np.concatenate([[0], np.cumsum(lengths[keep])])
+        self.doc_group = self.doc_group[keep]
+        self.doc_words = self.doc_words[keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+
+    def entry_docs(self):
+        """Return the document index of every term-count entry"""
+        return np.repeat(np.arange(len(self.alive)), np.diff(self.starts))
+
+    def report(self, top=20):
+        """Print per-site and per-volume figures and the most frequent terms"""
+        alive = self.alive
+        num_groups = len(self.groups)
+        group_of_doc = self.doc_group[alive]
+        words = self.doc_words[alive]
+        articles = np.bincount(group_of_doc, minlength=num_groups)
+        word_totals = np.bincount(group_of_doc, weights=words, minlength=num_groups)
+
+        # Vocabulary per group: distinct (group, term) pairs over live entries
+        entry_docs = self.entry_docs()
+        entry_alive = alive[entry_docs]
+        entry_groups = self.doc_group[entry_docs[entry_alive]].astype(np.int64)
+        pairs = np.unique(entry_groups * len(self.vocab) + self.term_ids[entry_alive])
+        vocab_sizes = np.bincount(pairs // max(len(self.vocab), 1), minlength=num_groups)
+
+        print(f"{'site':22}{'vol':>4}{'articles':>10}{'words':>13}{'mean':>8}{'median':>8}{'p90':>8}{'vocab':>9}")
+        order = sorted(range(num_groups), key=lambda g: (self.groups[g][0], self.groups[g][1] or 0))
+        for g in order:
+            if not articles[g]:
+                continue
+            lengths = words[group_of_doc == g]
+            site, volume = self.groups[g]
+            print(f"{site:22}{volume or '-':>4}{articles[g]:>10,}{int(word_totals[g]):>13,}"
+                  f"{lengths.mean():>8.0f}{np.median(lengths):>8.0f}{np.percentile(lengths, 90):>8.0f}"
+                  f"{vocab_sizes[g]:>9,}")
+
+        term_totals = np.bincount(self.term_ids[entry_alive], weights=self.term_counts[entry_alive],
+                                  minlength=len(self.vocab))
+        print(f"\nTotal: {int(articles.sum()):,} articles, {int(words.sum()):,} words, "
+              f"{np.count_nonzero(term_totals):,} distinct terms")
+
+        terms = list(self.vocab)
+        ranked = [i for i in np.argsort(-term_totals, kind='stable')[:top + len(STOPWORDS)]
+                  if terms[i] not in STOPWORDS][:top]
+        print(f"\nTop {len(ranked)} terms:")
+        for i in ranked:
+            print(f"  {terms[i]:20}{int(term_totals[i]):>12,}")
+
+def main():
+    """Update the tokenized corpus and print its statistics"""
+    parser = argparse.ArgumentParser(description="Corpus statistics per site and volume")
+    parser.add_argument("directories", nargs="*", default=list(SOURCE_DIRS), help="directories to scan")
+    parser.add_argument("--top", type=int, default=20, help="number of top terms to list")
+    parser.add_argument("--rebuild", action="store_true", help="discard the saved state and re-tokenize")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = CorpusStats() if args.rebuild else CorpusStats.load()
+    added, removed = stats.update(args.directories)
+    stats.save()
+    print(f"Tokenized {added} new or changed documents, retired {removed} "
+          f"({time.perf_counter() - start:.2f}s)\n")
+
+    start = time.perf_counter()
+    stats.report(args.top)
+    print(f"\nReport computed in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Persisted metadata, keyed by the SHA-256 of each .docx file
+INDEX_FILE = "docx_index.json"
+
+# Directories scanned for the corpus inventory
+DEFAULT_DIRS = ["rasailomasail_word", "maududi_books_word"]
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_style_names(archive):
+    """Map paragraph style IDs to style names from word/styles.xml"""
+    names = {}
+    try:
+        stream = archive.open('word/styles.xml')
+    except KeyError:
+        return names
+
+    with stream:
+        style_id = None
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start' and elem.tag == W_NS + 'style':
+                style_id = elem.get(W_NS + 'styleId')
+            elif event == 'end' and elem.tag == W_NS + 'name' and style_id:
+                names[style_id] = elem.get(W_NS + 'val', '')
+            elif event == 'end' and elem.tag == W_NS + 'style':
+                style_id = None
+                elem.clear()
+    return names
+
+def scan_docx(path, stop_at_heading=False):
+    """Read title, paragraph and word counts from a .docx without loading it with python-docx
+
+    word/document.xml is streamed with an incremental parser. The title is the
+    first body paragraph whose style name starts with 'Heading', matching what
+    python-docx reports. With stop_at_heading the scan ends at that paragraph
+    and the counts only cover the paragraphs before it.
+    """
+    result = {"title": None, "paragraphs": 0, "words": 0}
+
+    with zipfile.ZipFile(path) as archive:
+        style_names = None
+        table_depth = 0
+        style_id = None
+        text_parts = []
+
+        with archive.open('word/document.xml') as stream:
+            for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    if tag == W_NS + 'tbl':
+                        table_depth += 1
+                    elif tag == W_NS + 'p':
+                        style_id = None
+                        text_parts = []
+                    continue
+
+                if tag == W_NS + 't':
+                    text_parts.append(elem.text or '')
+                elif tag == W_NS + 'tab':
+                    text_parts.append('\t')
+                elif tag == W_NS + 'br':
+                    text_parts.append('\n')
+                elif tag == W_NS + 'pStyle':
+                    style_id = elem.get(W_NS + 'val')
+                elif tag == W_NS + 'tbl':
+                    table_depth -= 1
+                elif tag == W_NS + 'p':
+                    text = ''.join(text_parts)
+                    result["paragraphs"] += 1
+                    result["words"] += len(text.split())
+
+                    if result["title"] is None and table_depth == 0 and style_id:
+                        # Default templates use the style name without spaces as the ID
+                        if style_id.startswith('Heading'):
+                            is_heading = True
+                        else:
+                            if style_names is None:
+                                style_names = read_style_names(archive)
+                            is_heading = style_names.get(style_id, '').startswith('Heading')
+
+                        if is_heading:
+                            result["title"] = text
+                            if stop_at_heading:
+                                break
+                    elem.clear()
+
+    return result
+
+class DocxIndex:
+    """Persistent index of .docx metadata keyed by file hash
+
+    Paths are remembered together with their size and modification time, so
+    unchanged files are not even re-hashed on later lookups. Pool workers
+    hand their additions back with changes() for the parent to add_changes()
+    and save once, as concurrent saves could lose each other's entries.
+    """
+
+    def __init__(self, index_file=INDEX_FILE):
+        self.index_file = index_file
+        self.entries = {}
+        self.paths = {}
+        self.new_entries = {}
+        self.new_paths = {}
+        self.dirty = False
+        if os.path.exists(index_file):
+            with open(index_file, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self.entries = data.get("entries", {})
+            self.paths = data.get("paths", {})
+
+    def hash(self, path):
+        """Return the content hash of a file, reusing the cached value if it is unchanged"""
+        stat = os.stat(path)
+        cached = self.paths.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_hash(path)
+        self.paths[path] = self.new_paths[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def lookup(self, path, title_only=False):
+        """Return the metadata of a .docx, scanning it only if its contents are new
+
+        With title_only the scan stops at the first heading and the entry has
+        no counts, until a full lookup of the same contents adds them.
+        """
+        digest = self.hash(path)
+        entry = self.entries.get(digest)
+        if entry is None or (not title_only and "words" not in entry):
+            if title_only:
+                entry = {"title": scan_docx(path, stop_at_heading=True)["title"]}
+            else:
+                entry = scan_docx(path)
+            self.entries[digest] = self.new_entries[digest] = entry
+            self.dirty = True
+        return entry
+
+    def changes(self):
+        """Return the entries and paths added since the index was loaded"""
+        return {"entries": self.new_entries, "paths": self.new_paths}
+
+    def add_changes(self, changes):
+        """Add the entries and paths another process's index returned from changes()"""
+        for digest, entry in changes["entries"].items():
+            if "words" in entry or digest not in self.entries:
+                self.entries[digest] = self.new_entries[digest] = entry
+        for path, cached in changes["paths"].items():
+            self.paths[path] = self.new_paths[path] = cached
+        if changes["entries"] or changes["paths"]:
+            self.dirty = True
+
+    def title(self, path, default=None):
+        """Return the first heading of a .docx, or default if it has none or cannot be read"""
+        try:
+            return self.lookup(path, title_only=True)["title"] or default
+        except Exception as e:
+            print(f"Error reading document {path}: {e}")
+            return default
+
+    def save(self):
+        """Write the index to disk, keeping entries saved by other processes meanwhile"""
+        if not self.dirty:
+            return
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+                # Entries saved by other processes meanwhile, and full entries
+                # rather than title-only ones for the same contents
+                saved = data.get("entries", {})
+                self.entries = {**saved, **{digest: entry for digest, entry in self.entries.items()
+                                            if "words" in entry or digest not in saved}}
+                self.paths = {**data.get("paths", {}), **self.paths}
+            except ValueError:
+                pass
+
+        tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as file:
+            json.dump({"entries": self.entries, "paths": self.paths}, file, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+        self.new_entries = {}
+        self.new_paths = {}
+        self.dirty = False
+
+def main():
+    """Index all Word documents in the given directories and print a corpus inventory"""
+    directories = sys.argv[1:] or DEFAULT_DIRS
+    index = DocxIndex()
+
+    paths = []
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            paths.extend(os.path.join(root, f) for f in files if f.endswith('.docx'))
+
+    print(f"Found {len(paths)} Word documents")
+
+    start = time.perf_counter()
+    total_words = total_paragraphs = untitled = 0
+    for path in sorted(paths):
+        try:
+            entry = index.lookup(path)
+        except Exception as e:
+            print(f"Error reading document {path}: {e}")
+            continue
+        total_words += entry["words"]
+        total_paragraphs += entry["paragraphs"]
+        if not entry["title"]:
+            untitled += 1
+    elapsed = time.perf_counter() - start
+    index.save()
+
+    print(f"Paragraphs: {total_paragraphs:,}")
+    print(f"Words: {total_words:,}")
+    print(f"Documents without a heading: {untitled}")
+    if paths:
+        print(f"Indexed in {elapsed:.2f}s ({elapsed / len(paths) * 1000:.2f} ms per file)")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import os
-import time
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from page_archive import get_archive, list_pages, read_page
+from corpus_catalog import mark_stage
+from retry_policy import PDF, fetch, pause, record_failure
 
 def download_article_pdfs():
     # Create directory for saving PDFs
@@ -18,12 +19,12 @@ def download_article_pdfs():
     html_dir = "article_html_files"
     
     # Check if directory exists
-    if not os.path.exists(html_dir):
+    if not os.path.exists(html_dir) and not get_archive(html_dir).exists():
         print(f"Error: Directory '{html_dir}' not found.")
         return
         
     # Get list of HTML files
-    html_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
+    html_files = [os.path.basename(p) for p in list_pages(html_dir)]
     
     print(f"Found {len(html_files)} HTML files to process")
     
@@ -39,8 +40,7 @@ def download_article_pdfs():
             print(f"[{i}/{len(html_files)}] Processing: {html_file}")
             
             # Read the HTML file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                html_content = file.read()
+            html_content = read_page(file_path)
             
             # Parse HTML
             soup = BeautifulSoup(html_content, 'html.parser')
@@ -71,29 +71,28 @@ def download_article_pdfs():
                 skipped_count += 1
                 continue
                 
+            # Create filename from original PDF link
+            pdf_filename = os.path.basename(urlparse(pdf_link).path)
+            
+            # If filename is not valid, use HTML filename with .pdf extension
+            if not pdf_filename or not pdf_filename.lower().endswith('.pdf'):
+                pdf_filename = os.path.splitext(html_file)[0] + '.pdf'
+            
+            # Save path for PDF
+            pdf_path = os.path.join(pdf_dir, pdf_filename)
+            
+            # Check if PDF already exists
+            if os.path.exists(pdf_path):
+                print(f"  PDF already exists: {pdf_filename}")
+                skipped_count += 1
+                continue
+            
             # Download PDF
             try:
                 print(f"  Downloading PDF from: {pdf_link}")
                 
-                # Create filename from original PDF link
-                pdf_filename = os.path.basename(urlparse(pdf_link).path)
-                
-                # If filename is not valid, use HTML filename with .pdf extension
-                if not pdf_filename or not pdf_filename.lower().endswith('.pdf'):
-                    pdf_filename = os.path.splitext(html_file)[0] + '.pdf'
-                
-                # Save path for PDF
-                pdf_path = os.path.join(pdf_dir, pdf_filename)
-                
-                # Check if PDF already exists
-                if os.path.exists(pdf_path):
-                    print(f"  PDF already exists: {pdf_filename}")
-                    skipped_count += 1
-                    continue
-                
                 # Download the PDF
-                response = requests.get(pdf_link, headers=headers, stream=True)
-                response.raise_for_status()
+                response = fetch(pdf_link, headers=headers, stream=True, priority=PDF)
                 
                 # Save the PDF file
                 with open(pdf_path, 'wb') as pdf_file:
@@ -101,14 +100,16 @@ def download_article_pdfs():
                         if chunk:
                             pdf_file.write(chunk)
                 
+                mark_stage(None, blob=file_path, pdf_path=pdf_path)
                 print(f"  Saved: {pdf_filename}")
                 success_count += 1
                 
                 # Be polite to the server
-                time.sleep(1)
+                pause(1)
                 
             except Exception as e:
                 print(f"  Error downloading PDF: {e}")
+                record_failure(pdf_link, e, pdf_path, binary=True, headers=headers, pdf_of={"blob": file_path})
                 failed_count += 1
                 
         except Exception as e:
@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import argparse
+from corpus_catalog import connect
+from search_index import read_docx_text
+
+# pyarrow is needed to write and scan the columnar export
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Output files of the export
+PARQUET_FILE = "corpus.parquet"
+ARROW_FILE = "corpus.arrow"
+
+# Directories of extracted text that is exported even if the catalog does not know it
+TEXT_DIRS = ["articles_text"]
+
+# Rows per record batch (and Parquet row group)
+BATCH_SIZE = 1000
+
+# Separator written between the metadata header and the body of extracted articles
+HEADER_RULE = "=" * 50
+
+def corpus_schema():
+    """Return the Arrow schema of the export, one row per article"""
+    return pa.schema([
+        ("url", pa.string()),
+        ("site", pa.string()),
+        ("volume", pa.int32()),
+        ("listing_page", pa.string()),
+        ("title", pa.string()),
+        ("date", pa.string()),
+        ("category", pa.string()),
+        ("source_path", pa.string()),
+        ("content_hash", pa.string()),
+        ("text", pa.string()),
+        ("chars", pa.int32()),
+        ("words", pa.int32()),
+        ("paragraphs", pa.int32()),
+    ])
+
+def article_body(text, title=None):
+    """Strip the title and metadata header that extract_articles writes above the text"""
+    lines = text.split('\n')
+    head = lines[:6]
+    if HEADER_RULE in head:
+        lines = lines[head.index(HEADER_RULE) + 1:]
+    elif title and lines and lines[0].strip() == title.strip():
+        lines = lines[1:]
+    return '\n'.join(lines).strip()
+
+def read_article_text(path):
+    """Return the text of an extracted .txt file or a converted .docx"""
+    if path.endswith('.docx'):
+        return '\n'.join(read_docx_text(path))
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+def iter_articles():
+    """Yield one dict per article with text, from the catalog and then from uncatalogued text files"""
+    exported = set()
+    rows = connect().execute(
+        "SELECT url, site, volume, listing_page, title, date, category, content_hash, text_path, docx_path "
+        "FROM articles WHERE text_path IS NOT NULL OR docx_path IS NOT NULL ORDER BY id").fetchall()
+    for row in rows:
+        path = row["text_path"] if row["text_path"] and os.path.exists(row["text_path"]) else row["docx_path"]
+        if not path or not os.path.exists(path):
+            continue
+        exported.add(path)
+        article = dict(row)
+        article["source_path"] = path
+        yield article
+
+    for directory in TEXT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name.endswith('.txt') and path not in exported:
+                yield {"url": None, "site": None, "volume": None, "listing_page": None, "title": None,
+                       "date": None, "category": None, "content_hash": None, "source_path": path}
+
+def make_batch(articles, schema):
+    """Read the texts of a list of articles and build a record batch"""
+    columns = {name: [] for name in schema.names}
+    for article in articles:
+        try:
+            text = read_article_text(article["source_path"])
+        except Exception as e:
+            print(f"Error reading {article['source_path']}: {e}")
+            continue
+        if article["title"] is None:
+            article["title"] = next((line.strip() for line in text.split('\n') if line.strip()), None)
+        body = article_body(text, article["title"])
+        article["text"] = body
+        article["chars"] = len(body)
+        article["words"] = len(body.split())
+        article["paragraphs"] = sum(1 for line in body.split('\n') if line.strip())
+        for name in schema.names:
+            columns[name].append(article.get(name))
+    arrays = [pa.array(columns[field.name], type=field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def iter_batches(schema, batch_size=BATCH_SIZE):
+    """Yield record batches of at most batch_size articles"""
+    pending = []
+    for article in iter_articles():
+        pending.append(article)
+        if len(pending) >= batch_size:
+            yield make_batch(pending, schema)
+            pending = []
+    if pending:
+        yield make_batch(pending, schema)
+
+def export_corpus(output_path, arrow_ipc=False, batch_size=BATCH_SIZE):
+    """Write the corpus to a Parquet or Arrow IPC file batch by batch"""
+    start = time.perf_counter()
+    schema = corpus_schema()
+    tmp_path = output_path + ".tmp"
+    rows = 0
+
+    if arrow_ipc:
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, schema) as writer:
+            for batch in iter_batches(schema, batch_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    else:
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for batch in iter_batches(schema, batch_size):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    os.replace(tmp_path, output_path)
+
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(output_path) / 1e6
+    print(f"Exported {rows} articles to {output_path} ({size_mb:.1f} MB) in {elapsed:.2f}s")
+
+def read_columns(path, columns):
+    """Read only the given columns of an export"""
+    if path.endswith('.arrow'):
+        with pa.memory_map(path) as source:
+            # Memory-mapped batches are zero-copy, so unselected columns are never read
+            return ipc.open_file(source).read_all().select(columns)
+    return pq.read_table(path, columns=columns)
+
+def scan_summary(path):
+    """Print per-site article and word counts, reading only the columns involved"""
+    start = time.perf_counter()
+    table = read_columns(path, ["site", "words"])
+    summary = table.group_by("site").aggregate([("words", "count"), ("words", "sum")])
+    elapsed = time.perf_counter() - start
+    for row in summary.to_pylist():
+        print(f"{row['site'] or '-':24}{row['words_count']:>10} articles{row['words_sum'] or 0:>14,} words")
+    print(f"Scanned {table.num_rows} rows in {elapsed * 1000:.1f} ms")
+
+def main():
+    """Export the corpus, or summarize an existing export"""
+    parser = argparse.ArgumentParser(description="Export the article corpus in a columnar format")
+    parser.add_argument("--ipc", action="store_true", help="write an Arrow IPC file instead of Parquet")
+    parser.add_argument("--output", help="output path")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="articles per record batch")
+    parser.add_argument("--scan", action="store_true", help="summarize the export instead of writing it")
+    args = parser.parse_args()
+
+    if pa is None:
+        print("pyarrow is required for the corpus export: pip install pyarrow")
+        sys.exit(1)
+
+    output = args.output or (ARROW_FILE if args.ipc else PARQUET_FILE)
+    if args.scan:
+        scan_summary(output)
+    else:
+        export_corpus(output, arrow_ipc=args.ipc, batch_size=args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import os
 import re
-import requests
+import sys
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-import time
+from page_archive import list_pages, read_page
+from corpus_catalog import content_hash, mark_stage, record_article, stage_done
+from search_index import index_file
+from urdu_normalize import normalize
+from retry_policy import fetch, pause
 
 def extract_articles(html_file_path, headers=None):
     """Extract individual articles from HTML and save as text files."""
@@ -13,8 +17,7 @@ def extract_articles(html_file_path, headers=None):
     os.makedirs(output_dir, exist_ok=True)
     
     # Read the HTML file
-    with open(html_file_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+    html_content = read_page(html_file_path)
     
     # Parse HTML using BeautifulSoup
     soup = BeautifulSoup(html_content, 'html.parser')
@@ -54,7 +57,7 @@ def process_embedded_articles(soup, page_num, output_dir):
         
         # Get article title
         title_tag = article_div.find('h2')
-        title = title_tag.get_text(strip=True) if title_tag else f"Article {article_id}"
+        title = normalize(title_tag.get_text(strip=True)) if title_tag else f"Article {article_id}"
         
         # Extract full content with formatting
         content_parts = []
@@ -82,8 +85,8 @@ def process_embedded_articles(soup, page_num, output_dir):
                     content_parts.append(f"• {li.get_text(strip=True)}")
                 content_parts.append("")  # Blank line after list
         
-        # Combine content parts into full text
-        full_text = "\n".join(content_parts)
+        # Combine content parts into full text, in canonical form
+        full_text = normalize("\n".join(content_parts))
         
         # Create safe filename
         safe_title = re.sub(r'[\\/*?:"<>|]', '', title)
@@ -95,6 +98,12 @@ def process_embedded_articles(soup, page_num, output_dir):
         with open(filepath, 'w', encoding='utf-8') as out_file:
             out_file.write(full_text)
         
+        # Embedded articles have no page or URL of their own; their text file identifies them
+        record_article(None, stage="extracted",
+                       site="tarjumanulquran.org", listing_page=f"page_{page_num}",
+                       title=title, text_path=filepath)
+        index_file(filepath)
+        
         print(f"Saved: {filename}")
     
     return count
@@ -114,7 +123,7 @@ def process_article_links(soup, page_num, output_dir, headers):
             
         article_url = link['href']
         title_element = link.find('h4')
-        title = title_element.get_text(strip=True) if title_element else f"Article {index}"
+        title = normalize(title_element.get_text(strip=True)) if title_element else f"Article {index}"
         
         # Find date and category if available
         date = ""
@@ -129,16 +138,16 @@ def process_article_links(soup, page_num, output_dir, headers):
     
     # Fetch and save each article
     for article_url, title, date, category, index in article_links:
+        # Articles extracted by an earlier run are not fetched again
+        if stage_done(article_url, "extracted"):
+            print(f"Already extracted article {index} from page {page_num}: {article_url}")
+            continue
+        
         try:
             print(f"Fetching article {index} from page {page_num}: {article_url}")
             
-            # Request the article page
-            if headers:
-                response = requests.get(article_url, headers=headers)
-            else:
-                response = requests.get(article_url)
-                
-            response.raise_for_status()
+            # Request the article page, retrying transient errors
+            response = fetch(article_url, headers=headers)
             article_soup = BeautifulSoup(response.text, 'html.parser')
             
             # Extract article content
@@ -188,8 +197,8 @@ def process_article_links(soup, page_num, output_dir, headers):
                         content_parts.append(f"• {li.get_text(strip=True)}")
                     content_parts.append("")  # Blank line after list
             
-            # Combine content parts into full text
-            full_text = "\n".join(content_parts)
+            # Combine content parts into full text, in canonical form
+            full_text = normalize("\n".join(content_parts))
             
             # Create safe filename from URL
             url_parts = article_url.split('/')
@@ -203,10 +212,16 @@ def process_article_links(soup, page_num, output_dir, headers):
             with open(filepath, 'w', encoding='utf-8') as out_file:
                 out_file.write(full_text)
             
+            record_article(article_url, stage="downloaded", site="tarjumanulquran.org",
+                           listing_page=f"page_{page_num}", title=title, date=date or None,
+                           category=category or None, content_hash=content_hash(response.text))
+            mark_stage("extracted", url=article_url, text_path=filepath)
+            index_file(filepath, url=article_url)
+            
             print(f"Saved: {filename}")
             
             # Be polite to the server
-            time.sleep(1)
+            pause(1)
             
         except Exception as e:
             print(f"Error processing article {article_url}: {e}")
@@ -222,7 +237,7 @@ def process_all_html_files(directory):
     }
     
     # Get all HTML files in the directory
-    html_files = [f for f in os.listdir(directory) if f.endswith('.html') and f.startswith('page_')]
+    html_files = [os.path.basename(p) for p in list_pages(directory) if os.path.basename(p).startswith('page_')]
     
     for html_file in sorted(html_files, key=lambda x: int(x.replace('page_', '').replace('.html', ''))):
         file_path = os.path.join(directory, html_file)
@@ -235,6 +250,9 @@ def process_all_html_files(directory):
 # Path to your HTML files directory
 html_dir = "d:\\pixelpk projects\\tarjumanulquran\\pages"
 
+def main():
+    """Extract the articles listed in the saved listing pages of a directory"""
+    process_all_html_files(sys.argv[1] if len(sys.argv) > 1 else html_dir)
 
-# Process all HTML files or a single file
-process_all_html_files(html_dir)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
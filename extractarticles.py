@@ -1,15 +1,21 @@
 import os
-import time
+import json
 import random
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import re
+from page_archive import get_archive, list_pages, page_exists, read_page, save_page
+from corpus_catalog import content_hash, record_article, stage_done, stored_page
+from seen_urls import canonicalize_url
+from retry_policy import fetch, pause, record_failure
 
 # Input and output directories
 INPUT_DIR = "rasailomasail_html"  # Keep the base directory
 OUTPUT_DIR = "rasailomasail_articles"  # Keep the base directory
 
+# Volume posts listed through the WordPress REST API, saved next to the listing pages
+POSTS_FILE = "wp_posts.json"
+
 # Headers to mimic a browser
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -46,81 +52,93 @@ def get_safe_filename(title, url):
     
     return filename + '.html'
 
-def download_page(url, output_path):
-    """Download a web page and save it to the specified location"""
+def download_page(url, output_path, record=None):
+    """Download a web page and save it to the specified location
+
+    If the download fails it is queued for 'retry_policy.py retry-failed',
+    which records the catalog fields in record once it succeeds.
+    """
     try:
         print(f"Downloading: {url}")
         
         # Add a small random delay to be polite to the server
-        time.sleep(random.uniform(1, 3))
+        pause(random.uniform(1, 3))
         
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()  # Raise exception for 4XX/5XX status codes
+        # Transient errors are retried; 4XX errors are raised at once
+        response = fetch(url, headers=HEADERS, timeout=30)
         
         # Save the HTML content
-        with open(output_path, 'w', encoding='utf-8') as file:
-            file.write(response.text)
+        save_page(output_path, response.text, url=url)
             
         print(f"Saved to: {output_path}")
-        return True
+        return response.text
         
     except Exception as e:
         print(f"Error downloading {url}: {e}")
+        record_failure(url, e, output_path, headers=HEADERS, record=record)
         return False
 
+def listing_files(volume_dir):
+    """Return the saved listing pages of a volume and its REST API post list"""
+    return list_pages(volume_dir) + list_pages(volume_dir, suffix='.json')
+
 def extract_article_links(html_file):
-    """Extract article links and titles from an HTML file"""
+    """Extract article links and titles from an HTML file, or from a saved REST API post list"""
     try:
-        with open(html_file, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        articles = []
-        
-        # Look for entry titles with the specific class structure provided
-        entry_titles = soup.find_all('h2', class_='blog-entry-title')
-        
-        # If not found, try more general entry-title classes
-        if not entry_titles:
-            entry_titles = soup.find_all(['h2', 'h3'], class_=['entry-title', 'post-title'])
-        
-        # If still not found, try any h2 with a link
-        if not entry_titles:
-            entry_titles = [h2 for h2 in soup.find_all('h2') if h2.find('a', href=True)]
+        content = read_page(html_file)
         
-        for title_elem in entry_titles:
-            link_elem = title_elem.find('a', href=True)
-            if link_elem:
-                title = link_elem.get_text(strip=True)
-                url = link_elem['href']
-                articles.append((title, url))
+        if html_file.endswith('.json'):
+            return [(post["title"], post["url"]) for post in json.loads(content)]
         
-        return articles
+        return parse_article_links(content)
     
     except Exception as e:
         print(f"Error extracting links from {html_file}: {e}")
         return []
 
-def process_volume():
-    """Process all HTML pages in volume 5 and extract articles"""
-    volume_num = 5
+def parse_article_links(content):
+    """Extract article links and titles from the HTML of a listing page"""
+    soup = BeautifulSoup(content, 'html.parser')
+    articles = []
+    
+    # Look for entry titles with the specific class structure provided
+    entry_titles = soup.find_all('h2', class_='blog-entry-title')
+    
+    # If not found, try more general entry-title classes
+    if not entry_titles:
+        entry_titles = soup.find_all(['h2', 'h3'], class_=['entry-title', 'post-title'])
+    
+    # If still not found, try any h2 with a link
+    if not entry_titles:
+        entry_titles = [h2 for h2 in soup.find_all('h2') if h2.find('a', href=True)]
+    
+    for title_elem in entry_titles:
+        link_elem = title_elem.find('a', href=True)
+        if link_elem:
+            title = link_elem.get_text(strip=True)
+            url = link_elem['href']
+            articles.append((title, url))
+    
+    return articles
+
+def iter_volume_articles(volume_num=5):
+    """Download the articles of a volume, yielding (title, url, page path) as each one is available
+
+    Articles downloaded by an earlier run are yielded without fetching them again.
+    """
     volume_dir = os.path.join(INPUT_DIR, f"volume_{volume_num:02d}")
     output_dir = os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}")
     
     print(f"\nProcessing Volume {volume_num}...")
     
-    if not os.path.exists(volume_dir):
+    if not os.path.exists(volume_dir) and not get_archive(volume_dir).exists():
         print(f"Volume directory {volume_dir} not found. Skipping.")
         return
     
     # Get all HTML files in the volume directory
-    html_files = [
-        os.path.join(volume_dir, f) 
-        for f in os.listdir(volume_dir) 
-        if f.endswith('.html')
-    ]
+    html_files = listing_files(volume_dir)
     
-    print(f"Found {len(html_files)} HTML pages to process")
+    print(f"Found {len(html_files)} listing pages to process")
     
     # Extract article links from all pages
     all_articles = []
@@ -128,36 +146,56 @@ def process_volume():
     for html_file in html_files:
         articles = extract_article_links(html_file)
         print(f"Found {len(articles)} articles in {os.path.basename(html_file)}")
-        all_articles.extend(articles)
+        all_articles.extend((title, url, os.path.basename(html_file)) for title, url in articles)
     
-    # Remove duplicates (same URL)
+    # Remove duplicates (same canonical URL)
     unique_articles = []
     seen_urls = set()
     
-    for title, url in all_articles:
-        if url not in seen_urls:
-            unique_articles.append((title, url))
-            seen_urls.add(url)
+    for title, url, listing_page in all_articles:
+        key = canonicalize_url(url)
+        if key not in seen_urls:
+            unique_articles.append((title, url, listing_page))
+            seen_urls.add(key)
     
     print(f"Total unique articles found: {len(unique_articles)}")
     
     # Download each article
-    for i, (title, url) in enumerate(unique_articles, 1):
+    for i, (title, url, listing_page) in enumerate(unique_articles, 1):
         filename = get_safe_filename(title, url)
         output_path = os.path.join(output_dir, filename)
         
-        # Skip if already downloaded
-        if os.path.exists(output_path):
-            print(f"[{i}/{len(unique_articles)}] Already exists: {filename}")
+        # Skip if already downloaded; an earlier run may have saved the page
+        # under another index or filename, which the catalog records
+        downloaded = stage_done(url, "downloaded")
+        if downloaded and not page_exists(output_path):
+            recorded = stored_page(url)
+            if recorded and page_exists(recorded):
+                output_path = recorded
+        if page_exists(output_path):
+            print(f"[{i}/{len(unique_articles)}] Already exists: {os.path.basename(output_path)}")
+            yield title, url, output_path
             continue
+        if downloaded:
+            print(f"[{i}/{len(unique_articles)}] Saved page is missing, downloading again: {filename}")
         
         # Download the article
         print(f"[{i}/{len(unique_articles)}] Downloading: {title}")
-        download_page(url, output_path)
+        fields = dict(stage="downloaded", site="rasailomasail.net", volume=volume_num,
+                      title=title, listing_page=listing_page, blob=output_path)
+        content = download_page(url, output_path, fields)
+        if content:
+            record_article(url, content_hash=content_hash(content), **fields)
+            yield title, url, output_path
         
         # Add a small delay between requests
         if i < len(unique_articles):
-            time.sleep(random.uniform(1, 2))
+            pause(random.uniform(1, 2))
+
+def process_volume():
+    """Process all HTML pages in volume 5 and extract articles"""
+    for _ in iter_volume_articles(5):
+        pass
 
 def main():
     """Main function to extract and download articles from volume 5 only"""
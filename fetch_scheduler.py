@@ -0,0 +1,223 @@
+import time
+import heapq
+import argparse
+import importlib
+import itertools
+import threading
+import retry_policy
+from concurrent.futures import ThreadPoolExecutor
+from retry_policy import ARTICLE, LISTING, PDF
+
+# Politeness per host: the least seconds between the starts of two requests,
+# and how many requests may be in flight at once
+HOST_LIMITS = {
+    "www.tarjumanulquran.org": (1.0, 1),
+    "rasailomasail.net": (2.0, 1),
+    "readmaududi.com": (2.0, 1),
+}
+DEFAULT_LIMIT = (1.0, 1)
+
+# Threads running the per-article tasks crawlers hand to the scheduler; they
+# queue at the hosts alongside the listing crawls, so priorities decide the order
+TASK_THREADS = 4
+
+# Crawls started by 'run'. The steps of a chain run one after another, as each
+# reads what the one before saved; chains run side by side, sharing the hosts
+# through the scheduler. Crawlers submit their per-article downloads as tasks,
+# so at each host listing pages go before articles and articles before PDFs.
+CHAINS = {
+    "tarjumanulquran": [("srapper", "scrape_tarjumanulquran", {"incremental": True}),
+                        ("article_scraper", "extract_and_save_articles", {}),
+                        ("download_pdfs", "download_article_pdfs", {})],
+    "rasailomasail": [("rasailomasail", "scrape_volumes", {"incremental": True}),
+                      ("extractarticles", "main", {})],
+    "readmaududi": [("maududi_book_scraper", "extract_and_save_book_pages", {"incremental": True})],
+}
+
+class HostQueue:
+    """Requests waiting for one host, and when the host may be sent the next one"""
+
+    def __init__(self, delay, concurrency):
+        self.delay = delay
+        self.concurrency = concurrency
+        self.waiting = []
+        self.active = 0
+        self.next_start = 0.0
+        self.requests = 0
+        self.waited = 0.0
+
+class FetchScheduler:
+    """Gives the crawler threads of a process their turns at each host
+
+    Every host has its own queue, ordered by priority and then by arrival,
+    with its own spacing and concurrency, so a request only ever waits for
+    requests to the same host and the hosts are crawled side by side.
+    Tasks submitted by the crawlers run on a few threads of their own.
+    """
+
+    def __init__(self, limits=HOST_LIMITS, default=DEFAULT_LIMIT, task_threads=TASK_THREADS):
+        self.limits = limits
+        self.default = default
+        self.hosts = {}
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.tasks = ThreadPoolExecutor(max_workers=task_threads, thread_name_prefix="fetch-task")
+
+    def acquire(self, host, priority=ARTICLE):
+        """Wait until a request to the host may start"""
+        start = time.monotonic()
+        with self.condition:
+            if host not in self.hosts:
+                self.hosts[host] = HostQueue(*self.limits.get(host, self.default))
+            queue = self.hosts[host]
+            ticket = (priority, next(self.sequence))
+            heapq.heappush(queue.waiting, ticket)
+            while True:
+                now = time.monotonic()
+                if queue.waiting[0] != ticket or queue.active >= queue.concurrency:
+                    self.condition.wait()
+                elif now < queue.next_start:
+                    self.condition.wait(queue.next_start - now)
+                else:
+                    break
+            heapq.heappop(queue.waiting)
+            queue.active += 1
+            queue.next_start = now + queue.delay
+            queue.requests += 1
+            queue.waited += now - start
+            # The next request in line can now start waiting for its turn
+            self.condition.notify_all()
+
+    def release(self, host):
+        """Record that a request to the host has been answered"""
+        with self.condition:
+            self.hosts[host].active -= 1
+            self.condition.notify_all()
+
+    def submit(self, function, *args, **kwargs):
+        """Run a crawl task on the task threads and return its future"""
+        return self.tasks.submit(function, *args, **kwargs)
+
+    def close(self):
+        """Wait for the submitted tasks and stop the task threads"""
+        self.tasks.shutdown(wait=True)
+
+    def report(self, elapsed):
+        """Print the requests and waiting time per host"""
+        print(f"\n{'host':32}{'requests':>10}{'per s':>8}{'avg wait s':>12}")
+        total = 0
+        for host, queue in sorted(self.hosts.items()):
+            total += queue.requests
+            wait = queue.waited / queue.requests if queue.requests else 0.0
+            print(f"{host:32}{queue.requests:>10}{queue.requests / elapsed:>8.2f}{wait:>12.2f}")
+        print(f"{'all hosts':32}{total:>10}{total / elapsed:>8.2f}")
+
+def run_chains(names, incremental=True, limits=HOST_LIMITS):
+    """Run the given crawl chains at the same time with their requests going through one scheduler"""
+    chains = {name: [(getattr(importlib.import_module(module_name), function_name),
+                      {k: v and incremental if k == "incremental" else v for k, v in options.items()})
+                     for module_name, function_name, options in CHAINS[name]]
+              for name in names}
+    scheduler = FetchScheduler(limits)
+    durations = {}
+
+    def run_chain(name, steps):
+        start = time.perf_counter()
+        for function, options in steps:
+            try:
+                function(**options)
+            except Exception as e:
+                print(f"[{name}] {function.__module__}.{function.__name__} stopped: {e}")
+                break
+        durations[name] = time.perf_counter() - start
+
+    retry_policy.set_scheduler(scheduler)
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run_chain, args=(name, steps), name=name, daemon=True)
+               for name, steps in chains.items()]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        retry_policy.set_scheduler(None)
+        scheduler.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{'chain':24}{'seconds':>9}")
+    for name in names:
+        print(f"{name:24}{durations.get(name, 0.0):>9.1f}")
+    scheduler.report(elapsed)
+    print(f"\nAll chains finished in {elapsed:.1f}s; one after another they took {sum(durations.values()):.1f}s")
+
+def benchmark(hosts=3, requests_per_class=8, delay=0.1, service=0.02):
+    """Compare crawling local hosts one after another and side by side, and check priority order
+
+    Each host gets requests_per_class listing, article and PDF requests from
+    three crawler threads, and allows one request per delay seconds.
+    """
+    servers = [retry_policy.start_fault_server(lambda path: (200, service, {})) for _ in range(hosts)]
+    roots = [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    limits = {retry_policy.host_of(root): (delay, 1) for root in roots}
+    classes = [(LISTING, "L"), (ARTICLE, "A"), (PDF, "P")]
+
+    def crawl(root, priority, letter, order, lock):
+        for i in range(requests_per_class):
+            retry_policy.fetch(f"{root}/{letter}/{i}", priority=priority, timeout=5)
+            with lock:
+                order.append(letter)
+
+    def run(groups):
+        scheduler = FetchScheduler(limits)
+        retry_policy.set_scheduler(scheduler)
+        orders = {root: [] for root in roots}
+        lock = threading.Lock()
+        start = time.perf_counter()
+        try:
+            for group in groups:
+                threads = [threading.Thread(target=crawl, args=(root, priority, letter, orders[root], lock))
+                           for root in group for priority, letter in classes]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            retry_policy.set_scheduler(None)
+            scheduler.close()
+        return time.perf_counter() - start, orders
+
+    total = hosts * len(classes) * requests_per_class
+    one_by_one, _ = run([[root] for root in roots])
+    side_by_side, orders = run([roots])
+    for server in servers:
+        server.shutdown()
+
+    print(f"{total} requests to {hosts} local hosts, each allowing one request per {delay}s")
+    print(f"\n{'crawl':20}{'seconds':>9}{'requests/s':>12}")
+    print(f"{'one host at a time':20}{one_by_one:>9.1f}{total / one_by_one:>12.1f}")
+    print(f"{'all hosts at once':20}{side_by_side:>9.1f}{total / side_by_side:>12.1f}")
+    print("\nOrder of requests at the first host (L listing, A article, P PDF):")
+    print("  " + "".join(orders[roots[0]]))
+
+def main():
+    """Run the crawlers together through one scheduler, or benchmark the scheduler"""
+    parser = argparse.ArgumentParser(description="Run the crawlers of all sites together, polite to each host")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run crawl chains side by side")
+    run_parser.add_argument("chains", nargs="*", metavar="CHAIN",
+                            help=f"chains to run (default: all): {', '.join(CHAINS)}")
+    run_parser.add_argument("--full", action="store_true", help="crawl every listing page, not only new ones")
+    commands.add_parser("bench", help="measure interleaving and priorities against local servers")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark()
+        return
+    unknown = [name for name in args.chains if name not in CHAINS]
+    if unknown:
+        parser.error(f"unknown chains: {', '.join(unknown)}")
+    run_chains(args.chains or list(CHAINS), incremental=not args.full)
+
+if __name__ == "__main__":
+    main()
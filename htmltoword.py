@@ -1,20 +1,32 @@
 import os
-import glob
+import argparse
+from concurrent.futures import as_completed
 from bs4 import BeautifulSoup
-from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.shared import RGBColor, Pt
+from page_archive import list_pages, read_page
+from corpus_catalog import mark_stage
+from urdu_normalize import fold, normalize
+from near_duplicates import duplicate_of
+from boilerplate import BoilerplateFilter, site_filter
+from worker_pool import get_pool, new_document
 
-def convert_html_to_word(html_path, word_path):
+def drop_boilerplate(p_tags, boilerplate):
+    """Drop the paragraphs repeated across the site from the start and end of a section"""
+    if not boilerplate:
+        return p_tags
+    repeated = boilerplate.edge_boilerplate([p.get_text().strip() for p in p_tags])
+    return [p for i, p in enumerate(p_tags) if i not in repeated]
+
+def convert_html_to_word(html_path, word_path, boilerplate=None):
     # Read the HTML file
-    with open(html_path, 'r', encoding='utf-8') as file:
-        html_content = file.read()
+    html_content = read_page(html_path)
     
     # Parse HTML
     soup = BeautifulSoup(html_content, 'html.parser')
     
     # Create a Word document
-    doc = Document()
+    doc = new_document()
     
     # Set RTL direction for the entire document (for Urdu text)
     for section in doc.sections:
@@ -23,7 +35,7 @@ def convert_html_to_word(html_path, word_path):
     # Find the title
     title_element = soup.find(['h1', 'h2', 'title', 'h3'], class_=['entry-title', 'post-title', 'title'])
     if title_element:
-        title = title_element.get_text(strip=True)
+        title = normalize(title_element.get_text(strip=True))
         heading = doc.add_heading(title, level=1)
         # Set RTL alignment for the title
         for run in heading.runs:
@@ -95,9 +107,11 @@ def convert_html_to_word(html_path, word_path):
         seen = set()
         for p in all_paragraphs:
             p_text = p.get_text().strip()
-            if p_text and p_text not in seen and len(p_text) > 10:
+            key = fold(p_text)
+            if p_text and key not in seen and len(p_text) > 10:
+                seen.add(key)
                 unique_paragraphs.append(p)
-                seen.add(p_text)
+        unique_paragraphs = drop_boilerplate(unique_paragraphs, boilerplate)
         
         print(f"No accordion sections found. Processing {len(unique_paragraphs)} direct paragraphs instead.")
         
@@ -105,7 +119,7 @@ def convert_html_to_word(html_path, word_path):
             p = doc.add_paragraph()
             p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
             
-            text = p_tag.get_text(strip=True)
+            text = normalize(p_tag.get_text(strip=True))
             if not text:
                 continue
                 
@@ -127,7 +141,7 @@ def convert_html_to_word(html_path, word_path):
         # Process accordion sections - title followed by content
         for title, content_div in accordion_sections:
             # Add accordion title as heading
-            heading = doc.add_heading(title, level=2)
+            heading = doc.add_heading(normalize(title), level=2)
             for run in heading.runs:
                 run.font.rtl = True
             heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
@@ -139,9 +153,11 @@ def convert_html_to_word(html_path, word_path):
             
             for p in p_tags:
                 p_text = p.get_text().strip()
-                if p_text and p_text not in seen and len(p_text) > 10:
+                key = fold(p_text)
+                if p_text and key not in seen and len(p_text) > 10:
+                    seen.add(key)
                     unique_paragraphs.append(p)
-                    seen.add(p_text)
+            unique_paragraphs = drop_boilerplate(unique_paragraphs, boilerplate)
             
             print(f"Found {len(unique_paragraphs)} paragraphs in section '{title[:20]}...'")
             
@@ -149,7 +165,7 @@ def convert_html_to_word(html_path, word_path):
                 p = doc.add_paragraph()
                 p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
                 
-                text = p_tag.get_text(strip=True)
+                text = normalize(p_tag.get_text(strip=True))
                 if not text:
                     continue
                     
@@ -180,7 +196,43 @@ def convert_html_to_word(html_path, word_path):
     doc.save(word_path)
     print(f"Converted {html_path} to {word_path}")
 
+def convert_book(html_file, word_folder, boilerplate=None):
+    """Convert one book page to Word, returning the .docx path, or None if it was skipped or failed"""
+    # Get the filename without extension
+    base_name = os.path.basename(html_file)
+    file_name = os.path.splitext(base_name)[0]
+    
+    # Create output Word file path
+    word_file = os.path.join(word_folder, file_name + ".docx")
+    
+    # Skip books that are near-duplicates of another copy
+    canonical = duplicate_of(html_file)
+    if canonical:
+        print(f"Skipping {html_file}: duplicate of {canonical}")
+        return None
+    
+    # Convert HTML to Word
+    try:
+        convert_html_to_word(html_file, word_file, boilerplate)
+        mark_stage("converted", blob=html_file, docx_path=word_file)
+    except Exception as e:
+        print(f"Error converting {html_file}: {e}")
+        return None
+    return word_file
+
+def _convert_job(html_file, word_folder, site):
+    """Convert a book in a pool worker; returns the .docx path and the boilerplate it dropped"""
+    boilerplate = site_filter(site)
+    paragraphs, chars = boilerplate.removed()
+    word_file = convert_book(html_file, word_folder, boilerplate)
+    removed_paragraphs, removed_chars = boilerplate.removed()
+    return word_file, removed_paragraphs - paragraphs, removed_chars - chars
+
 def main():
+    parser = argparse.ArgumentParser(description="Convert readmaududi.com book pages to Word")
+    parser.add_argument("--workers", type=int, help="convert on the shared worker pool with this many processes")
+    args = parser.parse_args()
+    
     # Path to the folder containing HTML files
     html_folder = "maududi_books_html"
     
@@ -190,27 +242,32 @@ def main():
         os.makedirs(word_folder)
     
     # Get all HTML files in the folder
-    html_files = glob.glob(os.path.join(html_folder, "*.html"))
+    html_files = list_pages(html_folder)
+    
+    # Paragraphs repeated across the site are left out
+    boilerplate = BoilerplateFilter("readmaududi.com")
     
     print(f"Found {len(html_files)} HTML files to convert...")
     
     # Convert each HTML file to Word
-    for html_file in html_files:
-        # Get the filename without extension
-        base_name = os.path.basename(html_file)
-        file_name = os.path.splitext(base_name)[0]
-        
-        # Create output Word file path
-        word_file = os.path.join(word_folder, file_name + ".docx")
-        
-        # Convert HTML to Word
-        try:
-            convert_html_to_word(html_file, word_file)
-        except Exception as e:
-            print(f"Error converting {html_file}: {e}")
+    if args.workers:
+        executor = get_pool(args.workers)
+        futures = {executor.submit(_convert_job, html_file, word_folder, boilerplate.site): html_file
+                   for html_file in html_files}
+        for future in as_completed(futures):
+            try:
+                _, paragraphs, chars = future.result()
+            except Exception as e:
+                print(f"Error converting {futures[future]}: {e}")
+                continue
+            boilerplate.add_removed(paragraphs, chars)
+    else:
+        for html_file in html_files:
+            convert_book(html_file, word_folder, boilerplate)
     
+    boilerplate.report()
     print(f"Successfully converted HTML files to Word documents.")
     print(f"Word documents are saved in the '{word_folder}' folder.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,10 +1,19 @@
 import os
-import time
-import requests
+import argparse
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
+from page_archive import save_page
+from corpus_catalog import content_hash, record_article
+from seen_urls import SeenSet, all_known, canonicalize_url
+from retry_policy import LISTING, fetch, pause, record_failure
+from wp_discovery import discover_posts
 
-def extract_and_save_book_pages():
+def extract_and_save_book_pages(incremental=False):
+    """Download the book pages of the category, listed through the REST API or by following its pages
+
+    With incremental, paging stops at the first category page whose books
+    were all downloaded before.
+    """
     # Create directory to store book HTML files
     book_dir = 'maududi_books_html'
     os.makedirs(book_dir, exist_ok=True)
@@ -16,8 +25,55 @@ def extract_and_save_book_pages():
         'Referer': 'https://readmaududi.com/'
     }
     
-    # List to track processed book links
-    processed_books = []
+    # Canonical book links processed in this run, and books saved by any run
+    processed_books = set()
+    downloaded = SeenSet(book_dir)
+    
+    # Download one book page unless it was saved before
+    def process_book(book_url, book_title, listing_url):
+        # Skip if already processed
+        book_key = canonicalize_url(book_url, listing_url)
+        if book_key in processed_books or book_key in downloaded:
+            print(f"Already processed: {book_title}")
+            return
+        
+        processed_books.add(book_key)
+        
+        # Create a safe filename from the book URL
+        book_filename = book_url.strip('/').split('/')[-1]
+        if not book_filename:
+            # Use the second-to-last segment if the last is empty
+            parts = book_url.strip('/').split('/')
+            if len(parts) >= 2:
+                book_filename = parts[-2]
+            else:
+                book_filename = f"book_{len(processed_books)}"
+        
+        book_filename = f"{book_filename}.html"
+        book_path = os.path.join(book_dir, book_filename)
+        
+        # Download the book page
+        print(f"Downloading book: {book_title} from {book_url}")
+        try:
+            book_response = fetch(book_url, headers=headers)
+            
+            # Save the book HTML
+            save_page(book_path, book_response.text, url=book_url)
+            record_article(book_url, stage="downloaded", site="readmaududi.com",
+                           title=book_title, listing_page=listing_url, blob=book_path,
+                           content_hash=content_hash(book_response.text))
+            downloaded.add(book_key)
+            
+            print(f"Saved book HTML to {book_path}")
+            
+            # Be polite to the server
+            pause(2)
+            
+        except Exception as e:
+            print(f"Error downloading book {book_url}: {e}")
+            record_failure(book_url, e, book_path, headers=headers,
+                           record=dict(stage="downloaded", site="readmaududi.com", title=book_title,
+                                       listing_page=listing_url, blob=book_path))
     
     # Function to extract and process books from a category page
     def process_category_page(url):
@@ -25,58 +81,24 @@ def extract_and_save_book_pages():
         
         try:
             # Fetch the category page
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
+            response = fetch(url, headers=headers, priority=LISTING)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # Find all book entry titles
             book_elements = soup.find_all('h3', class_='entry-title')
             print(f"Found {len(book_elements)} book entries on this page")
             
+            # Newer books come first, so a page of known books means the rest is known too
+            book_urls = [urljoin(url, elem.a['href']) for elem in book_elements if elem.a and elem.a.get('href')]
+            if incremental and all_known(book_urls, downloaded):
+                print("No new books on this page; the remaining pages were crawled before")
+                return None
+            
             # Extract book links
             for book_elem in book_elements:
                 link_elem = book_elem.find('a')
                 if link_elem and 'href' in link_elem.attrs:
-                    book_url = link_elem['href']
-                    book_title = link_elem.get_text(strip=True)
-                    
-                    # Skip if already processed
-                    if book_url in processed_books:
-                        print(f"Already processed: {book_title}")
-                        continue
-                    
-                    processed_books.append(book_url)
-                    
-                    # Download the book page
-                    print(f"Downloading book: {book_title} from {book_url}")
-                    try:
-                        book_response = requests.get(book_url, headers=headers)
-                        book_response.raise_for_status()
-                        
-                        # Create a safe filename from the book URL
-                        book_filename = book_url.strip('/').split('/')[-1]
-                        if not book_filename:
-                            # Use the second-to-last segment if the last is empty
-                            parts = book_url.strip('/').split('/')
-                            if len(parts) >= 2:
-                                book_filename = parts[-2]
-                            else:
-                                book_filename = f"book_{len(processed_books)}"
-                        
-                        book_filename = f"{book_filename}.html"
-                        book_path = os.path.join(book_dir, book_filename)
-                        
-                        # Save the book HTML
-                        with open(book_path, 'w', encoding='utf-8') as file:
-                            file.write(book_response.text)
-                        
-                        print(f"Saved book HTML to {book_path}")
-                        
-                        # Be polite to the server
-                        time.sleep(2)
-                        
-                    except Exception as e:
-                        print(f"Error downloading book {book_url}: {e}")
+                    process_book(link_elem['href'], link_elem.get_text(strip=True), url)
             
             # Check for pagination - look for next page link
             next_page_link = None
@@ -95,12 +117,27 @@ def extract_and_save_book_pages():
     # Start with the main category URL
     category_url = "https://readmaududi.com/category/books-syed-maududi/others-books-of-maududi/"
     
-    # Process first page and any subsequent pages
-    next_url = category_url
-    while next_url:
-        next_url = process_category_page(next_url)
+    # The REST API lists the whole category in a request per 100 books;
+    # without it, process the first page and any subsequent pages
+    books = discover_posts(category_url)
+    if books:
+        for book_title, book_url in books:
+            process_book(book_url, book_title, category_url)
+    else:
+        next_url = category_url
+        while next_url:
+            next_url = process_category_page(next_url)
     
-    print(f"Completed! Saved {len(processed_books)} book HTML files")
+    downloaded.save()
+    print(f"Completed! Processed {len(processed_books)} books, {len(downloaded)} book HTML files saved in total")
+
+def main():
+    """Download the readmaududi.com book pages, fully or only what is new since the last crawl"""
+    parser = argparse.ArgumentParser(description="Download the readmaududi.com book pages")
+    parser.add_argument("--incremental", action="store_true",
+                        help="stop at the first category page with no new books")
+    args = parser.parse_args()
+    extract_and_save_book_pages(args.incremental)
 
 if __name__ == "__main__":
-    extract_and_save_book_pages()
\ No newline at end of file
+    main()
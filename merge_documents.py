@@ -1,19 +1,50 @@
 import os
 import glob
+import copy
+import json
+import time
+import argparse
+from concurrent.futures import as_completed
 from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.shared import Pt, RGBColor
 from docx.enum.section import WD_SECTION_START
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx_index import DocxIndex
+from corpus_catalog import mark_stage
+from near_duplicates import docx_duplicate_of
+from worker_pool import get_pool, new_document
 
 # Input and output directories
 INPUT_DIR = "rasailomasail_word"
 OUTPUT_DIR = "rasailomasail_merged"
 
+# Volumes of Rasail-o-Masail and the name of the all-volumes edition
+VOLUME_NUMBERS = range(1, 6)
+OMNIBUS_FILE = "rasailomasail_omnibus.docx"
+
 def create_output_dir():
     """Create output directory if it doesn't exist"""
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
+def volume_output_path(volume_num):
+    """Return the path of the merged document for a volume"""
+    return os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}_merged.docx")
+
+def volume_word_files(volume_dir):
+    """Return the Word documents of a volume, leaving out near-duplicates of other articles"""
+    word_files = []
+    for doc_path in glob.glob(os.path.join(volume_dir, '*.docx')):
+        canonical = docx_duplicate_of(doc_path)
+        if canonical:
+            print(f"Skipping {os.path.basename(doc_path)}: duplicate of {canonical}")
+            continue
+        word_files.append(doc_path)
+    return word_files
+
 def copy_element_formatting(source_paragraph, target_paragraph):
     """Copy formatting from source paragraph to target paragraph"""
     # Copy alignment
@@ -33,35 +64,55 @@ def copy_element_formatting(source_paragraph, target_paragraph):
     target_paragraph.paragraph_format.space_after = source_paragraph.paragraph_format.space_after
     target_paragraph.paragraph_format.line_spacing = source_paragraph.paragraph_format.line_spacing
 
-def merge_volume_documents(volume_num):
-    """Merge all documents in a volume into a single document"""
-    volume_dir = os.path.join(INPUT_DIR, f"volume_{volume_num:02d}")
-    output_file = os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}_merged.docx")
-    
-    print(f"\nMerging documents in Volume {volume_num}...")
-    
-    if not os.path.exists(volume_dir):
-        print(f"Volume directory {volume_dir} not found. Skipping.")
-        return False
-    
-    # Get all Word files in the volume directory
-    word_files = glob.glob(os.path.join(volume_dir, '*.docx'))
-    
-    if not word_files:
-        print(f"No Word documents found in {volume_dir}. Skipping.")
-        return False
-    
-    print(f"Found {len(word_files)} documents to merge")
-    
-    # Create a new document for the merged output
-    merged_doc = Document()
+def manifest_path(volume_num):
+    """Return the path of the manifest recording the sources of a merged volume"""
+    return os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}_merged.json")
+
+def load_manifest(volume_num):
+    """Load the manifest of a merged volume, or None if there is none"""
+    path = manifest_path(volume_num)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_manifest(volume_num, sources):
+    """Save the list of sources included in a merged volume
     
+    Each source is a dict with the article number, path, hash and title.
+    """
+    with open(manifest_path(volume_num), 'w', encoding='utf-8') as file:
+        json.dump({"volume": volume_num, "sources": sources}, file, ensure_ascii=False, indent=2)
+
+def mark_merged(doc_paths):
+    """Record in the corpus catalog that the given articles are in a merged document"""
+    for doc_path in doc_paths:
+        mark_stage("merged", docx_path=doc_path)
+
+def get_article_title(index, doc_path, article_num):
+    """Return the first heading of a document from the metadata index, or a default title"""
+    return index.title(doc_path, default=f"مضمون {article_num}")  # Default title: "Article X" in Urdu
+
+def add_bookmark(paragraph, name, bookmark_id):
+    """Add an empty named bookmark to a paragraph so it can be found again later"""
+    start = OxmlElement('w:bookmarkStart')
+    start.set(qn('w:id'), str(bookmark_id))
+    start.set(qn('w:name'), name)
+    end = OxmlElement('w:bookmarkEnd')
+    end.set(qn('w:id'), str(bookmark_id))
+    paragraph._p.insert(0, start)
+    start.addnext(end)
+
+def add_volume_front_matter(merged_doc, volume_num, part_num=None):
+    """Add the volume title and the table of contents heading"""
     # Configure document for RTL (Urdu)
     for section in merged_doc.sections:
         section.page_width = section.page_width  # This forces page setup to be applied
     
     # Add volume title
     title = f"مجموعہ رسائل و مسائل - جلد {volume_num}"  # "Collection of Rasail-o-Masail - Volume X" in Urdu
+    if part_num is not None:
+        title += f" - حصہ {part_num}"  # " - Part Y" in Urdu
     heading = merged_doc.add_heading(title, level=0)
     for run in heading.runs:
         run.font.rtl = True
@@ -76,126 +127,620 @@ def merge_volume_documents(volume_num):
         run.font.size = Pt(16)
     toc_heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
     
+    # Entries are inserted after the TOC heading when a volume is updated in place
+    add_bookmark(toc_heading, "toc_0", 1)
+
+def add_hyperlink(paragraph, url, text):
+    """Add a run to a paragraph that links to an external file or URL"""
+    r_id = paragraph.part.relate_to(url, RT.HYPERLINK, is_external=True)
+    
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), r_id)
+    
+    new_run = OxmlElement('w:r')
+    rpr = OxmlElement('w:rPr')
+    rstyle = OxmlElement('w:rStyle')
+    rstyle.set(qn('w:val'), 'Hyperlink')
+    rpr.append(rstyle)
+    rpr.append(OxmlElement('w:rtl'))
+    new_run.append(rpr)
+    
+    text_element = OxmlElement('w:t')
+    text_element.text = text
+    new_run.append(text_element)
+    
+    hyperlink.append(new_run)
+    paragraph._p.append(hyperlink)
+    return hyperlink
+
+def add_toc_entry(merged_doc, title, article_num):
+    """Add a table of contents entry for an article"""
+    toc_para = merged_doc.add_paragraph()
+    toc_para.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+    
+    # Add article number
+    run = toc_para.add_run(f"{article_num}. ")
+    run.font.rtl = True
+    
+    # Add article title
+    run = toc_para.add_run(title)
+    run.font.rtl = True
+    
+    add_bookmark(toc_para, f"toc_{article_num}", article_num * 2 + 1)
+    return toc_para
+
+def append_article(merged_doc, doc_path, article_num, article_title, page_break_after):
+    """Append one article with its numbered heading to the merged document"""
+    try:
+        # Add article number and title as a heading
+        article_heading = merged_doc.add_heading(f"{article_num}. {article_title}", level=1)
+        for run in article_heading.runs:
+            run.font.rtl = True
+            run.font.size = Pt(16)
+        article_heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+        add_bookmark(article_heading, f"article_{article_num}", article_num * 2)
+        
+        # Open source document
+        doc = Document(doc_path)
+        
+        # Skip the first heading as we've already added it
+        skip_first_heading = True
+        
+        # Copy all paragraphs from source doc to merged doc
+        for para in doc.paragraphs:
+            # Skip the first heading (title) as we already added it with the article number
+            if skip_first_heading and para.style.name.startswith('Heading'):
+                skip_first_heading = False
+                continue
+            
+            # Copy paragraph with its formatting
+            p = merged_doc.add_paragraph()
+            copy_element_formatting(para, p)
+            
+            # Copy all runs with their formatting
+            for run in para.runs:
+                new_run = p.add_run(run.text)
+                new_run.bold = run.bold
+                new_run.italic = run.italic
+                new_run.underline = run.underline
+                new_run.font.rtl = True  # Ensure RTL direction
+                
+                # Copy font properties
+                if run.font.color.rgb:
+                    new_run.font.color.rgb = run.font.color.rgb
+                if run.font.size:
+                    new_run.font.size = run.font.size
+        
+    except Exception as e:
+        print(f"Error processing document {doc_path}: {e}")
+        # Add error note in the merged document
+        p = merged_doc.add_paragraph()
+        p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+        run = p.add_run(f"Error including document: {os.path.basename(doc_path)}")
+        run.font.rtl = True
+        run.font.color.rgb = RGBColor(255, 0, 0)  # Red text for error
+    
+    # Add a page break between articles
+    if page_break_after:
+        merged_doc.add_page_break()
+
+def merge_volume_documents(volume_num, index=None):
+    """Merge all documents in a volume into a single document
+    
+    Given an index, titles and hashes are added to it and the caller saves
+    it; otherwise the volume uses and saves its own.
+    """
+    volume_dir = os.path.join(INPUT_DIR, f"volume_{volume_num:02d}")
+    output_file = volume_output_path(volume_num)
+    
+    print(f"\nMerging documents in Volume {volume_num}...")
+    
+    if not os.path.exists(volume_dir):
+        print(f"Volume directory {volume_dir} not found. Skipping.")
+        return False
+    
+    # Get all Word files in the volume directory
+    word_files = volume_word_files(volume_dir)
+    
+    if not word_files:
+        print(f"No Word documents found in {volume_dir}. Skipping.")
+        return False
+    
+    print(f"Found {len(word_files)} documents to merge")
+    
+    # Create a new document for the merged output
+    merged_doc = new_document()
+    add_volume_front_matter(merged_doc, volume_num)
+    
     # Create table of contents
     toc = []
     
     # First pass: collect all article titles for table of contents
     print("Building table of contents...")
+    own_index = index is None
+    if own_index:
+        index = DocxIndex()
     for i, doc_path in enumerate(word_files, 1):
-        try:
-            doc = Document(doc_path)
-            
-            # Get the first heading as the title
-            title = f"مضمون {i}"  # Default title: "Article X" in Urdu
-            for para in doc.paragraphs:
-                if para.style.name.startswith('Heading'):
-                    title = para.text
-                    break
-            
-            # Add to TOC list
-            toc.append((title, i))
-            
-        except Exception as e:
-            print(f"Error reading document {doc_path}: {e}")
-            toc.append((f"مضمون {i}", i))  # Add default entry in case of error
+        toc.append((get_article_title(index, doc_path, i), i))
     
     # Add table of contents entries
     for title, article_num in toc:
-        toc_para = merged_doc.add_paragraph()
-        toc_para.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
-        
-        # Add article number
-        run = toc_para.add_run(f"{article_num}. ")
-        run.font.rtl = True
-        
-        # Add article title
-        run = toc_para.add_run(title)
-        run.font.rtl = True
+        add_toc_entry(merged_doc, title, article_num)
     
     # Add a page break after TOC
     merged_doc.add_page_break()
     
     # Second pass: merge documents
     print("Merging documents...")
+    sources = []
     for i, doc_path in enumerate(word_files, 1):
-        try:
-            # Add article number and title as a heading
-            article_title = toc[i-1][0]
-            article_heading = merged_doc.add_heading(f"{i}. {article_title}", level=1)
-            for run in article_heading.runs:
-                run.font.rtl = True
-                run.font.size = Pt(16)
-            article_heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
-            
-            # Open source document
-            doc = Document(doc_path)
-            
-            # Skip the first heading as we've already added it
-            skip_first_heading = True
-            
-            # Copy all paragraphs from source doc to merged doc
-            for para in doc.paragraphs:
-                # Skip the first heading (title) as we already added it with the article number
-                if skip_first_heading and para.style.name.startswith('Heading'):
-                    skip_first_heading = False
-                    continue
-                
-                # Copy paragraph with its formatting
-                p = merged_doc.add_paragraph()
-                copy_element_formatting(para, p)
-                
-                # Copy all runs with their formatting
-                for run in para.runs:
-                    new_run = p.add_run(run.text)
-                    new_run.bold = run.bold
-                    new_run.italic = run.italic
-                    new_run.underline = run.underline
-                    new_run.font.rtl = True  # Ensure RTL direction
-                    
-                    # Copy font properties
-                    if run.font.color.rgb:
-                        new_run.font.color.rgb = run.font.color.rgb
-                    if run.font.size:
-                        new_run.font.size = run.font.size
-            
-            # Add a page break between articles
-            if i < len(word_files):
-                merged_doc.add_page_break()
-            
-            print(f"Added article {i}/{len(word_files)}: {os.path.basename(doc_path)}")
-            
-        except Exception as e:
-            print(f"Error processing document {doc_path}: {e}")
-            # Add error note in the merged document
-            p = merged_doc.add_paragraph()
-            p.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
-            run = p.add_run(f"Error including document: {os.path.basename(doc_path)}")
-            run.font.rtl = True
-            run.font.color.rgb = RGBColor(255, 0, 0)  # Red text for error
-            
-            # Add a page break before continuing to the next document
-            if i < len(word_files):
-                merged_doc.add_page_break()
+        article_title = toc[i-1][0]
+        append_article(merged_doc, doc_path, i, article_title, page_break_after=i < len(word_files))
+        sources.append({"number": i, "path": doc_path, "hash": index.hash(doc_path), "title": article_title})
+        print(f"Added article {i}/{len(word_files)}: {os.path.basename(doc_path)}")
     
     # Save the merged document
     merged_doc.save(output_file)
+    save_manifest(volume_num, sources)
+    if own_index:
+        index.save()
+    mark_merged(word_files)
     print(f"Successfully created merged document: {output_file}")
     return True
 
+def _bookmarked_elements(merged_doc, prefix):
+    """Map article numbers to the body elements carrying a bookmark with the given prefix"""
+    found = {}
+    for element in merged_doc.element.body.iterchildren():
+        for name in element.xpath('./w:bookmarkStart/@w:name'):
+            if name.startswith(prefix):
+                found[int(name[len(prefix):])] = element
+    return found
+
+def _is_page_break(element):
+    """Check whether a body element is a page break paragraph"""
+    return bool(element.xpath('./w:r/w:br[@w:type="page"]')) and not element.xpath('./w:r/w:t')
+
+def _article_region(heading_element):
+    """Return the body elements of an article, from its heading up to the next article"""
+    region = [heading_element]
+    element = heading_element.getnext()
+    while element is not None and not element.tag.endswith('}sectPr'):
+        if element.xpath('./w:bookmarkStart[starts-with(@w:name, "article_")]'):
+            break
+        region.append(element)
+        element = element.getnext()
+    return region
+
+def _render_elements(render):
+    """Build content in a scratch document and return its body elements"""
+    scratch = new_document()
+    render(scratch)
+    return [e for e in scratch.element.body.iterchildren() if not e.tag.endswith('}sectPr')]
+
+def start_volume_document(volume_num):
+    """Return an empty merged volume with its front matter, and its TOC entries for append_new_article"""
+    merged_doc = new_document()
+    add_volume_front_matter(merged_doc, volume_num)
+    merged_doc.add_page_break()
+    return merged_doc, _bookmarked_elements(merged_doc, "toc_")
+
+def append_new_article(merged_doc, toc_entries, doc_path, number, title):
+    """Append an article at the end of a merged volume and add its table of contents entry
+    
+    toc_entries maps article numbers to the TOC paragraphs already in the
+    document (see _bookmarked_elements) and is updated with the new entry.
+    """
+    new_entry = _render_elements(lambda doc: add_toc_entry(doc, title, number))[0]
+    if toc_entries:
+        toc_entries[max(toc_entries)].addnext(new_entry)
+    toc_entries[number] = new_entry
+    
+    # Keep articles separated by page breaks
+    body = merged_doc.element.body
+    last = body.sectPr.getprevious() if body.sectPr is not None else body[-1]
+    if last is not None and not _is_page_break(last):
+        merged_doc.add_page_break()
+    
+    append_article(merged_doc, doc_path, number, title, page_break_after=False)
+
+def update_volume_document(volume_num):
+    """Incrementally update a merged volume with new, changed and removed articles
+    
+    The manifest written next to the merged document records the path and
+    hash of every source. Only sources that are new or whose hash changed
+    are read; their content and table of contents entries are replaced in
+    place, and new articles are appended at the end. Falls back to a full
+    merge when there is no manifest or merged document yet.
+    """
+    volume_dir = os.path.join(INPUT_DIR, f"volume_{volume_num:02d}")
+    output_file = volume_output_path(volume_num)
+    manifest = load_manifest(volume_num)
+    
+    print(f"\nUpdating merged document for Volume {volume_num}...")
+    
+    if manifest is None or not os.path.exists(output_file):
+        print("No previous merge found. Running a full merge.")
+        return merge_volume_documents(volume_num)
+    
+    word_files = volume_word_files(volume_dir)
+    known = {source["path"]: source for source in manifest["sources"]}
+    index = DocxIndex()
+    
+    # Classify sources by comparing hashes with the manifest
+    added, changed = [], []
+    current_hashes = {}
+    for doc_path in word_files:
+        current_hashes[doc_path] = index.hash(doc_path)
+        source = known.get(doc_path)
+        if source is None:
+            added.append(doc_path)
+        elif source["hash"] != current_hashes[doc_path]:
+            changed.append(source)
+    removed = [source for path, source in known.items() if path not in current_hashes]
+    
+    print(f"{len(added)} new, {len(changed)} changed, {len(removed)} removed, "
+          f"{len(word_files) - len(added) - len(changed)} unchanged")
+    
+    if not (added or changed or removed):
+        index.save()
+        print("Merged document is up to date.")
+        return True
+    
+    merged_doc = Document(output_file)
+    toc_entries = _bookmarked_elements(merged_doc, "toc_")
+    headings = _bookmarked_elements(merged_doc, "article_")
+    
+    # Drop removed articles and their table of contents entries
+    for source in removed:
+        number = source["number"]
+        if number in headings:
+            for element in _article_region(headings.pop(number)):
+                element.getparent().remove(element)
+        if number in toc_entries:
+            toc_entries[number].getparent().remove(toc_entries.pop(number))
+        print(f"Removed article {number}: {os.path.basename(source['path'])}")
+    
+    # Replace changed articles in place
+    for source in changed:
+        number, doc_path = source["number"], source["path"]
+        title = index.title(doc_path, default=source["title"])
+        
+        if number in toc_entries:
+            old_entry = toc_entries[number]
+            new_entry = _render_elements(lambda doc: add_toc_entry(doc, title, number))[0]
+            old_entry.addprevious(new_entry)
+            old_entry.getparent().remove(old_entry)
+            toc_entries[number] = new_entry
+        
+        if number in headings:
+            region = _article_region(headings[number])
+            page_break_after = _is_page_break(region[-1])
+            new_elements = _render_elements(
+                lambda doc: append_article(doc, doc_path, number, title, page_break_after))
+            for element in new_elements:
+                region[0].addprevious(element)
+            for element in region:
+                element.getparent().remove(element)
+            headings[number] = new_elements[0]
+        
+        source.update(hash=current_hashes[doc_path], title=title)
+        print(f"Updated article {number}: {os.path.basename(doc_path)}")
+    
+    # Append new articles after the last one and extend the table of contents
+    next_number = max([s["number"] for s in manifest["sources"]], default=0) + 1
+    for doc_path in added:
+        number = next_number
+        next_number += 1
+        title = get_article_title(index, doc_path, number)
+        append_new_article(merged_doc, toc_entries, doc_path, number, title)
+        manifest["sources"].append({"number": number, "path": doc_path,
+                                    "hash": current_hashes[doc_path], "title": title})
+        print(f"Appended article {number}: {os.path.basename(doc_path)}")
+    
+    removed_paths = {source["path"] for source in removed}
+    manifest["sources"] = [s for s in manifest["sources"] if s["path"] not in removed_paths]
+    
+    merged_doc.save(output_file)
+    save_manifest(volume_num, manifest["sources"])
+    index.save()
+    mark_merged(added + [source["path"] for source in changed])
+    print(f"Successfully updated merged document: {output_file}")
+    return True
+
+def _merge_volume_worker(volume_num):
+    """Merge one volume in a worker process and report how long it took and what it added to the index"""
+    start = time.perf_counter()
+    index = DocxIndex()
+    ok = merge_volume_documents(volume_num, index)
+    return volume_num, ok, time.perf_counter() - start, index.changes()
+
+def merge_all_volumes(max_workers=None):
+    """Merge all volumes concurrently in a process pool
+    
+    Each volume is independent, so the wall-clock time is close to that of
+    the largest volume. Returns the list of volume numbers merged successfully.
+    """
+    create_output_dir()
+    
+    merged = []
+    start = time.perf_counter()
+    index = DocxIndex()
+    executor = get_pool(max_workers)
+    futures = {executor.submit(_merge_volume_worker, n): n for n in VOLUME_NUMBERS}
+    for future in as_completed(futures):
+        try:
+            volume_num, ok, elapsed, changes = future.result()
+        except Exception as e:
+            print(f"Error merging volume {futures[future]}: {e}")
+            continue
+        index.add_changes(changes)
+        print(f"Volume {volume_num} finished in {elapsed:.1f}s ({'ok' if ok else 'skipped'})")
+        if ok:
+            merged.append(volume_num)
+    index.save()
+    
+    print(f"All volumes merged in {time.perf_counter() - start:.1f}s")
+    return sorted(merged)
+
+def part_output_path(volume_num, part_num):
+    """Return the path of one part of a split volume"""
+    return os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}_part_{part_num:02d}.docx")
+
+def index_output_path(volume_num):
+    """Return the path of the master index of a split volume"""
+    return os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}_index.docx")
+
+def plan_parts(word_files, max_articles=None, max_bytes=None):
+    """Split a volume's articles into parts bounded by article count and source size
+    
+    A new part is started once adding the next article would exceed either
+    limit; the byte budget is measured on the source .docx files. Returns
+    a list of parts, each a list of (article_num, path) tuples.
+    """
+    parts = [[]]
+    part_bytes = 0
+    for i, doc_path in enumerate(word_files, 1):
+        size = os.path.getsize(doc_path)
+        current = parts[-1]
+        if current and ((max_articles and len(current) >= max_articles) or
+                        (max_bytes and part_bytes + size > max_bytes)):
+            parts.append([])
+            part_bytes = 0
+        parts[-1].append((i, doc_path))
+        part_bytes += size
+    return [part for part in parts if part]
+
+def merge_part(volume_num, part_num, entries):
+    """Merge one part of a split volume and return the titles of its articles and what it added to the index"""
+    merged_doc = new_document()
+    add_volume_front_matter(merged_doc, volume_num, part_num)
+    
+    index = DocxIndex()
+    toc = [(article_num, doc_path, get_article_title(index, doc_path, article_num))
+           for article_num, doc_path in entries]
+    
+    for article_num, _, title in toc:
+        add_toc_entry(merged_doc, title, article_num)
+    merged_doc.add_page_break()
+    
+    for i, (article_num, doc_path, title) in enumerate(toc, 1):
+        append_article(merged_doc, doc_path, article_num, title, page_break_after=i < len(toc))
+    
+    merged_doc.save(part_output_path(volume_num, part_num))
+    mark_merged(doc_path for _, doc_path in entries)
+    return part_num, [(article_num, title) for article_num, _, title in toc], index.changes()
+
+def write_split_index(volume_num, part_titles):
+    """Write the master index listing every article with the part it lives in
+    
+    Each entry links to the article's bookmark in its part file.
+    """
+    index_doc = Document()
+    
+    title = f"مجموعہ رسائل و مسائل - جلد {volume_num}"  # "Collection of Rasail-o-Masail - Volume X" in Urdu
+    heading = index_doc.add_heading(title, level=0)
+    for run in heading.runs:
+        run.font.rtl = True
+        run.font.size = Pt(20)
+        run.bold = True
+    heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+    
+    for part_num in sorted(part_titles):
+        part_file = os.path.basename(part_output_path(volume_num, part_num))
+        
+        part_heading = index_doc.add_heading(level=1)
+        part_heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+        add_hyperlink(part_heading, part_file, f"حصہ {part_num}")  # "Part Y" in Urdu
+        
+        for article_num, article_title in part_titles[part_num]:
+            entry = index_doc.add_paragraph()
+            entry.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+            add_hyperlink(entry, f"{part_file}#article_{article_num}", f"{article_num}. {article_title}")
+    
+    index_doc.save(index_output_path(volume_num))
+
+def merge_volume_split(volume_num, max_articles=None, max_bytes=None, max_workers=None):
+    """Merge a volume into size-bounded parts generated in parallel, plus a master index"""
+    volume_dir = os.path.join(INPUT_DIR, f"volume_{volume_num:02d}")
+    
+    print(f"\nMerging Volume {volume_num} into parts...")
+    
+    word_files = volume_word_files(volume_dir)
+    if not word_files:
+        print(f"No Word documents found in {volume_dir}. Skipping.")
+        return False
+    
+    parts = plan_parts(word_files, max_articles, max_bytes)
+    print(f"Splitting {len(word_files)} documents into {len(parts)} parts")
+    
+    part_titles = {}
+    index = DocxIndex()
+    executor = get_pool(max_workers)
+    futures = {executor.submit(merge_part, volume_num, part_num, entries): part_num
+               for part_num, entries in enumerate(parts, 1)}
+    for future in as_completed(futures):
+        try:
+            part_num, titles, changes = future.result()
+        except Exception as e:
+            print(f"Error merging part {futures[future]}: {e}")
+            continue
+        index.add_changes(changes)
+        part_titles[part_num] = titles
+        print(f"Created part {part_num}: {len(titles)} articles")
+    
+    index.save()
+    write_split_index(volume_num, part_titles)
+    print(f"Successfully created {len(part_titles)} parts and index: {index_output_path(volume_num)}")
+    return len(part_titles) == len(parts)
+
+def rename_bookmarks(element, prefix, id_offset):
+    """Prefix the bookmark names and link anchors in a copied element and shift its bookmark ids
+
+    Returns the highest bookmark id in the element after the shift, or -1.
+    """
+    highest = -1
+    for bookmark in element.iter(qn('w:bookmarkStart'), qn('w:bookmarkEnd')):
+        bookmark_id = int(bookmark.get(qn('w:id'))) + id_offset
+        bookmark.set(qn('w:id'), str(bookmark_id))
+        highest = max(highest, bookmark_id)
+        name = bookmark.get(qn('w:name'))
+        if name is not None:
+            bookmark.set(qn('w:name'), prefix + name)
+    for hyperlink in element.iter(qn('w:hyperlink')):
+        anchor = hyperlink.get(qn('w:anchor'))
+        if anchor:
+            hyperlink.set(qn('w:anchor'), prefix + anchor)
+    return highest
+
+def append_document_body(target_doc, source_doc, bookmark_prefix=None, id_offset=0):
+    """Append the body of source_doc to target_doc, keeping the target's section settings
+    
+    With bookmark_prefix, bookmark names get the prefix and ids are shifted
+    by id_offset, so documents sharing bookmark names (article_1, toc_1, ...)
+    can be combined. Returns the highest bookmark id appended, or -1.
+    """
+    target_body = target_doc.element.body
+    target_sectpr = target_body.sectPr
+    highest = -1
+    
+    for element in source_doc.element.body.iterchildren():
+        # Each document carries its own trailing section properties; skip them
+        if element.tag.endswith('}sectPr'):
+            continue
+        new_element = copy.deepcopy(element)
+        if bookmark_prefix is not None:
+            highest = max(highest, rename_bookmarks(new_element, bookmark_prefix, id_offset))
+        if target_sectpr is not None:
+            target_sectpr.addprevious(new_element)
+        else:
+            target_body.append(new_element)
+    return highest
+
+def build_omnibus(volume_nums=VOLUME_NUMBERS):
+    """Assemble a single all-volumes document from the merged volume documents
+    
+    The per-volume results are copied, so the source articles are not read
+    again; their bookmarks are renamed per volume (v1_article_1, ...) so
+    every name and id stays unique.
+    """
+    output_file = os.path.join(OUTPUT_DIR, OMNIBUS_FILE)
+    volume_files = [(n, volume_output_path(n)) for n in volume_nums
+                    if os.path.exists(volume_output_path(n))]
+    
+    print("\nBuilding omnibus edition...")
+    
+    if not volume_files:
+        print("No merged volume documents found. Skipping omnibus.")
+        return False
+    
+    omnibus = Document()
+    
+    # Add omnibus title
+    title = "مجموعہ رسائل و مسائل - مکمل"  # "Collection of Rasail-o-Masail - Complete" in Urdu
+    heading = omnibus.add_heading(title, level=0)
+    for run in heading.runs:
+        run.font.rtl = True
+        run.font.size = Pt(20)
+        run.bold = True
+    heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+    
+    # Add a list of the included volumes
+    toc_heading = omnibus.add_heading("فہرست جلدیں", level=1)  # "List of Volumes" in Urdu
+    for run in toc_heading.runs:
+        run.font.rtl = True
+        run.font.size = Pt(16)
+    toc_heading.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+    
+    for volume_num, _ in volume_files:
+        toc_para = omnibus.add_paragraph()
+        toc_para.alignment = WD_PARAGRAPH_ALIGNMENT.RIGHT
+        run = toc_para.add_run(f"جلد {volume_num}")
+        run.font.rtl = True
+    
+    # Append each merged volume, starting every volume on a new page
+    next_id = 0
+    for volume_num, volume_file in volume_files:
+        omnibus.add_page_break()
+        try:
+            highest = append_document_body(omnibus, Document(volume_file), f"v{volume_num}_", next_id)
+            next_id = max(next_id, highest + 1)
+            print(f"Added volume {volume_num}: {os.path.basename(volume_file)}")
+        except Exception as e:
+            print(f"Error adding volume {volume_file}: {e}")
+    
+    omnibus.save(output_file)
+    print(f"Successfully created omnibus document: {output_file}")
+    return True
+
 def main():
     """Main function to merge Word documents by volume"""
+    parser = argparse.ArgumentParser(description="Merge Rasail-o-Masail Word documents by volume")
+    parser.add_argument("--sequential", action="store_true",
+                        help="merge volumes one after another in this process")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes for parallel merging")
+    parser.add_argument("--omnibus", action="store_true",
+                        help="also build a single all-volumes document")
+    parser.add_argument("--optimize", action="store_true",
+                        help="coalesce runs and deduplicate formatting in the merged documents")
+    parser.add_argument("--split-articles", type=int, default=None,
+                        help="split each volume into parts of at most this many articles")
+    parser.add_argument("--split-bytes", type=int, default=None,
+                        help="split each volume into parts of at most this many source bytes")
+    args = parser.parse_args()
+    
     print("Starting to merge Word documents by volume...")
     
     # Create output directory
     create_output_dir()
     
+    if args.split_articles or args.split_bytes:
+        split = [n for n in VOLUME_NUMBERS
+                 if merge_volume_split(n, args.split_articles, args.split_bytes, args.workers)]
+        print(f"\nSplitting complete! {len(split)}/{len(VOLUME_NUMBERS)} volumes split into parts.")
+        print(f"Merged documents are saved in the '{OUTPUT_DIR}' folder.")
+        return
+    
     # Process each volume
-    successful = 0
-    for volume_num in range(1, 6):
-        if merge_volume_documents(volume_num):
-            successful += 1
+    if args.sequential:
+        merged = [n for n in VOLUME_NUMBERS if merge_volume_documents(n)]
+    else:
+        merged = merge_all_volumes(max_workers=args.workers)
+    
+    print(f"\nMerging complete! {len(merged)}/{len(VOLUME_NUMBERS)} volume documents created successfully.")
+    
+    if args.omnibus:
+        build_omnibus(merged)
+    
+    if args.optimize:
+        from optimize_docx import optimize_with_report
+        outputs = [volume_output_path(n) for n in merged]
+        if args.omnibus and os.path.exists(os.path.join(OUTPUT_DIR, OMNIBUS_FILE)):
+            outputs.append(os.path.join(OUTPUT_DIR, OMNIBUS_FILE))
+        for path in outputs:
+            optimize_with_report(path)
     
-    print(f"\nMerging complete! {successful}/5 volume documents created successfully.")
     print(f"Merged documents are saved in the '{OUTPUT_DIR}' folder.")
 
 if __name__ == "__main__":
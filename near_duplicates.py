@@ -0,0 +1,315 @@
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import numpy as np
+from bs4 import BeautifulSoup
+from page_archive import iter_pages
+from urdu_normalize import fold
+
+# SQLite database holding cached signatures and the duplicate clusters
+DUPLICATES_FILE = "near_duplicates.db"
+
+# Sources compared for duplicates, in order of preference for the copy that is kept.
+# Rasail-o-Masail comes first so its volumes never lose an article to another site.
+SOURCE_DIRS = [
+    "rasailomasail_articles/volume_05",
+    "articles",
+    "article_html_files",
+    "maududi_books_html",
+    "readmaududi_scrape/books",
+    "articles_text",
+]
+
+# Source directories holding extracted text rather than HTML pages
+TEXT_DIRS = {"articles_text"}
+
+# MinHash parameters: 128 permutations split into 16 LSH bands of 8 rows,
+# which makes pairs above roughly 0.7 Jaccard similarity likely candidates
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity of word shingles above which two texts are duplicates
+THRESHOLD = 0.8
+
+# Words per shingle, and shingles hashed per block to bound memory on long books
+SHINGLE_SIZE = 5
+BLOCK_SIZE = 8192
+
+# Bumped whenever page_text or the signature format changes, so cached signatures are recomputed
+TEXT_VERSION = 3
+
+# Elements holding the article itself, tried in order, as the Word converters look for them
+CONTENT_SELECTORS = [
+    ('div', {'class_': 'entry-content'}),
+    ('div', {'class_': 'post-content'}),
+    ('div', {'class_': 'article-content'}),
+    ('div', {'class_': 'content'}),
+    ('article', {}),
+    ('main', {}),
+]
+
+# Universal hash functions (a * x + b) mod PRIME over 32-bit shingle hashes. With
+# a, b and x below 2^32, a * x + b stays below 2^64 and never wraps in uint64;
+# the results reach up to PRIME - 1 > 2^32, so signatures are kept as uint64
+PRIME = (1 << 32) + 15
+_rng = np.random.RandomState(20240501)
+HASH_A = _rng.randint(1, 1 << 32, size=(NUM_PERM, 1), dtype=np.uint64)
+HASH_B = _rng.randint(0, 1 << 32, size=(NUM_PERM, 1), dtype=np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    content_hash TEXT PRIMARY KEY,
+    words INTEGER,
+    signature BLOB
+);
+CREATE TABLE IF NOT EXISTS duplicates (
+    path TEXT PRIMARY KEY,
+    canonical TEXT NOT NULL,
+    similarity REAL
+);
+"""
+
+def connect(path=DUPLICATES_FILE):
+    """Open the duplicates database, creating the schema on first use"""
+    connection = sqlite3.connect(path, timeout=30)
+    connection.executescript(SCHEMA)
+    return connection
+
+def content_area(soup):
+    """Return the element holding a page's article, or its body without navigation and sidebars"""
+    for selector, attrs in CONTENT_SELECTORS:
+        content = soup.find(selector, **attrs)
+        if content:
+            return content
+    content = soup.body or soup
+    for unwanted in content.find_all(['nav', 'header', 'footer', 'aside', 'script', 'style',
+                                      'meta', 'link', 'form', 'iframe', 'ins']):
+        unwanted.decompose()
+    return content
+
+def page_text(content, path):
+    """Return the article text of a stored page or text file
+
+    Sidebars, footers and related-post lists are shared by a whole site and
+    would make short articles look alike, so only the article is compared:
+    the accordion sections of book pages, or else the content area.
+    """
+    text = str(content, 'utf-8')
+    if path.endswith('.txt'):
+        return text
+    soup = BeautifulSoup(text, 'html.parser')
+    sections = soup.find_all('div', class_='accordion-desc') or [content_area(soup)]
+    paragraphs = [p.get_text(' ', strip=True) for section in sections for p in section.find_all('p')]
+    return '\n'.join(paragraphs) if paragraphs else ' '.join(section.get_text(' ') for section in sections)
+
+def minhash_signature(words):
+    """Return the MinHash signature of a text's word shingles as uint64 values"""
+    count = max(1, len(words) - SHINGLE_SIZE + 1)
+    shingles = np.unique(np.fromiter(
+        (zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8')) for i in range(count)),
+        dtype=np.uint64, count=count)) % PRIME
+
+    signature = np.full(NUM_PERM, PRIME, dtype=np.uint64)
+    for start in range(0, len(shingles), BLOCK_SIZE):
+        block = shingles[start:start + BLOCK_SIZE]
+        np.minimum(signature, ((HASH_A * block + HASH_B) % PRIME).min(axis=1), out=signature)
+    return signature
+
+def pages_with_text():
+    """Return the text files extracted from articles whose page is stored as well"""
+    from corpus_catalog import connect as catalog_connect
+
+    rows = catalog_connect().execute(
+        "SELECT text_path FROM articles WHERE text_path IS NOT NULL AND blob IS NOT NULL")
+    return {os.path.normpath(text_path) for (text_path,) in rows}
+
+def iter_sources(directories):
+    """Yield (path, content) for every stored page and text file in the directories
+
+    A text file extracted from a stored page is left out, as the page is
+    compared already and the two would only match each other.
+    """
+    skipped = pages_with_text() if TEXT_DIRS.intersection(directories) else set()
+    for directory in directories:
+        if directory not in TEXT_DIRS:
+            yield from iter_pages(directory, '.html')
+            continue
+        for path, content in iter_pages(directory, '.txt'):
+            if os.path.normpath(path) not in skipped:
+                yield path, content
+
+def load_signatures(connection, directories):
+    """Return paths, signatures and word counts, computing signatures only for new content"""
+    paths, signatures, lengths = [], [], []
+    computed = 0
+    for path, content in iter_sources(directories):
+        digest = f"{hashlib.sha256(content).hexdigest()}-{TEXT_VERSION}"
+        row = connection.execute("SELECT words, signature FROM signatures WHERE content_hash = ?",
+                                 (digest,)).fetchone()
+        if row is None:
+            try:
+                words = fold(page_text(content, path)).split()
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+                continue
+            if not words:
+                continue
+            row = (len(words), minhash_signature(words).tobytes())
+            connection.execute("INSERT INTO signatures (content_hash, words, signature) VALUES (?, ?, ?)",
+                               (digest, row[0], row[1]))
+            computed += 1
+        paths.append(path)
+        lengths.append(row[0])
+        signatures.append(np.frombuffer(row[1], dtype=np.uint64))
+    connection.commit()
+    print(f"Loaded {len(paths)} texts ({computed} new signatures)")
+    return paths, signatures, lengths
+
+def find_clusters(signatures):
+    """Group near-duplicate texts with LSH banding and union-find, returning lists of indexes"""
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for i, signature in enumerate(signatures):
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            buckets.setdefault(key, []).append(i)
+
+    # Members of a bucket are compared with its first member only, so the
+    # work stays linear in the bucket size; copies that differ from it are
+    # still joined through the other bands they share
+    for members in buckets.values():
+        first = members[0]
+        for j in members[1:]:
+            if find(first) == find(j):
+                continue
+            if np.count_nonzero(signatures[first] == signatures[j]) / NUM_PERM >= THRESHOLD:
+                parent[find(j)] = find(first)
+
+    clusters = {}
+    for i in range(len(signatures)):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+def source_rank(path):
+    """Return the preference rank of a path's source directory"""
+    directory = os.path.dirname(path)
+    return SOURCE_DIRS.index(directory) if directory in SOURCE_DIRS else len(SOURCE_DIRS)
+
+def build_duplicates(directories=SOURCE_DIRS):
+    """Find near-duplicate clusters and record every copy except the preferred one"""
+    start = time.perf_counter()
+    connection = connect()
+    paths, signatures, lengths = load_signatures(connection, directories)
+    clusters = find_clusters(signatures)
+
+    rows = []
+    redundant_words = 0
+    for members in clusters:
+        # Keep the copy from the preferred site, then the longest text
+        members.sort(key=lambda i: (source_rank(paths[i]), -lengths[i], paths[i]))
+        keep = members[0]
+        for i in members[1:]:
+            similarity = np.count_nonzero(signatures[keep] == signatures[i]) / NUM_PERM
+            rows.append((paths[i], paths[keep], similarity))
+            redundant_words += lengths[i]
+
+    connection.execute("DELETE FROM duplicates")
+    connection.executemany("INSERT INTO duplicates (path, canonical, similarity) VALUES (?, ?, ?)", rows)
+    connection.commit()
+    connection.close()
+    _duplicates.clear()
+
+    elapsed = time.perf_counter() - start
+    print(f"Found {len(clusters)} duplicate clusters with {len(rows)} redundant copies "
+          f"({redundant_words:,} words) among {len(paths)} texts in {elapsed:.2f}s")
+    return rows
+
+_duplicates = {}
+
+def duplicate_of(path):
+    """Return the kept copy if a page or text is a redundant duplicate, else None"""
+    if not _duplicates:
+        if not os.path.exists(DUPLICATES_FILE):
+            return None
+        connection = connect()
+        _duplicates.update(connection.execute("SELECT path, canonical FROM duplicates"))
+        connection.close()
+        # Mark the mapping as loaded even when there are no duplicates
+        _duplicates.setdefault(None, None)
+    return _duplicates.get(path)
+
+def docx_duplicate_of(docx_path):
+    """Return the kept copy if the page a Word document was converted from is a duplicate"""
+    from corpus_catalog import connect as catalog_connect
+
+    if not os.path.exists(DUPLICATES_FILE):
+        return None
+    row = catalog_connect().execute("SELECT blob FROM articles WHERE docx_path = ?", (docx_path,)).fetchone()
+    return duplicate_of(row[0]) if row and row[0] else None
+
+def selftest():
+    """Check that distinct short articles on one page template are not taken for duplicates"""
+    def page(words):
+        sidebar = ''.join(f"<li><a href='/post-{n}/'>متعلقہ مضمون نمبر {n} کا عنوان یہاں</a></li>" for n in range(30))
+        footer = ''.join(f"<p>جملہ حقوق محفوظ ہیں، ادارہ ترجمان القرآن، لاہور، سطر {n}</p>" for n in range(20))
+        return (f"<html><body><header><p>رسائل و مسائل</p></header>"
+                f"<div class='entry-content'><p>{' '.join(words)}</p></div>"
+                f"<aside><ul>{sidebar}</ul></aside><footer>{footer}</footer></body></html>").encode('utf-8')
+
+    question = [f"سوال{n}" for n in range(15)]
+    answer = [f"جواب{n}" for n in range(15)]
+    pages = {"question": page(question), "answer": page(answer), "copy": page(question + ["ختم"])}
+
+    def similarity(a, b, text):
+        signatures = [minhash_signature(fold(text(pages[name])).split()) for name in (a, b)]
+        return np.count_nonzero(signatures[0] == signatures[1]) / NUM_PERM
+
+    whole_page = lambda content: BeautifulSoup(content, 'html.parser').get_text(' ')
+    article = lambda content: page_text(content, "page.html")
+    checks = [
+        ("distinct articles, whole page", similarity("question", "answer", whole_page), True),
+        ("distinct articles, article text", similarity("question", "answer", article), False),
+        ("near copy, article text", similarity("question", "copy", article), True),
+    ]
+
+    failures = []
+    print(f"{'comparison':34}{'similarity':>11}  duplicate")
+    for name, value, expected in checks:
+        print(f"{name:34}{value:>11.2f}  {'yes' if value >= THRESHOLD else 'no'}")
+        if (value >= THRESHOLD) != expected:
+            failures.append(name)
+    if failures:
+        print(f"\nFailed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nOnly the near copy is taken for a duplicate.")
+
+def main():
+    """Detect near-duplicate articles, list the recorded clusters with 'show', or run 'selftest'"""
+    if len(sys.argv) > 1 and sys.argv[1] == "selftest":
+        selftest()
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "show":
+        if not os.path.exists(DUPLICATES_FILE):
+            print("No duplicates recorded yet.")
+            return
+        connection = connect()
+        for path, canonical, similarity in connection.execute(
+                "SELECT path, canonical, similarity FROM duplicates ORDER BY canonical, path"):
+            print(f"{similarity:.2f}\t{path}\t-> {canonical}")
+        return
+
+    build_duplicates(sys.argv[1:] or SOURCE_DIRS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+import glob
+import argparse
+import tempfile
+import time
+import re
+import zlib
+import zipfile
+from lxml import etree
+
+# Merged volumes are optimized in place by default
+INPUT_DIR = "rasailomasail_merged"
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+NSMAP = {'w': W_NS}
+
+# Run formatting that occurs at least this often is moved into a shared style
+MIN_STYLE_USES = 2
+
+# Prefix for the character styles created for hoisted run formatting
+STYLE_PREFIX = "RunFormat"
+
+# Approximate serialized sizes used to decide whether hoisting pays off
+STYLE_REFERENCE_XML = b'<w:rPr><w:rStyle w:val="RunFormat00"/></w:rPr>'
+STYLE_OVERHEAD = 200
+
+# Parts that deflate by less than this fraction are stored uncompressed
+MIN_DEFLATE_GAIN = 0.05
+
+def w(tag):
+    """Return the fully qualified name of a WordprocessingML tag"""
+    return f"{{{W_NS}}}{tag}"
+
+def run_signature(run):
+    """Return a hashable key for a run's direct formatting, or None if the run has no plain text"""
+    rpr = None
+    texts = 0
+    for child in run:
+        if child.tag == w('rPr'):
+            rpr = child
+        elif child.tag == w('t'):
+            texts += 1
+        else:
+            # Runs with breaks, tabs, fields or drawings are left alone
+            return None
+    if texts > 1:
+        return None
+    return etree.tostring(rpr, method='c14n') if rpr is not None else b''
+
+def coalesce_runs(paragraph):
+    """Merge adjacent plain-text runs with identical formatting, returning how many were removed"""
+    removed = 0
+    previous, previous_sig = None, None
+    for child in list(paragraph):
+        if child.tag != w('r'):
+            previous, previous_sig = None, None
+            continue
+
+        sig = run_signature(child)
+        if sig is not None and sig == previous_sig:
+            # Append this run's text to the previous run and drop it
+            prev_t = previous.find(w('t'))
+            text = ''.join(t.text or '' for t in child.findall(w('t')))
+            if prev_t is None:
+                prev_t = etree.SubElement(previous, w('t'))
+            prev_t.text = (prev_t.text or '') + text
+            prev_t.set(f"{{{XML_NS}}}space", "preserve")
+            paragraph.remove(child)
+            removed += 1
+            continue
+
+        previous, previous_sig = child, sig
+    return removed
+
+def hoist_run_formatting(document_root, styles_root):
+    """Move repeated direct run formatting into shared character styles
+
+    Only runs in paragraphs with the default paragraph style are changed, so
+    toggle properties such as bold are not flipped by a heading style.
+    Returns the number of styles created.
+    """
+    # Count how often each formatting combination is used
+    runs_by_sig = {}
+    sizes = {}
+    for paragraph in document_root.iter(w('p')):
+        ppr = paragraph.find(w('pPr'))
+        if ppr is not None and ppr.find(w('pStyle')) is not None:
+            continue
+        for run in paragraph.findall(w('r')):
+            rpr = run.find(w('rPr'))
+            if rpr is None or len(rpr) == 0 or rpr.find(w('rStyle')) is not None:
+                continue
+            sig = etree.tostring(rpr, method='c14n')
+            runs_by_sig.setdefault(sig, []).append(run)
+            sizes[sig] = serialized_size(rpr)
+
+    existing_ids = set(styles_root.xpath('//w:style/@w:styleId', namespaces=NSMAP))
+    created = 0
+    for sig, runs in runs_by_sig.items():
+        # Only hoist when the reference is shorter than the formatting it replaces
+        size = sizes[sig]
+        saved = (size - len(STYLE_REFERENCE_XML)) * len(runs) - size - STYLE_OVERHEAD
+        if len(runs) < MIN_STYLE_USES or saved <= 0:
+            continue
+
+        created += 1
+        style_id = f"{STYLE_PREFIX}{created}"
+        while style_id in existing_ids:
+            created += 1
+            style_id = f"{STYLE_PREFIX}{created}"
+        existing_ids.add(style_id)
+
+        # Create the shared character style from the first run's formatting
+        style = etree.SubElement(styles_root, w('style'))
+        style.set(w('type'), 'character')
+        style.set(w('customStyle'), '1')
+        style.set(w('styleId'), style_id)
+        etree.SubElement(style, w('name')).set(w('val'), f"Run Format {created}")
+        etree.SubElement(style, w('basedOn')).set(w('val'), 'DefaultParagraphFont')
+        etree.SubElement(style, w('uiPriority')).set(w('val'), '99')
+        style.append(etree.fromstring(etree.tostring(runs[0].find(w('rPr')))))
+
+        # Point every run at the style instead of repeating the formatting
+        for run in runs:
+            rpr = run.find(w('rPr'))
+            for child in list(rpr):
+                rpr.remove(child)
+            etree.SubElement(rpr, w('rStyle')).set(w('val'), style_id)
+
+    return created
+
+def serialized_size(element):
+    """Return the size of an element as it appears inside a part, without namespace declarations"""
+    return len(re.sub(rb' xmlns:\w+="[^"]*"', b'', etree.tostring(element)))
+
+def write_docx(parts, output_path, compresslevel=9):
+    """Write docx parts to a zip, deflating each part only when it pays off"""
+    tmp_path = output_path + ".tmp"
+    with zipfile.ZipFile(tmp_path, 'w') as archive:
+        for name, data in parts:
+            compressed = len(zlib.compress(data, compresslevel))
+            if compressed <= len(data) * (1 - MIN_DEFLATE_GAIN):
+                archive.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED,
+                                 compresslevel=compresslevel)
+            else:
+                archive.writestr(name, data, compress_type=zipfile.ZIP_STORED)
+    os.replace(tmp_path, output_path)
+
+def measure_open_time(path, repeat=3):
+    """Return the best time in seconds python-docx needs to open a document"""
+    from docx import Document
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Document(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def document_xml_size(path):
+    """Return the uncompressed size of word/document.xml in a docx"""
+    with zipfile.ZipFile(path) as archive:
+        return archive.getinfo('word/document.xml').file_size
+
+def optimize_docx(path, output_path=None, compresslevel=9):
+    """Coalesce runs, hoist repeated formatting into styles and recompress a docx
+
+    Returns a dict with the number of runs merged and styles created.
+    """
+    output_path = output_path or path
+
+    with zipfile.ZipFile(path) as archive:
+        parts = [(info.filename, archive.read(info.filename)) for info in archive.infolist()]
+    part_data = dict(parts)
+
+    document_root = etree.fromstring(part_data['word/document.xml'])
+    styles_root = etree.fromstring(part_data['word/styles.xml'])
+
+    runs_merged = sum(coalesce_runs(p) for p in document_root.iter(w('p')))
+    styles_created = hoist_run_formatting(document_root, styles_root)
+
+    part_data['word/document.xml'] = etree.tostring(document_root, xml_declaration=True,
+                                                    encoding='UTF-8', standalone=True)
+    part_data['word/styles.xml'] = etree.tostring(styles_root, xml_declaration=True,
+                                                  encoding='UTF-8', standalone=True)
+
+    write_docx([(name, part_data[name]) for name, _ in parts], output_path, compresslevel)
+    return {"runs_merged": runs_merged, "styles_created": styles_created}
+
+def optimize_with_report(path, output_path=None):
+    """Optimize a docx and print XML size, file size and open time before and after
+
+    The returned stats also hold the (XML size, file size, open time)
+    measurements under "before" and "after".
+    """
+    output_path = output_path or path
+    before = (document_xml_size(path), os.path.getsize(path), measure_open_time(path))
+
+    stats = optimize_docx(path, output_path)
+
+    after = (document_xml_size(output_path), os.path.getsize(output_path), measure_open_time(output_path))
+
+    print(f"\n{os.path.basename(path)}: merged {stats['runs_merged']} runs, "
+          f"created {stats['styles_created']} styles")
+    print(f"  {'':12}{'before':>12}{'after':>12}{'change':>9}")
+    for label, old, new, fmt in (("XML size", before[0], after[0], "{:,}"),
+                                 ("File size", before[1], after[1], "{:,}"),
+                                 ("Open time", before[2], after[2], "{:.3f}s")):
+        change = (new - old) / old * 100 if old else 0
+        print(f"  {label:12}{fmt.format(old):>12}{fmt.format(new):>12}{change:>8.1f}%")
+    stats.update(before=before, after=after)
+    return stats
+
+def print_totals(results):
+    """Print the file size and open time of all optimized documents together, before and after"""
+    print(f"\nAll {len(results)} documents:")
+    print(f"  {'':12}{'before':>12}{'after':>12}{'change':>9}")
+    for label, i, fmt in (("File size", 1, "{:,}"), ("Open time", 2, "{:.3f}s")):
+        old = sum(stats["before"][i] for stats in results)
+        new = sum(stats["after"][i] for stats in results)
+        change = (new - old) / old * 100 if old else 0
+        print(f"  {label:12}{fmt.format(old):>12}{fmt.format(new):>12}{change:>8.1f}%")
+
+def main():
+    """Optimize the given docx files, or all merged volumes, and report the size and open time saved"""
+    parser = argparse.ArgumentParser(description="Shrink Word documents and report the size and open time saved")
+    parser.add_argument("paths", nargs="*", help=f"documents to optimize (default: the volumes in {INPUT_DIR})")
+    parser.add_argument("--report", action="store_true",
+                        help="measure the savings on temporary copies and leave the documents unchanged")
+    args = parser.parse_args()
+    paths = args.paths or sorted(glob.glob(os.path.join(INPUT_DIR, '*.docx')))
+
+    if not paths:
+        print(f"No Word documents found in {INPUT_DIR}.")
+        return
+
+    print(f"{'Measuring' if args.report else 'Optimizing'} {len(paths)} Word documents...")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in paths:
+            output_path = os.path.join(tmp_dir, os.path.basename(path)) if args.report else path
+            try:
+                results.append(optimize_with_report(path, output_path))
+            except Exception as e:
+                print(f"Error optimizing {path}: {e}")
+    if len(results) > 1:
+        print_totals(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+import os
+import re
+import sys
+import gzip
+import mmap
+import json
+import uuid
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# zstd is used for new records when available, gzip otherwise
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Each page directory is stored as <directory>.warc with a <directory>.warc.idx offset index
+ARCHIVE_SUFFIX = ".warc"
+INDEX_SUFFIX = ".idx"
+
+# Scrapers write into archives instead of loose files when this is set
+WRITE_ARCHIVES = True
+
+# Page directories produced by the scrapers
+PAGE_DIRS = [
+    "pages",
+    "articles",
+    "article_html_files",
+    "rasailomasail_html/volume_01",
+    "rasailomasail_html/volume_02",
+    "rasailomasail_html/volume_03",
+    "rasailomasail_html/volume_04",
+    "rasailomasail_html/volume_05",
+    "rasailomasail_articles/volume_05",
+    "maududi_books_html",
+    "readmaududi_scrape/html",
+    "readmaududi_scrape/books",
+]
+
+def compress(data, codec):
+    """Compress one record with the given codec"""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=9)
+    return data
+
+def decompress(data, codec):
+    """Decompress one record written with the given codec"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd records")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+def default_codec():
+    """Return the codec used for new records"""
+    return "zstd" if zstandard is not None else "gzip"
+
+def archive_path(directory):
+    """Return the archive file that stores the pages of a directory"""
+    return os.path.normpath(directory) + ARCHIVE_SUFFIX
+
+class PageArchive:
+    """Append-only archive of pages with per-record compression
+
+    Records follow the WARC layout (a header block followed by the payload)
+    and are compressed one by one, so any record can be read on its own.
+    The sidecar index is a JSON line per record with its name, URL, offset
+    and length; later records with the same name replace earlier ones.
+    An archive has a single writer process at a time, whose threads append
+    one after another.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.normpath(directory)
+        self.path = archive_path(directory)
+        self.index_path = self.path + INDEX_SUFFIX
+        self._by_name = None
+        self._by_url = None
+        self._index_stat = None
+        self._map = None
+        self._map_pid = None
+        self._lock = threading.Lock()
+
+    def exists(self):
+        """Check whether the archive has been created"""
+        return os.path.exists(self.path) and os.path.exists(self.index_path)
+
+    def _stat_index(self):
+        """Return the size and modification time of the sidecar index, or None"""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_index(self):
+        """Read the sidecar index into name and URL lookup tables
+
+        The tables are read again when the index has changed since, as another
+        process may have appended pages.
+        """
+        index_stat = self._stat_index()
+        if self._by_name is not None and index_stat == self._index_stat:
+            return
+        self._by_name, self._by_url = {}, {}
+        self._index_stat = index_stat
+        if index_stat is None:
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._by_name[entry["name"]] = entry
+                if entry.get("url"):
+                    self._by_url[entry["url"]] = entry
+
+    def names(self):
+        """Return the names of all pages in the archive, in the order they were added"""
+        self._load_index()
+        return list(self._by_name)
+
+    def entry(self, name):
+        """Return the index entry of a page, or None"""
+        self._load_index()
+        return self._by_name.get(name)
+
+    def entry_for_url(self, url):
+        """Return the index entry of the page fetched from a URL, or None"""
+        self._load_index()
+        return self._by_url.get(url)
+
+    def __contains__(self, name):
+        return self.entry(name) is not None
+
+    def append(self, name, content, url=None, content_type="text/html; charset=utf-8", codec=None):
+        """Add a page to the archive and its index"""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        codec = codec or default_codec()
+
+        headers = [
+            "WARC/1.1",
+            "WARC-Type: resource",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+            f"WARC-Target-URI: {url or ''}",
+            f"X-File-Name: {name}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(content)}",
+        ]
+        header_block = ("\r\n".join(headers) + "\r\n\r\n").encode('utf-8')
+        record = compress(header_block + content + b"\r\n\r\n", codec)
+
+        with self._lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'ab') as file:
+                offset = file.tell()
+                file.write(record)
+
+            entry = {
+                "name": name,
+                "url": url,
+                "offset": offset,
+                "length": len(record),
+                "codec": codec,
+                "payload_offset": len(header_block),
+                "payload_length": len(content),
+            }
+            with open(self.index_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+            self._by_name[name] = entry
+            if url:
+                self._by_url[url] = entry
+            self._index_stat = self._stat_index()
+        return entry
+
+    def _view(self):
+        """Return a read-only memoryview over the whole archive file
+
+        The file is memory-mapped once per process and remapped when it has
+        grown or when used from a forked worker, so workers share the page
+        cache instead of holding private copies.
+        """
+        size = os.path.getsize(self.path)
+        if self._map is None or self._map_pid != os.getpid() or len(self._map) < size:
+            with open(self.path, 'rb') as file:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+            self._map_pid = os.getpid()
+        return memoryview(self._map)
+
+    def read_entry(self, entry):
+        """Return the payload of an index entry as a buffer
+
+        Stored records are returned as a slice of the memory map without
+        copying; compressed records are decompressed straight from it.
+        """
+        record = self._view()[entry["offset"]:entry["offset"] + entry["length"]]
+        if entry["codec"] != "none":
+            record = memoryview(decompress(record, entry["codec"]))
+        start = entry["payload_offset"]
+        return record[start:start + entry["payload_length"]]
+
+    def get(self, name):
+        """Return the payload bytes of a page by name"""
+        entry = self.entry(name)
+        if entry is None:
+            raise KeyError(name)
+        return bytes(self.read_entry(entry))
+
+    def get_url(self, url):
+        """Return the payload bytes of the page fetched from a URL"""
+        entry = self.entry_for_url(url)
+        if entry is None:
+            raise KeyError(url)
+        return bytes(self.read_entry(entry))
+
+    def iter_records(self):
+        """Yield (entry, payload buffer) for the current version of every page in one sequential pass"""
+        self._load_index()
+        current = sorted(self._by_name.values(), key=lambda e: e["offset"])
+        for entry in current:
+            yield entry, self.read_entry(entry)
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+def get_archive(directory):
+    """Return the shared PageArchive object for a directory"""
+    key = os.path.normpath(directory)
+    with _archives_lock:
+        if key not in _archives:
+            _archives[key] = PageArchive(key)
+        return _archives[key]
+
+def save_page(path, content, url=None):
+    """Store a page under its file path, in the directory's archive or as a loose file"""
+    if WRITE_ARCHIVES:
+        get_archive(os.path.dirname(path)).append(os.path.basename(path), content, url=url)
+        return
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+@contextmanager
+def open_page(path):
+    """Yield a read-only buffer over a page from its directory's archive or a loose file
+
+    Loose files are memory-mapped and archived records are sliced out of the
+    archive's shared map, so no intermediate copy is made. An archived copy
+    wins over a loose file, as scrapers only append to archives. The buffer
+    must not be used after the block ends.
+    """
+    archive = get_archive(os.path.dirname(path))
+    if archive.exists() and os.path.basename(path) in archive:
+        view = archive.read_entry(archive.entry(os.path.basename(path)))
+        try:
+            yield view
+        finally:
+            view.release()
+        return
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield memoryview(b'')
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+def read_page_bytes(path):
+    """Return the raw bytes of a page from its directory's archive or a loose file"""
+    with open_page(path) as view:
+        return bytes(view)
+
+def read_page(path):
+    """Return the text of a page, decoded straight from the mapped buffer"""
+    with open_page(path) as view:
+        return str(view, 'utf-8')
+
+def page_exists(path):
+    """Check whether a page exists as a loose file or in its directory's archive"""
+    if os.path.exists(path):
+        return True
+    archive = get_archive(os.path.dirname(path))
+    return archive.exists() and os.path.basename(path) in archive
+
+def list_pages(directory, suffix='.html'):
+    """Return the paths of all pages in a directory, whether loose or archived"""
+    names = set()
+    if os.path.isdir(directory):
+        names.update(f for f in os.listdir(directory) if f.endswith(suffix))
+    archive = get_archive(directory)
+    if archive.exists():
+        names.update(n for n in archive.names() if n.endswith(suffix))
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+def next_page_number(directory):
+    """Return the number after the highest saved page_N.html of a directory, counting index.html as page 1"""
+    numbers = [int(match.group(1)) for match in
+               (re.match(r'page_(\d+)\.html$', os.path.basename(path)) for path in list_pages(directory)) if match]
+    return max(numbers, default=1) + 1
+
+def iter_pages(directory, suffix='.html'):
+    """Yield (path, buffer) for every page in a directory, reading archives sequentially"""
+    archive = get_archive(directory)
+    archived = set()
+    if archive.exists():
+        for entry, payload in archive.iter_records():
+            if entry["name"].endswith(suffix):
+                archived.add(entry["name"])
+                yield os.path.join(directory, entry["name"]), payload
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(suffix) and name not in archived:
+                path = os.path.join(directory, name)
+                with open_page(path) as view:
+                    yield path, view
+
+def pack_directory(directory, remove=False, codec=None):
+    """Move the loose HTML files of a directory into its archive
+
+    Pages already in the archive are not added again, so packing can be
+    rerun. With codec "none" records are stored uncompressed and can be
+    handed to readers straight from the memory map.
+    """
+    archive = get_archive(directory)
+    loose = sorted(f for f in os.listdir(directory) if f.endswith('.html'))
+    names = [name for name in loose if name not in archive]
+    new = set(names)
+    before = sum(os.path.getsize(os.path.join(directory, n)) for n in names)
+
+    for name in loose:
+        path = os.path.join(directory, name)
+        if name in new:
+            with open(path, 'rb') as file:
+                archive.append(name, file.read(), codec=codec)
+        if remove:
+            os.remove(path)
+
+    after = os.path.getsize(archive.path) if archive.exists() else 0
+    skipped = len(loose) - len(names)
+    print(f"Packed {len(names)} pages from {directory}: {before:,} -> {after:,} bytes"
+          + (f" ({skipped} already archived)" if skipped else ""))
+    return len(names)
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, if the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def scan_benchmark(directories, parse=False):
+    """Scan every page of the given directories and report throughput and peak RSS
+
+    With parse the pages are also parsed with BeautifulSoup, as the converters do.
+    """
+    if parse:
+        from bs4 import BeautifulSoup
+
+    pages = total_bytes = 0
+    start = time.perf_counter()
+    for directory in directories:
+        for path, view in iter_pages(directory):
+            pages += 1
+            total_bytes += len(view)
+            text = str(view, 'utf-8')
+            if parse:
+                BeautifulSoup(text, 'html.parser')
+    elapsed = time.perf_counter() - start
+
+    rate = total_bytes / (1024 * 1024) / elapsed if elapsed else 0
+    rss = peak_rss_mb()
+    print(f"Scanned {pages} pages, {total_bytes:,} bytes in {elapsed:.2f}s ({rate:.1f} MB/s)")
+    if rss is not None:
+        print(f"Peak RSS: {rss:.1f} MB")
+
+def main():
+    """Pack page directories into archives, look up a page by URL, or benchmark a corpus scan"""
+    if len(sys.argv) >= 4 and sys.argv[1] == "get":
+        directory, url = sys.argv[2], sys.argv[3]
+        sys.stdout.write(get_archive(directory).get_url(url).decode('utf-8'))
+        return
+
+    if sys.argv[1:2] == ["bench"]:
+        directories = [a for a in sys.argv[2:] if not a.startswith("--")]
+        scan_benchmark(directories or [d for d in PAGE_DIRS if os.path.isdir(d) or
+                                       get_archive(d).exists()], parse="--parse" in sys.argv)
+        return
+
+    remove = "--remove" in sys.argv
+    codec = "none" if "--stored" in sys.argv else None
+    directories = [a for a in sys.argv[2:] if not a.startswith("--")] if sys.argv[1:2] == ["pack"] else []
+    directories = directories or [d for d in PAGE_DIRS if os.path.isdir(d)]
+
+    print(f"Packing {len(directories)} page directories...")
+    start = time.perf_counter()
+    total = 0
+    for directory in directories:
+        try:
+            total += pack_directory(directory, remove=remove, codec=codec)
+        except Exception as e:
+            print(f"Error packing {directory}: {e}")
+    print(f"Packed {total} pages in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from corpus_catalog import mark_stage, record_article
+from search_index import index_file
+from urdu_normalize import normalize
+
+# PyMuPDF is much faster when installed; pypdf is the fallback
+try:
+    import fitz
+except ImportError:
+    fitz = None
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Directories the PDF downloaders write to
+PDF_DIRS = ["article_pdfs", os.path.join("articles", "pdfs")]
+
+# Extracted text goes next to the text written by extract_articles
+OUTPUT_DIR = "articles_text"
+
+# Extraction results keyed by the SHA-256 of the PDF
+CACHE_DIR = "pdf_text_cache"
+
+# Seconds a single PDF may take before its worker is killed
+DEFAULT_TIMEOUT = 120
+
+def pdf_hash(path):
+    """Return the SHA-256 hex digest of a PDF"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extract_pdf_text(path):
+    """Return (page count, text) of a PDF, with pages separated by form feeds"""
+    if fitz is not None:
+        with fitz.open(path) as document:
+            pages = [page.get_text() for page in document]
+    elif PdfReader is not None:
+        reader = PdfReader(path)
+        pages = [page.extract_text() or '' for page in reader.pages]
+    else:
+        raise RuntimeError("PyMuPDF or pypdf is required to extract PDF text")
+    return len(pages), '\f'.join(pages)
+
+def _worker(conn):
+    """Extract PDFs sent over a pipe until told to stop"""
+    while True:
+        path = conn.recv()
+        if path is None:
+            break
+        try:
+            conn.send(("ok", extract_pdf_text(path)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+class TimeoutPool:
+    """Process pool that kills and replaces a worker whose task runs past the timeout
+
+    concurrent.futures cannot cancel a task that is already running, so a
+    PDF that sends the parser into a loop would hold its worker forever.
+    """
+
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.workers = [self._spawn() for _ in range(workers or os.cpu_count() or 1)]
+
+    def _spawn(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_worker, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return {"process": process, "conn": parent_conn, "task": None, "started": None}
+
+    def _replace(self, worker):
+        worker["process"].terminate()
+        worker["process"].join()
+        worker["conn"].close()
+        replacement = self._spawn()
+        self.workers[self.workers.index(worker)] = replacement
+        return replacement
+
+    def imap_unordered(self, paths):
+        """Yield (path, status, result) as PDFs finish; status is 'ok', 'error' or 'timeout'"""
+        queue = deque(paths)
+        while True:
+            for worker in list(self.workers):
+                if worker["task"] is None and queue:
+                    path = queue.popleft()
+                    try:
+                        worker["conn"].send(path)
+                    except OSError:
+                        # The idle worker died; its replacement takes the task
+                        worker = self._replace(worker)
+                        worker["conn"].send(path)
+                    worker["task"] = path
+                    worker["started"] = time.monotonic()
+
+            busy = [w for w in self.workers if w["task"] is not None]
+            if not busy:
+                return
+
+            now = time.monotonic()
+            deadline = min(w["started"] for w in busy) + self.timeout
+            ready = wait([w["conn"] for w in busy], timeout=max(0, deadline - now))
+
+            for worker in busy:
+                path = worker["task"]
+                if worker["conn"] in ready:
+                    try:
+                        status, result = worker["conn"].recv()
+                    except EOFError:
+                        # The worker died, for example from a crash in the PDF library
+                        self._replace(worker)
+                        yield path, "error", "worker exited"
+                        continue
+                    worker["task"] = None
+                    yield path, status, result
+                elif time.monotonic() - worker["started"] >= self.timeout:
+                    self._replace(worker)
+                    yield path, "timeout", None
+
+    def close(self):
+        """Stop the workers"""
+        for worker in self.workers:
+            try:
+                worker["conn"].send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker["process"].join(timeout=5)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+
+def cache_path(digest):
+    """Return the cache file of a PDF hash"""
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+def load_cached(digest):
+    """Return the cached (pages, text) of a PDF hash, or None"""
+    path = cache_path(digest)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    return data["pages"], data["text"]
+
+def save_cached(digest, pages, text):
+    """Cache the extraction result of a PDF hash"""
+    tmp_path = cache_path(digest) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({"pages": pages, "text": text}, file, ensure_ascii=False)
+    os.replace(tmp_path, cache_path(digest))
+
+def text_output_path(pdf_path):
+    """Return where the text of a PDF is written
+
+    A short hash of the PDF's path keeps same-named PDFs from different
+    directories apart.
+    """
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    source = hashlib.sha1(os.path.normpath(pdf_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(OUTPUT_DIR, f"pdf_{stem}_{source}.txt")
+
+def write_text(pdf_path, text):
+    """Write a PDF's text like the HTML extractors do, and record it in the catalog and search index"""
+    text_path = text_output_path(pdf_path)
+    text = normalize(text)
+    if os.path.exists(text_path):
+        with open(text_path, 'r', encoding='utf-8') as file:
+            unchanged = file.read() == text
+    else:
+        unchanged = False
+    if not unchanged:
+        with open(text_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+    # PDFs the catalog does not know are recorded without a URL
+    if not mark_stage("extracted", pdf_path=pdf_path, text_path=text_path):
+        record_article(None, stage="extracted", pdf_path=pdf_path, text_path=text_path)
+    index_file(text_path)
+    return text_path
+
+def extract_all(directories=PDF_DIRS, workers=None, timeout=DEFAULT_TIMEOUT):
+    """Extract the text of every PDF in the directories, reusing cached results"""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    pdf_paths = []
+    for directory in directories:
+        if os.path.isdir(directory):
+            pdf_paths.extend(os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                             if name.lower().endswith('.pdf'))
+    print(f"Found {len(pdf_paths)} PDF files")
+
+    digests = {}
+    to_extract = []
+    cached = 0
+    for path in pdf_paths:
+        digest = digests[path] = pdf_hash(path)
+        result = load_cached(digest)
+        if result is None:
+            to_extract.append(path)
+            continue
+        if result[1].strip():
+            write_text(path, result[1])
+        cached += 1
+    print(f"{cached} PDFs unchanged since an earlier run, {len(to_extract)} to extract")
+
+    start = time.perf_counter()
+    pages = extracted = empty = 0
+    failed = []
+    if to_extract:
+        pool = TimeoutPool(workers, timeout)
+        try:
+            for i, (path, status, result) in enumerate(pool.imap_unordered(to_extract), 1):
+                if status != "ok":
+                    print(f"[{i}/{len(to_extract)}] {status}: {path} {result or ''}")
+                    failed.append(path)
+                    continue
+                page_count, text = result
+                save_cached(digests[path], page_count, text)
+                pages += page_count
+                extracted += 1
+                if not text.strip():
+                    # Scanned issues have no text layer
+                    empty += 1
+                    print(f"[{i}/{len(to_extract)}] No text layer: {path}")
+                    continue
+                write_text(path, text)
+                print(f"[{i}/{len(to_extract)}] {page_count} pages: {path}")
+        finally:
+            pool.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nExtracted {extracted} PDFs ({pages:,} pages) in {elapsed:.2f}s"
+          + (f", {pages / elapsed:.1f} pages/s" if elapsed and pages else ""))
+    if empty:
+        print(f"{empty} PDFs have no text layer")
+    if failed:
+        print(f"{len(failed)} PDFs failed or timed out")
+
+def main():
+    """Extract text from the downloaded article PDFs"""
+    parser = argparse.ArgumentParser(description="Extract text from downloaded article PDFs")
+    parser.add_argument("directories", nargs="*", default=PDF_DIRS, help="directories with PDFs")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds allowed per PDF")
+    args = parser.parse_args()
+
+    if fitz is None and PdfReader is None:
+        print("PyMuPDF or pypdf is required: pip install pypdf")
+        sys.exit(1)
+    extract_all(args.directories, args.workers, args.timeout)
+
+if __name__ == "__main__":
+    main()
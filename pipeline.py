@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from page_archive import archive_path, INDEX_SUFFIX
+
+# Directory of the pipeline scripts; stages run in the current directory like the scripts themselves
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Last successful run of every stage: its input fingerprint and timing
+STATE_FILE = "pipeline_state.json"
+
+# Output of each stage's last run
+LOG_DIR = "pipeline_logs"
+
+# Stages of the pipeline with the files and directories they read and write.
+# A stage depends on every stage that writes one of its inputs, and never runs
+# at the same time as a stage writing one of its outputs. Stages without
+# inputs crawl the sites, so they only run again when asked with --crawl, and
+# then only fetch what was published since their last run.
+STAGES = {
+    # tarjumanulquran.org
+    "crawl_articles": {"script": "srapper.py", "args": ["--incremental"], "inputs": [],
+                       "outputs": ["pages", "articles"]},
+    "extract_article_pages": {"script": "article_scraper.py", "inputs": ["pages"],
+                              "outputs": ["article_html_files"]},
+    "download_pdfs": {"script": "download_pdfs.py", "inputs": ["article_html_files"],
+                      "outputs": ["article_pdfs"]},
+    "extract_article_text": {"script": "extract_articles.py", "args": ["pages"], "inputs": ["pages"],
+                             "outputs": ["articles_text", "search_index.db"]},
+    "pdf_text": {"script": "pdf_text.py", "inputs": ["article_pdfs", "articles/pdfs"],
+                 "outputs": ["articles_text", "pdf_text_cache", "search_index.db"]},
+    "compile_pdfs": {"script": "compile_pdfs.py", "inputs": ["article_pdfs", "articles/pdfs"],
+                     "outputs": ["compiled_pdfs"]},
+
+    # rasailomasail.net
+    "crawl_rasail": {"script": "rasailomasail.py", "args": ["--incremental"], "inputs": [],
+                     "outputs": ["rasailomasail_html"]},
+    "extract_rasail": {"script": "extractarticles.py", "inputs": ["rasailomasail_html"],
+                       "outputs": ["rasailomasail_articles"]},
+    "boilerplate_rasail": {"script": "boilerplate.py", "args": ["scan", "rasailomasail.net"],
+                           "inputs": ["rasailomasail_articles/volume_05"],
+                           "outputs": ["boilerplate/rasailomasail.net.npz"]},
+    "convert_rasail": {"script": "articleword.py",
+                       "inputs": ["rasailomasail_articles", "boilerplate/rasailomasail.net.npz",
+                                  "near_duplicates.db"],
+                       "outputs": ["rasailomasail_word"]},
+    "merge_rasail": {"script": "merge_documents.py", "inputs": ["rasailomasail_word"],
+                     "outputs": ["rasailomasail_merged"]},
+
+    # readmaududi.com
+    "crawl_books": {"script": "maududi_book_scraper.py", "args": ["--incremental"],
+                    "inputs": [], "outputs": ["maududi_books_html"]},
+    "boilerplate_books": {"script": "boilerplate.py", "args": ["scan", "readmaududi.com"],
+                          "inputs": ["maududi_books_html", "readmaududi_scrape/books"],
+                          "outputs": ["boilerplate/readmaududi.com.npz"]},
+    "convert_books": {"script": "htmltoword.py",
+                      "inputs": ["maududi_books_html", "boilerplate/readmaududi.com.npz", "near_duplicates.db"],
+                      "outputs": ["maududi_books_word"]},
+
+    # Across sites
+    "near_duplicates": {"script": "near_duplicates.py",
+                        "inputs": ["rasailomasail_articles/volume_05", "articles", "article_html_files",
+                                   "maududi_books_html", "readmaududi_scrape/books", "articles_text"],
+                        "outputs": ["near_duplicates.db"]},
+}
+
+def overlaps(a, b):
+    """Check whether one path is the same as or inside the other"""
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+def dependencies(stages=STAGES):
+    """Return {stage: set of stages writing one of its inputs}"""
+    return {name: {other for other, producer in stages.items() if other != name
+                   and any(overlaps(i, o) for i in stage["inputs"] for o in producer["outputs"])}
+            for name, stage in stages.items()}
+
+def shares_outputs(name, others, stages=STAGES):
+    """Check whether a stage writes a path that one of the other stages also writes"""
+    return any(overlaps(a, b) for other in others
+               for a in stages[name]["outputs"] for b in stages[other]["outputs"])
+
+def topological_order(deps):
+    """Return the stages so that each comes after its dependencies, in STAGES order otherwise"""
+    order, done = [], set()
+    while len(order) < len(deps):
+        ready = [name for name in deps if name not in done and deps[name] <= done]
+        if not ready:
+            raise ValueError(f"Stage dependencies form a cycle: {sorted(set(deps) - done)}")
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+def update_path_digest(digest, path):
+    """Add the names, sizes and modification times under a path, and of its page archive, to a digest"""
+    for candidate in (path, archive_path(path), archive_path(path) + INDEX_SUFFIX):
+        if os.path.isfile(candidate):
+            stat = os.stat(candidate)
+            digest.update(f"{candidate}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        elif os.path.isdir(candidate):
+            for root, dirs, files in os.walk(candidate):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    stat = os.stat(file_path)
+                    digest.update(f"{file_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+
+def stage_fingerprint(stage):
+    """Return a fingerprint of a stage's script, arguments and inputs
+
+    Files are compared by size and modification time, like make, so
+    fingerprinting does not read the corpus.
+    """
+    digest = hashlib.sha256()
+    with open(os.path.join(SCRIPT_DIR, stage["script"]), 'rb') as file:
+        digest.update(file.read())
+    digest.update(json.dumps(stage.get("args", [])).encode('utf-8'))
+    for path in stage["inputs"]:
+        update_path_digest(digest, path)
+    return digest.hexdigest()
+
+def load_state():
+    """Load the record of the last successful run of each stage"""
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def save_state(state):
+    """Save the record of successful stage runs"""
+    tmp_file = STATE_FILE + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+def outputs_exist(stage):
+    """Check whether every output of a stage is on disk, loose or as a page archive"""
+    return all(os.path.exists(path) or os.path.exists(archive_path(path)) for path in stage["outputs"])
+
+def run_stage(name, stage):
+    """Run a stage's script with its output going to the stage log; returns (exit code, seconds)"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    command = [sys.executable, os.path.join(SCRIPT_DIR, stage["script"])] + stage.get("args", [])
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONPATH=SCRIPT_DIR)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{name}.log"), 'w', encoding='utf-8') as log:
+        result = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+    return result.returncode, time.perf_counter() - start
+
+def log_tail(name, lines=15):
+    """Return the last lines a stage printed"""
+    with open(os.path.join(LOG_DIR, f"{name}.log"), 'r', encoding='utf-8', errors='replace') as file:
+        return file.read().splitlines()[-lines:]
+
+def select_stages(targets, deps):
+    """Return the targets together with every stage they depend on"""
+    selected, queue = set(), list(targets)
+    while queue:
+        name = queue.pop()
+        if name not in selected:
+            selected.add(name)
+            queue.extend(deps[name])
+    return selected
+
+def run_pipeline(targets=None, jobs=4, crawl=False, force=(), dry_run=False):
+    """Run the stages whose inputs changed since their last success, independent ones concurrently"""
+    deps = dependencies()
+    selected = select_stages(targets or list(STAGES), deps)
+    order = [name for name in topological_order(deps) if name in selected]
+    state = load_state()
+    results = {}
+    started = {}
+    fingerprints = {}
+
+    def needs_run(name):
+        stage = STAGES[name]
+        if name in force:
+            return "forced"
+        if name not in state:
+            return "never run"
+        if not stage["inputs"]:
+            return "crawl requested" if crawl else None
+        if not outputs_exist(stage):
+            return "outputs missing"
+        fingerprints[name] = stage_fingerprint(stage)
+        if fingerprints[name] != state[name]["fingerprint"]:
+            return "inputs changed"
+        return None
+
+    if dry_run:
+        will_run = set()
+        for name in order:
+            reason = needs_run(name) or ("upstream runs" if deps[name] & will_run else None)
+            if reason:
+                will_run.add(name)
+            print(f"{name:24}{'run: ' + reason if reason else 'up to date'}")
+        return results
+
+    pipeline_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+        while len(results) < len(order):
+            for name in order:
+                if name in results or name in started or not deps[name] & selected <= set(results):
+                    continue
+                failed = [d for d in deps[name] & selected if results[d][0] in ("failed", "blocked")]
+                if failed:
+                    results[name] = ("blocked", 0.0, f"after {', '.join(sorted(failed))}")
+                    print(f"[{name}] blocked by {', '.join(sorted(failed))}")
+                    continue
+                # Stages writing the same files wait for each other
+                if shares_outputs(name, running.values()):
+                    continue
+                reason = needs_run(name)
+                if reason is None:
+                    results[name] = ("skipped", 0.0, "up to date")
+                    print(f"[{name}] up to date")
+                    continue
+                # Record the inputs as they were when the stage started
+                fingerprints[name] = stage_fingerprint(STAGES[name])
+                started[name] = True
+                print(f"[{name}] running ({reason})")
+                running[executor.submit(run_stage, name, STAGES[name])] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                code, seconds = future.result()
+                if code == 0:
+                    results[name] = ("done", seconds, "")
+                    state[name] = {"fingerprint": fingerprints[name], "seconds": round(seconds, 2),
+                                   "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+                    save_state(state)
+                    print(f"[{name}] done in {seconds:.1f}s")
+                else:
+                    results[name] = ("failed", seconds, f"exit code {code}")
+                    print(f"[{name}] failed with exit code {code}; last output:")
+                    for line in log_tail(name):
+                        print(f"    {line}")
+
+    elapsed = time.perf_counter() - pipeline_start
+    print(f"\n{'stage':24}{'status':>10}{'seconds':>10}")
+    for name in order:
+        status, seconds, _ = results[name]
+        print(f"{name:24}{status:>10}{seconds:>10.1f}")
+    busy = sum(seconds for _, seconds, _ in results.values())
+    print(f"\nPipeline finished in {elapsed:.1f}s ({busy:.1f}s of stage time)")
+    return results
+
+def main():
+    """Run the pipeline, or the given stages and what they depend on"""
+    parser = argparse.ArgumentParser(description="Run the scraping and conversion pipeline incrementally")
+    parser.add_argument("targets", nargs="*", metavar="STAGE", help="stages to bring up to date (default: all)")
+    parser.add_argument("--jobs", type=int, default=4, help="stages run at the same time")
+    parser.add_argument("--crawl", action="store_true", help="run the crawlers again")
+    parser.add_argument("--force", nargs="+", default=[], choices=list(STAGES), metavar="STAGE",
+                        help="run these stages even if their inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="show what would run")
+    parser.add_argument("--list", action="store_true", help="list the stages and their dependencies")
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    if args.list:
+        deps = dependencies()
+        for name in topological_order(deps):
+            after = ', '.join(sorted(deps[name])) or '-'
+            print(f"{name:24}{STAGES[name]['script']:26}after: {after}")
+        return
+
+    results = run_pipeline(args.targets, args.jobs, args.crawl, set(args.force), args.dry_run)
+    if any(status in ("failed", "blocked") for status, _, _ in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import os
-import time
-import requests
+import json
+import argparse
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import random
+from page_archive import next_page_number, save_page
+from seen_urls import SeenSet, all_known
+from extractarticles import POSTS_FILE, extract_article_links, listing_files, parse_article_links
+from retry_policy import LISTING, fetch, pause, record_failure
+from wp_discovery import discover_posts
 
 # Base URLs for the 5 volumes
 VOLUME_URLS = [
@@ -50,26 +55,29 @@ def get_safe_filename(url):
     
     return filename
 
-def download_page(url, output_path):
-    """Download a web page and save it to the specified location"""
+def download_page(url, output_path, save=True):
+    """Download a web page and save it to the specified location
+
+    With save=False the page is only returned, for the caller to save.
+    """
     try:
         print(f"Downloading: {url}")
         
         # Add a small random delay to be polite to the server
-        time.sleep(random.uniform(1, 3))
+        pause(random.uniform(1, 3))
         
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        response.raise_for_status()  # Raise exception for 4XX/5XX status codes
+        # Transient errors are retried; 4XX errors are raised at once
+        response = fetch(url, headers=HEADERS, timeout=30, priority=LISTING)
         
         # Save the HTML content
-        with open(output_path, 'w', encoding='utf-8') as file:
-            file.write(response.text)
-            
-        print(f"Saved to: {output_path}")
+        if save:
+            save_page(output_path, response.text, url=url)
+            print(f"Saved to: {output_path}")
         return response.text
         
     except Exception as e:
         print(f"Error downloading {url}: {e}")
+        record_failure(url, e, output_path, headers=HEADERS, follow="extractarticles.main")
         return None
 
 def extract_pagination_links(soup, base_url):
@@ -149,20 +157,72 @@ def extract_pagination_links(soup, base_url):
     
     return pagination_links
 
-def scrape_volume(volume_url, volume_num):
-    """Scrape a complete volume including all its pages"""
+def listed_articles(volume_num):
+    """Return the set of article URLs linked from the volume's saved listing pages
+
+    It is filled from the pages already on disk the first time it is used.
+    """
+    volume_dir = os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}")
+    listed = SeenSet(f"rasailomasail_volume_{volume_num:02d}")
+    if not len(listed):
+        for page_path in listing_files(volume_dir):
+            for _, url in extract_article_links(page_path):
+                listed.add(url)
+    return listed
+
+def scrape_volume(volume_url, volume_num, incremental=False):
+    """Scrape a complete volume including all its pages
+
+    With incremental, scraping stops at the first listing page that links
+    no new article, and pages are saved after the ones already saved so
+    the older listings, whose articles have moved on to later pages, are kept.
+    """
     print(f"\nScraping Volume {volume_num}: {volume_url}")
     
     # Create output directory for this volume
     volume_dir = os.path.join(OUTPUT_DIR, f"volume_{volume_num:02d}")
+    listed = listed_articles(volume_num)
+    
+    # The REST API lists the whole volume in a request per 100 posts, so the
+    # listing pages are only paged through when it is not available
+    posts = discover_posts(volume_url)
+    if posts:
+        save_page(os.path.join(volume_dir, POSTS_FILE),
+                  json.dumps([{"title": title, "url": url} for title, url in posts], ensure_ascii=False, indent=1),
+                  url=volume_url)
+        new = [url for _, url in posts if listed.add(url)]
+        print(f"Volume {volume_num} scraping completed: {len(posts)} articles listed, {len(new)} new")
+        return
+    
+    def save_listing(page_url, page_filename):
+        """Download a listing page; returns its HTML and whether all its articles were listed before
+
+        In incremental mode a page listing nothing new is not saved, so a
+        refresh that finds nothing leaves the saved listings unchanged.
+        """
+        html_content = download_page(page_url, page_filename, save=not incremental)
+        if not html_content:
+            return None, False
+        urls = [url for _, url in parse_article_links(html_content)]
+        known = all_known(urls, listed)
+        if incremental and not known:
+            save_page(page_filename, html_content, url=page_url)
+            print(f"Saved to: {page_filename}")
+        for url in urls:
+            listed.add(url)
+        return html_content, known
     
     # Download the main volume page
-    main_filename = os.path.join(volume_dir, "index.html")
-    html_content = download_page(volume_url, main_filename)
+    first_page_num = next_page_number(volume_dir) if incremental else 1
+    main_filename = os.path.join(volume_dir, f"page_{first_page_num}.html" if incremental else "index.html")
+    html_content, known = save_listing(volume_url, main_filename)
     
     if not html_content:
         print(f"Failed to download volume {volume_num} main page. Skipping.")
         return
+    if incremental and known:
+        print(f"Volume {volume_num} lists no new articles")
+        return
     
     soup = BeautifulSoup(html_content, 'html.parser')
     
@@ -171,14 +231,20 @@ def scrape_volume(volume_url, volume_num):
     print(f"Found {len(pagination_links)} pagination links")
     
     # Download each pagination page
+    downloaded = 1
     for i, page_url in enumerate(pagination_links, 1):
-        page_filename = os.path.join(volume_dir, f"page_{i+1}.html")
-        download_page(page_url, page_filename)
+        page_filename = os.path.join(volume_dir, f"page_{first_page_num + i if incremental else i + 1}.html")
+        html_content, known = save_listing(page_url, page_filename)
+        if html_content:
+            downloaded += 1
+        if incremental and known:
+            print(f"Page {i + 1} lists no new articles; the remaining pages were scraped before")
+            break
     
-    print(f"Volume {volume_num} scraping completed: Downloaded {len(pagination_links)+1} pages total")
+    print(f"Volume {volume_num} scraping completed: Downloaded {downloaded} pages total")
 
-def main():
-    """Main function to scrape all volumes"""
+def scrape_volumes(incremental=False):
+    """Scrape the listings of every volume"""
     print("Starting to scrape Rasail-o-Masail volumes...")
     
     # Create output directories
@@ -186,15 +252,23 @@ def main():
     
     # Scrape each volume
     for i, volume_url in enumerate(VOLUME_URLS, 1):
-        scrape_volume(volume_url, i)
+        scrape_volume(volume_url, i, incremental)
         
         # Add a longer delay between volumes
         if i < len(VOLUME_URLS):
             delay = random.uniform(3, 5)
             print(f"Waiting {delay:.1f} seconds before next volume...")
-            time.sleep(delay)
+            pause(delay)
     
     print("\nScraping completed! All volumes have been downloaded.")
 
+def main():
+    """Main function to scrape all volumes"""
+    parser = argparse.ArgumentParser(description="Scrape the Rasail-o-Masail volume listings")
+    parser.add_argument("--incremental", action="store_true",
+                        help="stop at the first listing page of a volume with no new articles")
+    args = parser.parse_args()
+    scrape_volumes(args.incremental)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,18 +1,23 @@
 import os
 import time
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
-import requests
+from page_archive import save_page
+from corpus_catalog import content_hash, record_article
+from seen_urls import canonicalize_url
+from retry_policy import PDF, fetch, record_failure
+from wp_discovery import discover_posts
 
 def scrape_with_selenium():
+    # Selenium is only imported when the scraper runs, as it is slow to import
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+
     # Base URL to scrape
     base_url = "https://readmaududi.com/category/books-syed-maududi/others-books-of-maududi/"
     
@@ -39,10 +44,9 @@ def scrape_with_selenium():
     print("Initializing Chrome webdriver...")
     driver = webdriver.Chrome(options=chrome_options)
     
-    def save_html(content, filename):
-        """Save HTML content to a file"""
-        with open(filename, 'w', encoding='utf-8') as file:
-            file.write(content)
+    def save_html(content, filename, url=None):
+        """Save HTML content to the page archive"""
+        save_page(filename, content, url=url)
     
     def get_safe_filename(url, title=None):
         """Create a safe filename from URL or title"""
@@ -60,112 +64,117 @@ def scrape_with_selenium():
             return filename
     
     try:
-        # Load the main page
-        print(f"Loading page: {base_url}")
-        driver.get(base_url)
-        
-        # Wait for page to load - look for common elements
-        try:
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.TAG_NAME, "article"))
-            )
-            print("Page loaded successfully!")
-        except TimeoutException:
-            print("Page load timed out. Proceeding with what we have...")
-        
-        # Sleep a bit to let any JavaScript finish executing
-        time.sleep(3)
-        
-        # Get page content after JavaScript execution
-        page_source = driver.page_source
-        
-        # Save the main page content
-        main_filename = os.path.join(html_dir, 'main_page.html')
-        save_html(page_source, main_filename)
-        print(f"Saved main page as {main_filename}")
-        
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(page_source, 'html.parser')
-        
-        # Find all article elements
-        articles = soup.find_all('article')
-        print(f"Found {len(articles)} articles on the main page")
-        
-        # Extract book links
-        book_links = []
-        for article in articles:
-            # Look for title and link
-            title_element = article.find(['h2', 'h3'], class_='entry-title')
-            if title_element:
-                link_element = title_element.find('a')
-                if link_element and link_element.get('href'):
-                    title = link_element.get_text(strip=True)
-                    url = link_element.get('href')
-                    book_links.append((url, title))
-        
-        print(f"Extracted {len(book_links)} book links")
-        
-        # Check for pagination
-        pagination = soup.find('nav', class_='pagination')
-        page_links = []
-        
-        if pagination:
-            for page_link in pagination.find_all('a', class_='page-numbers'):
-                href = page_link.get('href')
-                if href and '#' not in href:
-                    page_links.append(href)
+        # The REST API lists the category in a request per 100 books, so the
+        # rendered listing is only paged through when it is not available
+        book_links = [(url, title) for title, url in discover_posts(base_url) or []]
+        if not book_links:
+            # Load the main page
+            print(f"Loading page: {base_url}")
+            driver.get(base_url)
             
-            print(f"Found {len(page_links)} pagination links")
-        
-        # Process each pagination page
-        for i, page_url in enumerate(page_links, 1):
-            print(f"\nProcessing pagination page {i}: {page_url}")
+            # Wait for page to load - look for common elements
             try:
-                # Load the page with Selenium
-                driver.get(page_url)
+                WebDriverWait(driver, 20).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "article"))
+                )
+                print("Page loaded successfully!")
+            except TimeoutException:
+                print("Page load timed out. Proceeding with what we have...")
+            
+            # Sleep a bit to let any JavaScript finish executing
+            time.sleep(3)
+            
+            # Get page content after JavaScript execution
+            page_source = driver.page_source
+            
+            # Save the main page content
+            main_filename = os.path.join(html_dir, 'main_page.html')
+            save_html(page_source, main_filename, base_url)
+            print(f"Saved main page as {main_filename}")
+            
+            # Parse with BeautifulSoup
+            soup = BeautifulSoup(page_source, 'html.parser')
+            
+            # Find all article elements
+            articles = soup.find_all('article')
+            print(f"Found {len(articles)} articles on the main page")
+            
+            # Extract book links
+            book_links = []
+            for article in articles:
+                # Look for title and link
+                title_element = article.find(['h2', 'h3'], class_='entry-title')
+                if title_element:
+                    link_element = title_element.find('a')
+                    if link_element and link_element.get('href'):
+                        title = link_element.get_text(strip=True)
+                        url = link_element.get('href')
+                        book_links.append((url, title))
+            
+            print(f"Extracted {len(book_links)} book links")
+            
+            # Check for pagination
+            pagination = soup.find('nav', class_='pagination')
+            page_links = []
+            
+            if pagination:
+                for page_link in pagination.find_all('a', class_='page-numbers'):
+                    href = page_link.get('href')
+                    if href and '#' not in href:
+                        page_links.append(href)
                 
-                # Wait for articles to load
+                print(f"Found {len(page_links)} pagination links")
+            
+            # Process each pagination page
+            for i, page_url in enumerate(page_links, 1):
+                print(f"\nProcessing pagination page {i}: {page_url}")
                 try:
-                    WebDriverWait(driver, 20).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "article"))
-                    )
-                except TimeoutException:
-                    print("Page load timed out. Proceeding with what we have...")
-                
-                # Short delay
-                time.sleep(random.uniform(2, 4))
-                
-                # Save the page
-                page_source = driver.page_source
-                page_filename = os.path.join(html_dir, f'page_{i+1}.html')
-                save_html(page_source, page_filename)
-                print(f"Saved pagination page as {page_filename}")
-                
-                # Extract books from this page
-                page_soup = BeautifulSoup(page_source, 'html.parser')
-                page_articles = page_soup.find_all('article')
-                
-                for article in page_articles:
-                    title_element = article.find(['h2', 'h3'], class_='entry-title')
-                    if title_element:
-                        link_element = title_element.find('a')
-                        if link_element and link_element.get('href'):
-                            title = link_element.get_text(strip=True)
-                            url = link_element.get('href')
-                            book_links.append((url, title))
-                
-                print(f"Found {len(page_articles)} articles on page {i+1}")
-                
-            except Exception as e:
-                print(f"Error processing pagination page {page_url}: {e}")
+                    # Load the page with Selenium
+                    driver.get(page_url)
+                    
+                    # Wait for articles to load
+                    try:
+                        WebDriverWait(driver, 20).until(
+                            EC.presence_of_element_located((By.TAG_NAME, "article"))
+                        )
+                    except TimeoutException:
+                        print("Page load timed out. Proceeding with what we have...")
+                    
+                    # Short delay
+                    time.sleep(random.uniform(2, 4))
+                    
+                    # Save the page
+                    page_source = driver.page_source
+                    page_filename = os.path.join(html_dir, f'page_{i+1}.html')
+                    save_html(page_source, page_filename, page_url)
+                    print(f"Saved pagination page as {page_filename}")
+                    
+                    # Extract books from this page
+                    page_soup = BeautifulSoup(page_source, 'html.parser')
+                    page_articles = page_soup.find_all('article')
+                    
+                    for article in page_articles:
+                        title_element = article.find(['h2', 'h3'], class_='entry-title')
+                        if title_element:
+                            link_element = title_element.find('a')
+                            if link_element and link_element.get('href'):
+                                title = link_element.get_text(strip=True)
+                                url = link_element.get('href')
+                                book_links.append((url, title))
+                    
+                    print(f"Found {len(page_articles)} articles on page {i+1}")
+                    
+                except Exception as e:
+                    print(f"Error processing pagination page {page_url}: {e}")
         
         # Remove duplicate book links
         unique_book_links = []
         seen_urls = set()
         for url, title in book_links:
-            if url not in seen_urls:
+            key = canonicalize_url(url)
+            if key not in seen_urls:
                 unique_book_links.append((url, title))
-                seen_urls.add(url)
+                seen_urls.add(key)
         
         print(f"\nTotal unique books found: {len(unique_book_links)}")
         
@@ -197,7 +206,9 @@ def scrape_with_selenium():
                 filepath = os.path.join(books_dir, filename)
                 
                 # Save book HTML
-                save_html(book_html, filepath)
+                save_html(book_html, filepath, book_url)
+                record_article(book_url, stage="downloaded", site="readmaududi.com",
+                               title=book_title, blob=filepath, content_hash=content_hash(book_html))
                 print(f"Saved book: {filepath}")
                 
                 # Check for PDFs or downloadable content
@@ -215,29 +226,28 @@ def scrape_with_selenium():
                     os.makedirs(downloads_dir, exist_ok=True)
                     
                     for j, (dl_url, dl_text) in enumerate(download_links):
+                        # Convert to absolute URL if necessary
+                        if not dl_url.startswith('http'):
+                            dl_url = urljoin(book_url, dl_url)
+                        
+                        # Determine filename
+                        dl_filename = os.path.basename(urlparse(dl_url).path)
+                        if not dl_filename or len(dl_filename) < 5:
+                            ext = '.pdf' if '.pdf' in dl_url.lower() else '.bin'
+                            dl_filename = f"{safe_name}_download_{j+1}{ext}"
+                        
+                        dl_path = os.path.join(downloads_dir, dl_filename)
+                        
+                        headers = {
+                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                            'Referer': book_url
+                        }
+                        
                         try:
-                            # Convert to absolute URL if necessary
-                            if not dl_url.startswith('http'):
-                                dl_url = urljoin(book_url, dl_url)
-                                
                             print(f"  Downloading: {dl_url}")
                             
-                            # Use requests to download the file
-                            headers = {
-                                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                                'Referer': book_url
-                            }
-                            
-                            response = requests.get(dl_url, headers=headers, stream=True)
-                            response.raise_for_status()
-                            
-                            # Determine filename
-                            dl_filename = os.path.basename(urlparse(dl_url).path)
-                            if not dl_filename or len(dl_filename) < 5:
-                                ext = '.pdf' if '.pdf' in dl_url.lower() else '.bin'
-                                dl_filename = f"{safe_name}_download_{j+1}{ext}"
-                            
-                            dl_path = os.path.join(downloads_dir, dl_filename)
+                            # Use requests to download the file, retrying transient errors
+                            response = fetch(dl_url, headers=headers, stream=True, priority=PDF)
                             
                             # Save the file
                             with open(dl_path, 'wb') as f:
@@ -249,6 +259,7 @@ def scrape_with_selenium():
                             
                         except Exception as e:
                             print(f"  Error downloading {dl_url}: {e}")
+                            record_failure(dl_url, e, dl_path, binary=True, headers=headers)
                 
             except Exception as e:
                 print(f"Error processing book {book_title}: {e}")
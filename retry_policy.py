@@ -0,0 +1,539 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import importlib
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+
+# Downloads that failed for good, one JSON object per line, replayed by 'retry-failed'.
+# A replay moves the queue aside under this suffix, so crawlers running
+# meanwhile append their failures to a new queue instead of losing them.
+FAILED_FILE = "failed_work.jsonl"
+REPLAY_SUFFIX = ".replaying"
+
+# Attempts per request; the wait before a retry is drawn uniformly between zero
+# and a cap that doubles with every attempt (full jitter), so crawlers that
+# failed together do not retry together
+MAX_ATTEMPTS = 4
+BASE_DELAY = 2.0
+MAX_DELAY = 60.0
+
+# Seconds before a request is abandoned when the caller does not give a timeout
+DEFAULT_TIMEOUT = 30
+
+# A host's circuit opens after this many failed requests in a row. While it is
+# open no requests are sent to the host; after COOLDOWN seconds one trial
+# request is let through, and its outcome closes or reopens the circuit.
+FAILURE_THRESHOLD = 5
+COOLDOWN = 300.0
+
+# Statuses worth retrying; with 429 and 503 the server may say how long to wait
+TRANSIENT_STATUSES = {408, 425, 500, 502, 503, 504, 520, 521, 522, 524}
+THROTTLED_STATUSES = {429, 503}
+
+# Error classes returned by classify()
+TRANSIENT = "transient"
+THROTTLED = "throttled"
+PERMANENT = "permanent"
+
+# Request priorities for the fetch scheduler; requests waiting for the same
+# host are sent lowest first, so listings lead to articles before PDFs are fetched
+LISTING = 0
+ARTICLE = 1
+PDF = 2
+
+# Scheduler spacing the requests of every crawler in the process, if one is running
+_scheduler = None
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+def classify(error):
+    """Return whether a request error is worth retrying: 'throttled', 'transient' or 'permanent'"""
+    if isinstance(error, CircuitOpen):
+        return TRANSIENT
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status in THROTTLED_STATUSES:
+            return THROTTLED
+        return TRANSIENT if status in TRANSIENT_STATUSES else PERMANENT
+    if isinstance(error, (requests.ConnectionError, requests.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return TRANSIENT
+    return PERMANENT
+
+def retry_after(error):
+    """Return the seconds a throttled response asks to wait, or None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def host_of(url):
+    """Return the host and port a circuit breaker is kept for"""
+    return urlsplit(url).netloc.lower()
+
+class CircuitBreaker:
+    """Consecutive failures of one host, and whether requests to it are let through"""
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.trial_thread = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Check whether a request may be sent, letting one trial through after the cooldown"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial and time.monotonic() - self.opened_at >= self.cooldown:
+                self.trial = True
+                self.trial_thread = threading.get_ident()
+                return True
+            return False
+
+    def end_trial(self):
+        """Let another trial through if this thread's trial ended without success() or failure()"""
+        with self.lock:
+            if self.trial and self.trial_thread == threading.get_ident():
+                self.trial = False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        """Count a failed request, opening the circuit at the threshold or after a failed trial"""
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial = False
+
+class RetryPolicy:
+    """Sends GET requests with jittered retries and a circuit breaker per host
+
+    Failures that outlast the retries are appended to the failed-work file
+    by record_failure(), from where retry_failed() replays them later.
+    """
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN, failed_file=FAILED_FILE):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failed_file = failed_file
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.skipped = 0
+
+    def breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self.breakers[host]
+
+    def backoff(self, attempt, error):
+        """Return the seconds to wait before retrying after the given attempt"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after(error) if classify(error) == THROTTLED else None
+        if requested is not None:
+            delay = max(delay, min(requested, self.max_delay))
+        return delay
+
+    def fetch(self, url, session=None, priority=ARTICLE, **kwargs):
+        """Return the response to a GET request, retrying transient errors
+
+        Raises the last error once the attempts are used up, the error is
+        permanent (such as a 404), or CircuitOpen if the host's circuit is open.
+        With a scheduler running, each attempt waits for its turn at the host.
+        """
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        host = host_of(url)
+        breaker = self.breaker(host)
+        for attempt in range(self.max_attempts):
+            if not breaker.allow():
+                self.skipped += 1
+                raise CircuitOpen(f"{host} keeps failing; not requesting {url}")
+            self.requests += 1
+            response = None
+            try:
+                scheduler = _scheduler
+                if scheduler:
+                    scheduler.acquire(host, priority)
+                try:
+                    response = (session or requests).get(url, **kwargs)
+                finally:
+                    if scheduler:
+                        scheduler.release(host)
+                response.raise_for_status()
+                breaker.success()
+                return response
+            except Exception as e:
+                if response is not None:
+                    response.close()
+                kind = classify(e)
+                if kind == PERMANENT:
+                    # The host answered, so it is up even if this page is not
+                    if isinstance(e, requests.HTTPError):
+                        breaker.success()
+                    raise
+                breaker.failure()
+                if attempt + 1 == self.max_attempts:
+                    raise
+                self.retries += 1
+                time.sleep(self.backoff(attempt, e))
+            finally:
+                # An error that says nothing about the host, such as too many
+                # redirects, must not leave the circuit waiting on its trial
+                breaker.end_trial()
+
+    def record_failure(self, url, error, path, binary=False, headers=None, record=None,
+                       pdf_of=None, follow=None):
+        """Queue a download that failed for good so 'retry-failed' can replay it
+
+        The page is saved to path when it is replayed, as raw bytes if binary,
+        and record holds the catalog fields to record with it. A PDF's pdf_of
+        holds the catalog identifiers of its article, such as {"url": ...}.
+        follow names the "module.function" that crawls what a listing page
+        links to; it is run once after the replay.
+        """
+        item = {"url": url, "path": path, "binary": binary, "headers": headers, "record": record,
+                "pdf_of": pdf_of, "follow": follow,
+                "kind": classify(error), "error": str(error)[:300],
+                "source": os.path.basename(sys.argv[0]),
+                "failed_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        with self.lock, open(self.failed_file, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def load_failed(self, paths=None):
+        """Return the queued failures, keeping the latest one per URL"""
+        items = {}
+        for path in paths or (self.failed_file + REPLAY_SUFFIX, self.failed_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        item = json.loads(line)
+                        items[item["url"]] = item
+        return list(items.values())
+
+    def retry_failed(self):
+        """Download the queued failures again, keeping those that still fail; returns (recovered, remaining)
+
+        Failures recorded while the replay runs stay queued for the next one.
+        """
+        replaying = self.failed_file + REPLAY_SUFFIX
+        with self.lock:
+            if os.path.exists(self.failed_file):
+                if os.path.exists(replaying):
+                    # Left by an interrupted replay; add the newer failures to it
+                    with open(self.failed_file, 'r', encoding='utf-8') as source, \
+                            open(replaying, 'a', encoding='utf-8') as target:
+                        target.write(source.read())
+                    os.remove(self.failed_file)
+                else:
+                    os.replace(self.failed_file, replaying)
+        items = self.load_failed([replaying])
+        remaining = []
+        recovered = 0
+        follow_ups = []
+        for i, item in enumerate(items, 1):
+            try:
+                response = self.fetch(item["url"], headers=item.get("headers"), stream=item["binary"])
+                save_download(item, response)
+                recovered += 1
+                print(f"[{i}/{len(items)}] Recovered {item['url']}")
+                if item.get("follow") and item["follow"] not in follow_ups:
+                    follow_ups.append(item["follow"])
+            except Exception as e:
+                item.update(kind=classify(e), error=str(e)[:300], replays=item.get("replays", 0) + 1)
+                remaining.append(item)
+                print(f"[{i}/{len(items)}] Still failing ({item['kind']}): {item['url']}")
+
+        # Crawl the articles of the listing pages that came back
+        for name in follow_ups:
+            module_name, function_name = name.rsplit(".", 1)
+            print(f"Following up recovered listing pages with {name}")
+            try:
+                getattr(importlib.import_module(module_name), function_name)()
+            except Exception as e:
+                print(f"{name} stopped: {e}")
+
+        with self.lock:
+            with open(self.failed_file, 'a', encoding='utf-8') as file:
+                for item in remaining:
+                    file.write(json.dumps(item, ensure_ascii=False) + "\n")
+            os.remove(replaying)
+        return recovered, len(remaining)
+
+def save_download(item, response):
+    """Save a replayed download where the failed run would have, and record it in the catalog"""
+    from page_archive import save_page
+    from corpus_catalog import content_hash, mark_stage, record_article
+
+    if item["binary"]:
+        os.makedirs(os.path.dirname(item["path"]) or ".", exist_ok=True)
+        with open(item["path"], 'wb') as file:
+            for chunk in response.iter_content(chunk_size=8192):
+                file.write(chunk)
+        content = None
+    else:
+        content = response.text
+        save_page(item["path"], content, url=item["url"])
+    if item.get("record"):
+        record_article(item["url"], content_hash=content_hash(content) if content else None, **item["record"])
+    if item.get("pdf_of"):
+        mark_stage(None, pdf_path=item["path"], **item["pdf_of"])
+
+# Policy shared by the crawlers of a process
+_policy = RetryPolicy()
+
+def fetch(url, session=None, priority=ARTICLE, **kwargs):
+    """Send a GET request with the shared retry policy"""
+    return _policy.fetch(url, session, priority, **kwargs)
+
+def set_scheduler(scheduler):
+    """Route the requests of this process through a fetch scheduler, or stop with None"""
+    global _scheduler
+    _scheduler = scheduler
+
+def submit(function, *args, **kwargs):
+    """Run a crawl task on the scheduler's task threads, or right away without a scheduler
+
+    A future is returned either way, so callers wait for their tasks alike.
+    """
+    if _scheduler is not None:
+        return _scheduler.submit(function, *args, **kwargs)
+    future = Future()
+    try:
+        future.set_result(function(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def pause(seconds):
+    """Wait between requests to be polite, unless a scheduler is already spacing them"""
+    if _scheduler is None:
+        time.sleep(seconds)
+
+def record_failure(url, error, path, binary=False, headers=None, record=None, pdf_of=None, follow=None):
+    """Queue a failed download with the shared retry policy"""
+    _policy.record_failure(url, error, path, binary, headers, record, pdf_of, follow)
+
+def list_failed(policy=_policy):
+    """Print the queued failures by host and error class"""
+    items = policy.load_failed()
+    if not items:
+        print("No failed downloads queued.")
+        return
+    counts = {}
+    for item in items:
+        key = (host_of(item["url"]), item["kind"])
+        counts[key] = counts.get(key, 0) + 1
+    print(f"{len(items)} failed downloads in {policy.failed_file}")
+    for (host, kind), count in sorted(counts.items()):
+        print(f"  {host:32}{kind:12}{count:>6}")
+
+def start_fault_server(behavior):
+    """Serve generated pages on a local port, failing as behavior(path) decides; returns the server"""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, delay, headers = behavior(self.path)
+            time.sleep(delay)
+            body = f"<html><body><p>{self.path}</p></body></html>".encode('utf-8')
+            try:
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def benchmark(pages=60, dead_pages=20, error_rate=0.3, timeout=0.5):
+    """Compare single attempts with the retry policy against a flaky host and a hung host
+
+    The flaky host answers error_rate of its requests with 500 or 429, and
+    the hung host answers after twice the timeout. The hung host then
+    recovers and the failed work is replayed.
+    """
+    import tempfile
+
+    rng = random.Random(1)
+    state = {"hung": True}
+
+    def flaky(path):
+        roll = rng.random()
+        if roll < error_rate * 2 / 3:
+            return 500, 0.0, {}
+        if roll < error_rate:
+            return 429, 0.0, {"Retry-After": "0"}
+        return 200, 0.01, {}
+
+    def hung(path):
+        return (200, timeout * 2, {}) if state["hung"] else (200, 0.01, {})
+
+    servers = [start_fault_server(flaky), start_fault_server(hung)]
+    flaky_url, hung_url = (f"http://127.0.0.1:{s.server_address[1]}" for s in servers)
+    urls = [f"{flaky_url}/page/{i}" for i in range(pages)]
+    for i in range(dead_pages):
+        urls.insert(i * len(urls) // dead_pages, f"{hung_url}/page/{i}")
+
+    work_dir = tempfile.mkdtemp(prefix="retry_bench_")
+    results = []
+
+    # One attempt per page, as the crawlers did before
+    start = time.perf_counter()
+    ok = 0
+    for url in urls:
+        try:
+            requests.get(url, timeout=timeout).raise_for_status()
+            ok += 1
+        except Exception:
+            pass
+    results.append(("single attempt", ok, len(urls), time.perf_counter() - start))
+
+    # Retries and circuit breakers, with delays scaled down to the benchmark's timeout
+    policy = RetryPolicy(base_delay=timeout / 10, max_delay=timeout, cooldown=60,
+                         failed_file=os.path.join(work_dir, FAILED_FILE))
+    start = time.perf_counter()
+    ok = 0
+    for i, url in enumerate(urls):
+        try:
+            policy.fetch(url, timeout=timeout)
+            ok += 1
+        except Exception as e:
+            policy.record_failure(url, e, os.path.join(work_dir, f"page_{i}.html"))
+    results.append(("retry policy", ok, policy.requests, time.perf_counter() - start))
+
+    # The hung host is back; replay what failed
+    state["hung"] = False
+    policy.breakers.clear()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            recovered, remaining = policy.retry_failed()
+        finally:
+            sys.stdout = stdout
+    replay_time = time.perf_counter() - start
+
+    for server in servers:
+        server.shutdown()
+
+    print(f"{len(urls)} pages: {pages} on a host failing {error_rate:.0%} of requests, "
+          f"{dead_pages} on a host that hangs past the {timeout}s timeout")
+    print(f"\n{'strategy':16}{'fetched':>9}{'requests':>10}{'seconds':>9}{'pages/s':>9}")
+    for name, fetched, sent, elapsed in results:
+        print(f"{name:16}{fetched:>9}{sent:>10}{elapsed:>9.1f}{fetched / elapsed:>9.1f}")
+    print(f"\nRetry policy skipped {policy.skipped} requests to open circuits and queued "
+          f"{recovered + remaining} failures; replaying them after the host recovered "
+          f"fetched {recovered} in {replay_time:.1f}s ({remaining} still failing)")
+
+def selftest():
+    """Check that a trial request ending in an error unrelated to the host does not keep its circuit open"""
+    state = {"down": True}
+
+    def behavior(path):
+        if path.startswith("/loop"):
+            return 302, 0.0, {"Location": "/loop"}
+        return (503, 0.0, {}) if state["down"] else (200, 0.0, {})
+
+    server = start_fault_server(behavior)
+    root = f"http://127.0.0.1:{server.server_address[1]}"
+    policy = RetryPolicy(max_attempts=1, failure_threshold=2, cooldown=0.2)
+    failures = []
+
+    def outcome(path):
+        try:
+            policy.fetch(root + path, timeout=5)
+            return "ok"
+        except Exception as e:
+            return type(e).__name__
+
+    try:
+        # Open the circuit, then spend the trial on a redirect loop
+        opened = [outcome("/page") for _ in range(3)]
+        time.sleep(0.3)
+        trial = outcome("/loop")
+        state["down"] = False
+        time.sleep(0.3)
+        recovered = outcome("/page")
+    finally:
+        server.shutdown()
+
+    if opened[-1] != "CircuitOpen":
+        failures.append("circuit did not open")
+    if trial != "TooManyRedirects":
+        failures.append(f"trial ended with {trial}")
+    if recovered != "ok":
+        failures.append(f"request after the trial ended with {recovered}")
+    print(f"Opening the circuit: {', '.join(opened)}; trial: {trial}; next request: {recovered}")
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("The circuit let a new trial through and closed once the host answered.")
+
+def main():
+    """Replay or list failed downloads, benchmark the retry policy, or test the circuit breaker"""
+    parser = argparse.ArgumentParser(description="Retry downloads that failed in earlier runs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("retry-failed", help="download the queued failures again")
+    commands.add_parser("list", help="show the queued failures by host")
+    bench_parser = commands.add_parser("bench", help="measure throughput against a fault-injecting local server")
+    bench_parser.add_argument("--pages", type=int, default=60, help="pages on the flaky host")
+    bench_parser.add_argument("--dead-pages", type=int, default=20, help="pages on the hung host")
+    bench_parser.add_argument("--error-rate", type=float, default=0.3, help="share of failing requests")
+    commands.add_parser("selftest", help="check the circuit breaker against a local server")
+    args = parser.parse_args()
+
+    if args.command == "selftest":
+        selftest()
+    elif args.command == "retry-failed":
+        recovered, remaining = _policy.retry_failed()
+        print(f"Recovered {recovered} downloads; {remaining} still failing")
+    elif args.command == "list":
+        list_failed()
+    else:
+        benchmark(args.pages, args.dead_pages, args.error_rate)
+
+if __name__ == "__main__":
+    main()
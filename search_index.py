@@ -0,0 +1,275 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import zipfile
+import xml.etree.ElementTree as ET
+from urdu_normalize import fold, fold_batch
+
+# SQLite FTS5 database holding the full-text index
+INDEX_FILE = "search_index.db"
+
+# Directories of extracted text and converted Word documents that are indexed
+DEFAULT_DIRS = ["articles_text", "rasailomasail_word", "maududi_books_word"]
+INDEXED_SUFFIXES = (".txt", ".docx")
+
+# Number of results printed for a query, and words shown around the matches of each
+DEFAULT_LIMIT = 10
+SNIPPET_WORDS = 16
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    url TEXT,
+    title TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    content_hash TEXT,
+    text TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, body, tokenize = 'unicode61 remove_diacritics 0', prefix = '2 3'
+);
+"""
+
+_connections = {}
+
+def connect(path=INDEX_FILE):
+    """Return a connection to the index, creating the schema on first use"""
+    key = (os.getpid(), path)
+    if key not in _connections:
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        _migrate(connection)
+        _connections[key] = connection
+    return _connections[key]
+
+def _migrate(connection):
+    """Add the original text column to an index created without it
+
+    The documents are marked as changed, so the next update stores their text.
+    """
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(documents)")}
+    if "text" not in columns:
+        connection.execute("ALTER TABLE documents ADD COLUMN text TEXT")
+        connection.execute("UPDATE documents SET size = NULL, mtime_ns = NULL")
+
+def read_docx_text(path):
+    """Return the paragraphs of a .docx as a list of strings, streaming word/document.xml"""
+    paragraphs = []
+    parts = []
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as stream:
+        for event, elem in ET.iterparse(stream, events=('end',)):
+            if elem.tag == W_NS + 't':
+                parts.append(elem.text or '')
+            elif elem.tag == W_NS + 'tab':
+                parts.append('\t')
+            elif elem.tag == W_NS + 'p':
+                paragraphs.append(''.join(parts))
+                parts = []
+                elem.clear()
+    return paragraphs
+
+def index_text(path, text, title=None, url=None, size=None, mtime_ns=None):
+    """Add or replace the indexed text of a document, returning True if it changed
+
+    Documents are keyed by path; text with the same hash as the indexed
+    copy is not re-indexed. The folded text is indexed and the original is
+    kept unindexed for the snippets.
+    """
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    if title is None:
+        title = next((line.strip() for line in text.splitlines() if line.strip()), '')
+
+    connection = connect()
+    row = connection.execute("SELECT id, content_hash FROM documents WHERE path = ?", (path,)).fetchone()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        if row is not None and row["content_hash"] == digest:
+            connection.execute("UPDATE documents SET size = ?, mtime_ns = ?, url = COALESCE(?, url), "
+                               "text = COALESCE(text, ?) WHERE id = ?", (size, mtime_ns, url, text, row["id"]))
+            connection.execute("COMMIT")
+            return False
+
+        if row is not None:
+            doc_id = row["id"]
+            connection.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+            connection.execute(
+                "UPDATE documents SET title = ?, url = COALESCE(?, url), size = ?, mtime_ns = ?, "
+                "content_hash = ?, text = ? WHERE id = ?", (title, url, size, mtime_ns, digest, text, doc_id))
+        else:
+            doc_id = connection.execute(
+                "INSERT INTO documents (path, url, title, size, mtime_ns, content_hash, text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (path, url, title, size, mtime_ns, digest, text)).lastrowid
+        connection.execute("INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                           (doc_id, fold(title), fold(text)))
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    return True
+
+def index_file(path, url=None):
+    """Index a .txt or .docx file unless its size and modification time are unchanged"""
+    stat = os.stat(path)
+    row = connect().execute("SELECT size, mtime_ns FROM documents WHERE path = ?", (path,)).fetchone()
+    if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+        return False
+
+    if path.endswith('.docx'):
+        text = '\n'.join(read_docx_text(path))
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            text = file.read()
+    return index_text(path, text, url=url, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+def remove_document(path):
+    """Remove a document from the index"""
+    connection = connect()
+    row = connection.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+    if row is None:
+        return
+    connection.execute("BEGIN IMMEDIATE")
+    connection.execute("DELETE FROM documents_fts WHERE rowid = ?", (row["id"],))
+    connection.execute("DELETE FROM documents WHERE id = ?", (row["id"],))
+    connection.execute("COMMIT")
+
+def update_index(directories=DEFAULT_DIRS):
+    """Index new and changed files in the given directories and drop deleted ones"""
+    start = time.perf_counter()
+    found = set()
+    indexed = 0
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.endswith(INDEXED_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                found.add(path)
+                try:
+                    if index_file(path):
+                        indexed += 1
+                except Exception as e:
+                    print(f"Error indexing {path}: {e}")
+
+    removed = 0
+    for row in connect().execute("SELECT path FROM documents").fetchall():
+        path = row["path"]
+        if path not in found and any(path.startswith(os.path.join(d, '')) for d in directories):
+            remove_document(path)
+            removed += 1
+
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {indexed} new or changed documents, removed {removed}, "
+          f"{len(found) - indexed} unchanged ({elapsed:.2f}s)")
+
+def build_match(query):
+    """Turn a query into an FTS5 expression
+
+    Words are ANDed, "quoted text" is a phrase, a trailing * makes a prefix
+    query, and OR and NOT are passed through.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if phrase:
+            words = fold(phrase).split()
+            if words:
+                terms.append('"' + ' '.join(w.replace('"', '""') for w in words) + '"')
+        elif word in ("OR", "NOT", "AND"):
+            terms.append(word)
+        else:
+            prefix = word.endswith('*')
+            word = fold(word.rstrip('*')).replace('"', '""')
+            if word:
+                terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+def query_terms(query):
+    """Return the folded words of a query to highlight, and the ones matched as prefixes"""
+    words, prefixes = set(), set()
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        if word in ("OR", "NOT", "AND"):
+            continue
+        if word.endswith('*'):
+            prefixes.update(re.findall(r'\w+', fold(word.rstrip('*'))))
+        else:
+            words.update(re.findall(r'\w+', fold(phrase or word)))
+    return words, prefixes
+
+def make_snippet(text, words, prefixes, length=SNIPPET_WORDS):
+    """Return the stretch of original text with the most query words, those words in brackets"""
+    tokens = text.split()
+    if not tokens:
+        return ''
+    hits = [any(part in words or any(part.startswith(p) for p in prefixes) for part in re.findall(r'\w+', key))
+            for key in fold_batch(tokens)]
+    best = 0
+    best_count = count = sum(hits[:length])
+    for start in range(1, max(1, len(tokens) - length + 1)):
+        count += hits[start + length - 1] - hits[start - 1]
+        if count > best_count:
+            best, best_count = start, count
+    # Start a few words before the first match rather than right at the window's edge
+    if best_count:
+        first = hits.index(True, best)
+        best = max(0, min(first - length // 4, len(tokens) - length))
+    end = min(best + length, len(tokens))
+    shown = [f"[{token}]" if hit else token for token, hit in zip(tokens[best:end], hits[best:end])]
+    return (' … ' if best else '') + ' '.join(shown) + (' … ' if end < len(tokens) else '')
+
+def search(query, limit=DEFAULT_LIMIT):
+    """Return the best matching documents with a snippet of the matching text
+
+    The snippet is cut from the original text, so it keeps its diacritics.
+    """
+    match = build_match(query)
+    if not match:
+        return []
+    rows = connect().execute(
+        "SELECT d.path, d.url, d.title, d.text, "
+        "snippet(documents_fts, 1, '[', ']', ' … ', ?) AS snippet "
+        "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+        "WHERE documents_fts MATCH ? ORDER BY bm25(documents_fts, 5.0, 1.0) LIMIT ?",
+        (SNIPPET_WORDS, match, limit)).fetchall()
+    words, prefixes = query_terms(query)
+    results = []
+    for row in rows:
+        result = dict(row)
+        # Documents indexed before the original text was kept fall back to the folded snippet
+        if result.pop("text"):
+            result["snippet"] = make_snippet(row["text"], words, prefixes)
+        results.append(result)
+    return results
+
+def main():
+    """Update the index or query it from the command line"""
+    command = sys.argv[1] if len(sys.argv) > 1 else "update"
+
+    if command == "update":
+        update_index(sys.argv[2:] or DEFAULT_DIRS)
+    elif command == "query":
+        query = ' '.join(sys.argv[2:])
+        start = time.perf_counter()
+        results = search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        for i, row in enumerate(results, 1):
+            print(f"{i}. {row['title']}")
+            print(f"   {row['url'] or row['path']}")
+            print(f"   {row['snippet']}")
+        print(f"{len(results)} results in {elapsed:.1f} ms")
+    elif command == "stats":
+        count = connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        print(f"{count} documents indexed in {INDEX_FILE}")
+    else:
+        print("Usage: search_index.py [update [DIR ...] | query WORDS | stats]")
+
+if __name__ == "__main__":
+    main()
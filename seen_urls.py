@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import math
+import atexit
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, quote
+
+# Directory holding the Bloom filters and the exact URL store
+SEEN_DIR = "seen_urls"
+SEEN_DB = os.path.join(SEEN_DIR, "seen_urls.db")
+
+# Expected number of URLs per set and acceptable Bloom false-positive rate
+DEFAULT_CAPACITY = 5_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+# Query parameters that never change the page content
+IGNORED_PARAMS = {"fbclid", "gclid"}
+IGNORED_PARAM_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Characters left as they are when percent-encoding paths and queries
+UNRESERVED = "-._~"
+PATH_SAFE = "/:@!$&'()*+,;=" + UNRESERVED
+QUERY_SAFE = ":@!$'()*+,;/?" + UNRESERVED
+
+_PERCENT_RE = re.compile(r'%([0-9A-Fa-f]{2})')
+
+def _normalize_percent(text, safe):
+    """Percent-encode raw characters and give escapes one canonical form
+
+    Escapes of unreserved characters are decoded and all other escapes use
+    upper-case hex, so equivalent encodings of the same URL compare equal.
+    """
+    text = quote(text, safe=safe + "%")
+
+    def fix(match):
+        char = chr(int(match.group(1), 16))
+        if char.isascii() and (char.isalnum() or char in UNRESERVED):
+            return char
+        return "%" + match.group(1).upper()
+
+    return _PERCENT_RE.sub(fix, text)
+
+def _remove_dot_segments(path):
+    """Resolve '.' and '..' segments in a URL path"""
+    output = []
+    for segment in path.split('/'):
+        if segment == '..':
+            if len(output) > 1:
+                output.pop()
+        elif segment != '.':
+            output.append(segment)
+    return '/'.join(output)
+
+def canonicalize_url(url, base=None):
+    """Return a canonical form of a URL so that variants of the same page compare equal
+
+    The scheme and host are lower-cased, default ports, fragments, tracking
+    parameters and trailing slashes are dropped, query parameters are sorted
+    and percent-encoding is normalized.
+    """
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{userinfo}@{host}"
+
+    path = _remove_dot_segments(_normalize_percent(parts.path, PATH_SAFE))
+    path = path.rstrip('/') or '/'
+
+    params = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in IGNORED_PARAMS and not k.startswith(IGNORED_PARAM_PREFIXES)
+    ]
+    query = '&'.join(f"{_normalize_percent(k, QUERY_SAFE)}={_normalize_percent(v, QUERY_SAFE)}"
+                     for k, v in sorted(params))
+
+    return urlunsplit((scheme, host, path, query, ''))
+
+def url_digest(url):
+    """Return a 16-byte digest of a URL's canonical form"""
+    return hashlib.blake2b(canonicalize_url(url).encode('utf-8'), digest_size=16).digest()
+
+class SeenSet:
+    """Persistent set of canonical URLs shared across runs
+
+    Membership is answered by an in-memory Bloom filter whose size is fixed
+    by the capacity, so memory stays bounded at millions of URLs. A "maybe"
+    from the filter is confirmed against an indexed SQLite table of URL
+    digests, so there are no false positives.
+    """
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        os.makedirs(SEEN_DIR, exist_ok=True)
+        self.name = name
+        self.bloom_path = os.path.join(SEEN_DIR, f"{name}.bloom")
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+
+        # Crawlers may create a set in one thread while atexit closes it in the
+        # main thread, so the connection is shared and used under a lock
+        self.db = sqlite3.connect(SEEN_DB, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen (name TEXT NOT NULL, digest BLOB NOT NULL, "
+            "url TEXT, PRIMARY KEY (name, digest)) WITHOUT ROWID")
+        self.count = self.db.execute("SELECT COUNT(*) FROM seen WHERE name = ?", (name,)).fetchone()[0]
+        self.dirty = False
+        self._load_bloom()
+        atexit.register(self.close)
+
+    def _positions(self, digest):
+        """Return the Bloom filter bit positions for a digest, using double hashing"""
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def _set_bits(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def _load_bloom(self):
+        """Load the saved Bloom filter, rebuilding it from SQLite if it is missing or stale"""
+        size = (self.num_bits + 7) // 8
+        if os.path.exists(self.bloom_path):
+            with open(self.bloom_path, 'rb') as file:
+                header = file.read(16)
+                saved_count = int.from_bytes(header[:8], 'little')
+                saved_bits = int.from_bytes(header[8:], 'little')
+                if saved_bits == self.num_bits and saved_count == self.count:
+                    self.bits = bytearray(file.read())
+                    if len(self.bits) == size:
+                        return
+
+        self.bits = bytearray(size)
+        for (digest,) in self.db.execute("SELECT digest FROM seen WHERE name = ?", (self.name,)):
+            self._set_bits(digest)
+        self.dirty = True
+
+    def __contains__(self, url):
+        digest = url_digest(url)
+        for pos in self._positions(digest):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        with self.lock:
+            row = self.db.execute("SELECT 1 FROM seen WHERE name = ? AND digest = ?",
+                                  (self.name, digest)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, url):
+        """Add a URL, returning True if it was not seen before"""
+        digest = url_digest(url)
+        with self.lock:
+            cursor = self.db.execute("INSERT OR IGNORE INTO seen (name, digest, url) VALUES (?, ?, ?)",
+                                     (self.name, digest, canonicalize_url(url)))
+            self.db.commit()
+            if cursor.rowcount == 0:
+                return False
+            self._set_bits(digest)
+            self.count += 1
+            self.dirty = True
+        return True
+
+    def save(self):
+        """Write the Bloom filter next to the exact store"""
+        if not self.dirty:
+            return
+        tmp_path = self.bloom_path + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(self.count.to_bytes(8, 'little') + self.num_bits.to_bytes(8, 'little'))
+            file.write(self.bits)
+        os.replace(tmp_path, self.bloom_path)
+        self.dirty = False
+
+    def close(self):
+        """Save the Bloom filter and close the database"""
+        with self.lock:
+            if self.db is None:
+                return
+            self.save()
+            self.db.close()
+            self.db = None
+
+def all_known(urls, seen):
+    """Check whether every link of a listing page is already in a seen-set
+
+    Listings are newest-first, so an incremental crawl can stop at the
+    first page that holds no new links. An empty page never counts as known.
+    """
+    return bool(urls) and all(url in seen for url in urls)
+
+def main():
+    """Print the canonical form of URLs, or the size of the seen-sets"""
+    if len(sys.argv) > 1:
+        for url in sys.argv[1:]:
+            print(canonicalize_url(url))
+        return
+
+    if not os.path.exists(SEEN_DB):
+        print("No seen-sets yet.")
+        return
+    db = sqlite3.connect(SEEN_DB)
+    for name, count in db.execute("SELECT name, COUNT(*) FROM seen GROUP BY name ORDER BY name"):
+        print(f"{name}: {count:,} URLs")
+
+if __name__ == "__main__":
+    main()
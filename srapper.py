@@ -1,10 +1,20 @@
-import requests
 import os
-import time
+import argparse
+from concurrent.futures import wait
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+from page_archive import next_page_number, save_page
+from corpus_catalog import content_hash, mark_stage, record_article
+from seen_urls import SeenSet, all_known, canonicalize_url
+from retry_policy import ARTICLE, LISTING, PDF, fetch, pause, record_failure, submit
 
-def scrape_tarjumanulquran():
+def scrape_tarjumanulquran(incremental=False):
+    """Crawl the author's listing pages and download their articles and PDFs
+
+    With incremental, crawling stops at the first listing page whose articles
+    were all downloaded before. Listing pages are then saved after the ones
+    already saved, since new articles push older ones onto later pages.
+    """
     # Create directories to store HTML files
     os.makedirs('pages', exist_ok=True)
     os.makedirs('articles', exist_ok=True)
@@ -15,14 +25,18 @@ def scrape_tarjumanulquran():
     
     base_url = "https://www.tarjumanulquran.org/authors/2003/"
     
-    def get_html(url):
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.text
+    # Articles saved by this or earlier runs, and the article downloads handed out
+    downloaded = SeenSet('articles')
+    tasks = []
+    pdf_dir = os.path.join('articles', 'pdfs')
+    os.makedirs(pdf_dir, exist_ok=True)
+    
+    def get_html(url, priority=ARTICLE):
+        # Transient errors are retried; a host that keeps failing is skipped
+        return fetch(url, headers=headers, priority=priority).text
     
-    def save_html(content, file_path):
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(content)
+    def save_html(content, file_path, url=None):
+        save_page(file_path, content, url=url)
     
     def get_safe_filename(url):
         # Create a filename based on the URL
@@ -92,6 +106,14 @@ def scrape_tarjumanulquran():
     def extract_article_links(soup, page_url):
         print(f"Extracting article links from {page_url}...")
         article_urls = []
+        seen = set()
+        
+        def add_link(full_url):
+            # Compare canonical forms so URL variants of one article are kept once
+            key = canonicalize_url(full_url)
+            if key not in seen:
+                seen.add(key)
+                article_urls.append(full_url)
         
         # Method 1: Find article containers
         articles = soup.find_all('article')
@@ -100,9 +122,7 @@ def scrape_tarjumanulquran():
             for link in links:
                 href = link.get('href')
                 if href:
-                    full_url = urljoin(page_url, href)
-                    if full_url not in article_urls:
-                        article_urls.append(full_url)
+                    add_link(urljoin(page_url, href))
         
         # Method 2: Find headings with links (common for article titles)
         if not article_urls:
@@ -112,9 +132,7 @@ def scrape_tarjumanulquran():
                 for link in links:
                     href = link.get('href')
                     if href:
-                        full_url = urljoin(page_url, href)
-                        if full_url not in article_urls:
-                            article_urls.append(full_url)
+                        add_link(urljoin(page_url, href))
         
         # Method 3: Look for common article containers
         if not article_urls:
@@ -125,125 +143,163 @@ def scrape_tarjumanulquran():
                     href = link.get('href')
                     if href:
                         full_url = urljoin(page_url, href)
-                        if full_url not in article_urls and urlparse(full_url).netloc == urlparse(page_url).netloc:
-                            article_urls.append(full_url)
+                        if urlparse(full_url).netloc == urlparse(page_url).netloc:
+                            add_link(full_url)
         
         print(f"Found {len(article_urls)} article URLs")
         return article_urls
     
-    def save_articles(article_urls, page_num):
-        pdf_dir = os.path.join('articles', 'pdfs')
-        os.makedirs(pdf_dir, exist_ok=True)
-        
-        for i, article_url in enumerate(article_urls, start=1):
-            try:
-                print(f"Downloading article {i} from page {page_num}: {article_url}")
-                article_html = get_html(article_url)
-                
-                # Create filename for the HTML
-                article_filename = f'page{page_num}_article{i}_{get_safe_filename(article_url)}'
-                
-                # Save article HTML
-                save_html(article_html, os.path.join('articles', article_filename))
-                
-                # Check if there's a PDF link
-                soup = BeautifulSoup(article_html, 'html.parser')
+    def save_article(i, article_url, page_num):
+        # Create filename for the HTML
+        article_filename = f'page{page_num}_article{i}_{get_safe_filename(article_url)}'
+        article_path = os.path.join('articles', article_filename)
+        try:
+            print(f"Downloading article {i} from page {page_num}: {article_url}")
+            article_html = get_html(article_url)
+            
+            # Save article HTML
+            save_html(article_html, article_path, article_url)
+            record_article(article_url, stage="downloaded", site="tarjumanulquran.org",
+                           listing_page=f"page_{page_num}", blob=article_path,
+                           content_hash=content_hash(article_html))
+            downloaded.add(article_url)
+            
+            # Check if there's a PDF link
+            soup = BeautifulSoup(article_html, 'html.parser')
+            
+            # Find PDF download link - try multiple patterns
+            pdf_link = None
+            # Pattern 1: Look for PDF download link with ID
+            pdf_a_tag = soup.find('a', id='pdf-download')
+            if pdf_a_tag and pdf_a_tag.get('href'):
+                pdf_link = pdf_a_tag.get('href')
+            
+            # Pattern 2: Look for links containing PDF
+            if not pdf_link:
+                pdf_links = soup.find_all('a', href=lambda href: href and '.pdf' in href)
+                if pdf_links:
+                    pdf_link = pdf_links[0].get('href')
+            
+            # Pattern 3: Look for links with PDF images
+            if not pdf_link:
+                img_pdf_elements = soup.find_all('img', class_='img-pdf')
+                for img in img_pdf_elements:
+                    if img.parent and img.parent.name == 'a' and img.parent.get('href'):
+                        pdf_link = img.parent.get('href')
+                        break
+            
+            # Download PDF if found
+            if pdf_link:
+                pdf_url = urljoin(article_url, pdf_link)
+                print(f"  Found PDF: {pdf_url}")
                 
-                # Find PDF download link - try multiple patterns
-                pdf_link = None
-                # Pattern 1: Look for PDF download link with ID
-                pdf_a_tag = soup.find('a', id='pdf-download')
-                if pdf_a_tag and pdf_a_tag.get('href'):
-                    pdf_link = pdf_a_tag.get('href')
+                # Create PDF filename
+                pdf_filename = os.path.basename(pdf_url)
+                if not pdf_filename or not pdf_filename.lower().endswith('.pdf'):
+                    pdf_filename = f'page{page_num}_article{i}_{get_safe_filename(article_url)}.pdf'
+                else:
+                    # Prepend page and article number for organization
+                    pdf_filename = f'page{page_num}_article{i}_{pdf_filename}'
+                pdf_filepath = os.path.join(pdf_dir, pdf_filename)
                 
-                # Pattern 2: Look for links containing PDF
-                if not pdf_link:
-                    pdf_links = soup.find_all('a', href=lambda href: href and '.pdf' in href)
-                    if pdf_links:
-                        pdf_link = pdf_links[0].get('href')
-                
-                # Pattern 3: Look for links with PDF images
-                if not pdf_link:
-                    img_pdf_elements = soup.find_all('img', class_='img-pdf')
-                    for img in img_pdf_elements:
-                        if img.parent and img.parent.name == 'a' and img.parent.get('href'):
-                            pdf_link = img.parent.get('href')
-                            break
-                
-                # Download PDF if found
-                if pdf_link:
-                    pdf_url = urljoin(article_url, pdf_link)
-                    print(f"  Found PDF: {pdf_url}")
+                try:
+                    # Download the PDF
+                    response = fetch(pdf_url, headers=headers, stream=True, priority=PDF)
                     
-                    try:
-                        # Download the PDF
-                        response = requests.get(pdf_url, headers=headers, stream=True)
-                        response.raise_for_status()
-                        
-                        # Create PDF filename
-                        pdf_filename = os.path.basename(pdf_url)
-                        if not pdf_filename or not pdf_filename.lower().endswith('.pdf'):
-                            pdf_filename = f'page{page_num}_article{i}_{get_safe_filename(article_url)}.pdf'
-                        else:
-                            # Prepend page and article number for organization
-                            pdf_filename = f'page{page_num}_article{i}_{pdf_filename}'
-                        
-                        # Save the PDF file
-                        pdf_filepath = os.path.join(pdf_dir, pdf_filename)
-                        with open(pdf_filepath, 'wb') as pdf_file:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                pdf_file.write(chunk)
-                        
-                        print(f"  PDF saved as: {pdf_filename}")
-                    except Exception as pdf_error:
-                        print(f"  Error downloading PDF: {pdf_error}")
-                
-                time.sleep(1)  # Be polite to the server
-            except Exception as e:
-                print(f"Error saving article {article_url}: {e}")
+                    # Save the PDF file
+                    with open(pdf_filepath, 'wb') as pdf_file:
+                        for chunk in response.iter_content(chunk_size=8192):
+                            pdf_file.write(chunk)
+                    
+                    mark_stage(None, url=article_url, pdf_path=pdf_filepath)
+                    print(f"  PDF saved as: {pdf_filename}")
+                except Exception as pdf_error:
+                    print(f"  Error downloading PDF: {pdf_error}")
+                    record_failure(pdf_url, pdf_error, pdf_filepath, binary=True, headers=headers,
+                                   pdf_of={"url": article_url})
+            
+            pause(1)  # Be polite to the server
+        except Exception as e:
+            print(f"Error saving article {article_url}: {e}")
+            record_failure(article_url, e, article_path, headers=headers,
+                           record=dict(stage="downloaded", site="tarjumanulquran.org",
+                                       listing_page=f"page_{page_num}", blob=article_path))
+    
+    def save_articles(article_urls, page_num):
+        # Each article is a task of its own, so with the fetch scheduler running
+        # listing pages are fetched ahead of articles, and articles ahead of PDFs
+        for i, article_url in enumerate(article_urls, start=1):
+            if article_url in downloaded:
+                print(f"Already downloaded: {article_url}")
+                continue
+            tasks.append(submit(save_article, i, article_url, page_num))
     
     # Main process
     try:
         print(f"Starting with base URL: {base_url}")
         
-        # Get the first page
-        main_page_html = get_html(base_url)
+        # Number of the file the first listing page is saved as
+        first_page_num = next_page_number('pages') if incremental else 1
         
-        # Save the first page
-        first_page_filename = 'page_1.html'
-        save_html(main_page_html, os.path.join('pages', first_page_filename))
-        print(f"Saved page 1 as {first_page_filename}")
+        # Get the first page
+        main_page_html = get_html(base_url, LISTING)
         
         # Parse the first page
         soup = BeautifulSoup(main_page_html, 'html.parser')
         
-        # Extract article links from the first page
+        # Extract article links from the first page, and stop before saving
+        # it when an incremental crawl finds nothing new
         article_links = extract_article_links(soup, base_url)
-        save_articles(article_links, 1)
+        if incremental and all_known(article_links, downloaded):
+            print("Page 1 lists no new articles; nothing to crawl")
+            downloaded.save()
+            return
+        
+        # Save the first page
+        first_page_filename = f'page_{first_page_num}.html'
+        save_html(main_page_html, os.path.join('pages', first_page_filename), base_url)
+        print(f"Saved page 1 as {first_page_filename}")
+        save_articles(article_links, first_page_num)
         
         # Extract pagination links
         page_urls = extract_pagination_links(soup, base_url)
         
         # Process each pagination page
         for i, page_url in enumerate(page_urls, start=2):
+            page_num = first_page_num + i - 1
+            page_filename = f'page_{page_num}.html'
             try:
                 print(f"Processing page {i}: {page_url}")
-                page_html = get_html(page_url)
-                page_filename = f'page_{i}.html'
-                save_html(page_html, os.path.join('pages', page_filename))
+                page_html = get_html(page_url, LISTING)
                 
                 page_soup = BeautifulSoup(page_html, 'html.parser')
                 page_article_links = extract_article_links(page_soup, page_url)
-                save_articles(page_article_links, i)
+                if incremental and all_known(page_article_links, downloaded):
+                    print(f"Page {i} lists no new articles; the remaining pages were crawled before")
+                    break
+                save_html(page_html, os.path.join('pages', page_filename), page_url)
+                save_articles(page_article_links, page_num)
                 
-                time.sleep(1)  # Prevent overloading the server
+                pause(1)  # Prevent overloading the server
             except Exception as e:
                 print(f"Error processing page {page_url}: {e}")
+                record_failure(page_url, e, os.path.join('pages', page_filename), headers=headers,
+                               follow="article_scraper.extract_and_save_articles")
     
     except Exception as e:
         print(f"Error: {e}")
     
+    wait(tasks)
+    downloaded.save()
     print("Web scraping completed.")
 
+def main():
+    """Crawl tarjumanulquran.org, fully or only what is new since the last crawl"""
+    parser = argparse.ArgumentParser(description="Crawl the tarjumanulquran.org author listings")
+    parser.add_argument("--incremental", action="store_true",
+                        help="stop at the first listing page with no new articles")
+    args = parser.parse_args()
+    scrape_tarjumanulquran(args.incremental)
+
 if __name__ == "__main__":
-    scrape_tarjumanulquran()
\ No newline at end of file
+    main()
@@ -0,0 +1,178 @@
+import os
+import time
+import queue
+import argparse
+import threading
+from extractarticles import OUTPUT_DIR as ARTICLES_DIR, iter_volume_articles
+from articleword import OUTPUT_DIR as WORD_DIR, convert_article
+from boilerplate import BoilerplateFilter
+from docx_index import DocxIndex
+from merge_documents import (append_new_article, create_output_dir, get_article_title, load_manifest,
+                             mark_merged, save_manifest, start_volume_document, update_volume_document,
+                             volume_output_path)
+
+# Articles waiting between two stages; when a queue is full the faster stage waits for the slower one
+QUEUE_SIZE = 16
+
+# Put on a queue after the last article of a stage
+DONE = None
+
+def put(work_queue, item, stop):
+    """Put an item on a queue, giving up if the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            work_queue.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def get(work_queue, stop):
+    """Take the next item from a queue, or DONE if the pipeline is stopping"""
+    while not stop.is_set():
+        try:
+            return work_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return DONE
+
+class StageStats:
+    """Articles handled, busy time and finishing time of a stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.finished = None
+
+def crawl_stage(volume_num, output, stop, stats):
+    """Download the articles of the volume and hand each page to the converter"""
+    start = time.perf_counter()
+    try:
+        for title, url, page_path in iter_volume_articles(volume_num):
+            stats.items += 1
+            if not put(output, page_path, stop):
+                break
+    except Exception as e:
+        print(f"Crawl stopped: {e}")
+    finally:
+        stats.busy = time.perf_counter() - start
+        stats.finished = time.perf_counter()
+        put(output, DONE, stop)
+
+def convert_stage(volume_num, source, output, stop, stats):
+    """Convert each downloaded page to Word and hand the document to the merger"""
+    output_dir = os.path.join(WORD_DIR, f"volume_{volume_num:02d}")
+    boilerplate = BoilerplateFilter("rasailomasail.net")
+    try:
+        while True:
+            page_path = get(source, stop)
+            if page_path is DONE:
+                break
+            start = time.perf_counter()
+            try:
+                word_path = convert_article(page_path, output_dir, boilerplate)
+            except Exception as e:
+                print(f"Error converting {page_path}: {e}")
+                word_path = None
+            stats.busy += time.perf_counter() - start
+            if word_path:
+                stats.items += 1
+                put(output, word_path, stop)
+    finally:
+        stats.finished = time.perf_counter()
+        put(output, DONE, stop)
+        boilerplate.report()
+
+def merge_stage(volume_num, source, stats):
+    """Append each converted article to a new merged volume, then save it with its manifest"""
+    merged_doc, toc_entries = start_volume_document(volume_num)
+    index = DocxIndex()
+    sources = []
+    while True:
+        word_path = source.get()
+        if word_path is DONE:
+            break
+        start = time.perf_counter()
+        number = len(sources) + 1
+        title = get_article_title(index, word_path, number)
+        append_new_article(merged_doc, toc_entries, word_path, number, title)
+        sources.append({"number": number, "path": word_path, "hash": index.hash(word_path), "title": title})
+        stats.items += 1
+        stats.busy += time.perf_counter() - start
+        print(f"Merged article {number}: {os.path.basename(word_path)}")
+
+    start = time.perf_counter()
+    output_file = volume_output_path(volume_num)
+    manifest = load_manifest(volume_num)
+    held = len(manifest["sources"]) if manifest and os.path.exists(output_file) else 0
+    if sources and len(sources) < held:
+        # Some articles did not come through; rather than replace a fuller
+        # volume, add the new and changed articles to the saved one
+        print(f"Only {len(sources)} articles came through but {output_file} holds {held}; updating it instead")
+        index.save()
+        update_volume_document(volume_num)
+    elif sources:
+        merged_doc.save(output_file)
+        save_manifest(volume_num, sources)
+        index.save()
+        mark_merged([s["path"] for s in sources])
+        print(f"Successfully created merged document: {output_file}")
+    else:
+        print("No articles to merge.")
+    stats.busy += time.perf_counter() - start
+    stats.finished = time.perf_counter()
+
+def stream_volume(volume_num=5, queue_size=QUEUE_SIZE):
+    """Crawl, convert and merge a volume with the three stages running at the same time
+
+    Each article moves on as soon as a stage is done with it, so conversion
+    and merging happen while the crawler waits on the network, and the
+    volume is ready shortly after the last article is downloaded.
+    """
+    os.makedirs(os.path.join(ARTICLES_DIR, f"volume_{volume_num:02d}"), exist_ok=True)
+    os.makedirs(os.path.join(WORD_DIR, f"volume_{volume_num:02d}"), exist_ok=True)
+    create_output_dir()
+
+    pages = queue.Queue(maxsize=queue_size)
+    documents = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    stats = {name: StageStats(name) for name in ("crawl", "convert", "merge")}
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=crawl_stage, args=(volume_num, pages, stop, stats["crawl"]),
+                         name="crawl", daemon=True),
+        threading.Thread(target=convert_stage, args=(volume_num, pages, documents, stop, stats["convert"]),
+                         name="convert", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        merge_stage(volume_num, documents, stats["merge"])
+    finally:
+        # Let the other stages exit if merging failed
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{'stage':10}{'articles':>10}{'busy s':>10}{'done at s':>11}")
+    for stage in stats.values():
+        done_at = stage.finished - start if stage.finished else 0.0
+        print(f"{stage.name:10}{stage.items:>10}{stage.busy:>10.1f}{done_at:>11.1f}")
+    sequential = sum(stage.busy for stage in stats.values())
+    crawl_time = stats["crawl"].busy
+    print(f"\nVolume {volume_num} ready in {elapsed:.1f}s: {elapsed - crawl_time:.1f}s after the crawl finished "
+          f"(running the stages one after another would take about {sequential:.1f}s)")
+
+def main():
+    """Download, convert and merge a volume in one streaming pass"""
+    parser = argparse.ArgumentParser(description="Crawl, convert and merge a Rasail-o-Masail volume concurrently")
+    parser.add_argument("--volume", type=int, default=5, help="volume number")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="articles buffered between stages")
+    args = parser.parse_args()
+    stream_volume(args.volume, args.queue_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import re
+import sys
+import time
+import unicodedata
+
+# Arabic-script letter variants mapped to the forms used in Urdu text
+LETTER_MAP = {
+    'ي': 'ی',  # Arabic yeh -> Farsi yeh
+    'ى': 'ی',  # alef maksura -> Farsi yeh
+    'ې': 'ی',  # yeh with two dots below -> Farsi yeh
+    'ك': 'ک',  # Arabic kaf -> keheh
+    'ڪ': 'ک',  # swash kaf -> keheh
+    'ه': 'ہ',  # Arabic heh -> heh goal
+    'ە': 'ہ',  # ae -> heh goal
+    'ۀ': 'ۂ',  # heh with yeh above -> heh goal with hamza
+    'ة': 'ۃ',  # teh marbuta -> teh marbuta goal
+}
+
+# Arabic-Indic digits are written with the Urdu (extended) forms
+DIGIT_MAP = {chr(0x0660 + d): chr(0x06f0 + d) for d in range(10)}
+
+# Invisible characters that never belong in stored text
+REMOVED_CHARS = (
+    '\u0640'  # tatweel
+    '\u200b\u200d\u200e\u200f\ufeff'  # zero-width space, joiner, LRM, RLM, BOM
+    '\u202a\u202b\u202c\u202d\u202e'  # bidi embeddings and overrides
+    '\u2066\u2067\u2068\u2069'  # bidi isolates
+)
+
+# Spaces that are written as a plain space
+SPACE_CHARS = '\u00a0' + ''.join(chr(c) for c in range(0x2000, 0x200b)) + '\u202f\u205f\u3000'
+
+# Diacritics (harakat, Quranic annotation marks, superscript alef) dropped for comparisons
+DIACRITICS = (
+    ''.join(chr(c) for c in range(0x064b, 0x0660))
+    + '\u0670'
+    + ''.join(chr(c) for c in range(0x06d6, 0x06ee) if c not in (0x06e5, 0x06e6))
+)
+
+ZWNJ = '\u200c'
+
+NORMALIZE_MAP = {
+    **LETTER_MAP,
+    **DIGIT_MAP,
+    **{c: '' for c in REMOVED_CHARS},
+    **{c: ' ' for c in SPACE_CHARS},
+}
+
+FOLD_MAP = {
+    **{c: '' for c in DIACRITICS},
+    ZWNJ: '',
+    **{chr(0x06f0 + d): str(d) for d in range(10)},
+    'أ': 'ا',  # alef with hamza above -> alef
+    'إ': 'ا',  # alef with hamza below -> alef
+}
+
+def compile_table(mapping):
+    """Compile a character mapping into the replacement pairs used by translate()"""
+    return tuple(mapping.items())
+
+NORMALIZE_TABLE = compile_table(NORMALIZE_MAP)
+FOLD_TABLE = compile_table(FOLD_MAP)
+
+ZWNJ_RUN_RE = re.compile(ZWNJ + '+')
+
+def translate(text, table):
+    """Apply a compiled table to a text
+
+    str.translate() does a dictionary lookup per character for non-ASCII
+    text, which runs at about 10 MB/s on Urdu. Searching for each mapped
+    character and replacing it is several times faster, since most
+    characters of the table do not occur in a given text at all.
+    """
+    for char, replacement in table:
+        if char in text:
+            text = text.replace(char, replacement)
+    return text
+
+def _is_arabic_letter(char):
+    return '\u0620' <= char <= '\u064a' or '\u066e' <= char <= '\u06d3'
+
+def _fix_zwnj(match):
+    """Keep one ZWNJ between two letters and drop it anywhere else"""
+    text, start, end = match.string, match.start(), match.end()
+    if start and end < len(text) and _is_arabic_letter(text[start - 1]) and _is_arabic_letter(text[end]):
+        return ZWNJ
+    return ''
+
+# Separator used to normalize many short strings with one call
+BATCH_SEPARATOR = '\x00'
+
+def normalize(text):
+    """Return the canonical form of Urdu/Arabic text
+
+    Composed letters are put in NFC form, Arabic letter variants are mapped
+    to their Urdu forms, Arabic-Indic digits to Urdu digits, invisible marks
+    are removed and stray ZWNJs dropped. Diacritics are kept.
+    """
+    if not unicodedata.is_normalized('NFC', text):
+        text = unicodedata.normalize('NFC', text)
+    text = translate(text, NORMALIZE_TABLE)
+    if ZWNJ in text:
+        text = ZWNJ_RUN_RE.sub(_fix_zwnj, text)
+    return text
+
+def fold(text):
+    """Return the comparison key of a text: normalized, without diacritics or ZWNJ, lower-cased"""
+    return translate(normalize(text), FOLD_TABLE).lower()
+
+def normalize_batch(texts):
+    """Normalize many strings at once, returning a list in the same order
+
+    The strings are joined and normalized with a single pass, which avoids
+    the per-call overhead for the many short paragraphs of an article.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    return normalize(BATCH_SEPARATOR.join(texts)).split(BATCH_SEPARATOR)
+
+def fold_batch(texts):
+    """Return the comparison keys of many strings, in the same order"""
+    texts = list(texts)
+    if not texts:
+        return []
+    return fold(BATCH_SEPARATOR.join(texts)).split(BATCH_SEPARATOR)
+
+def benchmark(paths, repeat=3):
+    """Normalize files and print the throughput in MB/s"""
+    texts = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as file:
+            texts.append(file.read())
+    size_mb = sum(len(t.encode('utf-8')) for t in texts) / 1e6
+    if not size_mb:
+        print("Nothing to benchmark.")
+        return
+
+    for label, func in (("normalize", normalize), ("fold", fold)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text in texts:
+                func(text)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{label:10} {size_mb:.1f} MB in {best:.3f}s ({size_mb / best:.1f} MB/s)")
+
+def main():
+    """Normalize text files in place, or benchmark normalization with --bench"""
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: urdu_normalize.py [--bench] FILE ...")
+        return
+
+    if args[0] == "--bench":
+        benchmark(args[1:])
+        return
+
+    start = time.perf_counter()
+    total = changed = 0
+    for path in args:
+        with open(path, 'r', encoding='utf-8') as file:
+            text = file.read()
+        total += len(text.encode('utf-8'))
+        normalized = normalize(text)
+        if normalized != text:
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(normalized)
+            changed += 1
+    elapsed = time.perf_counter() - start
+    print(f"Normalized {changed} of {len(args)} files ({total / 1e6 / max(elapsed, 1e-9):.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import copy
+import time
+import atexit
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from docx import Document
+
+# Imported once by the fork server, so every worker starts with them loaded
+PRELOAD_MODULES = ["bs4", "lxml.etree", "docx", "worker_pool", "articleword", "htmltoword", "merge_documents"]
+
+_pool = None
+_template = None
+
+def pool_context():
+    """Return the forkserver context, or spawn where forkserver is not available (Windows)"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+def new_document():
+    """Return a blank Word document, copied from a template parsed once per process"""
+    global _template
+    if _template is None:
+        _template = Document()
+    return copy.deepcopy(_template)
+
+def _warm_worker():
+    """Parse the document template before the first job arrives"""
+    new_document()
+
+def get_pool(max_workers=None):
+    """Return the shared worker pool, starting it on first use
+
+    The pool lives until the process exits, so successive stages and
+    batches reuse warm workers; max_workers only applies to the first call.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                    mp_context=pool_context(), initializer=_warm_worker)
+        atexit.register(shutdown)
+    return _pool
+
+def shutdown():
+    """Stop the shared pool's workers"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+def _sample_job(i):
+    """Convert a small generated article to Word in memory and return the seconds spent"""
+    import io
+    from bs4 import BeautifulSoup
+
+    start = time.perf_counter()
+    html = "".join(f"<p>پیراگراف {i} - {j}</p>" for j in range(20))
+    doc = new_document()
+    for p in BeautifulSoup(html, 'html.parser').find_all('p'):
+        doc.add_paragraph(p.get_text())
+    doc.save(io.BytesIO())
+    return time.perf_counter() - start
+
+def benchmark(batches=5, jobs=20, workers=None):
+    """Compare a new process pool per batch with the shared warm pool on small conversion jobs"""
+    def run(get_executor, close):
+        start = time.perf_counter()
+        work = 0.0
+        for _ in range(batches):
+            executor = get_executor()
+            futures = [executor.submit(_sample_job, i) for i in range(jobs)]
+            work += sum(future.result() for future in as_completed(futures))
+            close(executor)
+        return time.perf_counter() - start, work
+
+    total_jobs = batches * jobs
+    workers = workers or os.cpu_count()
+    # Fresh spawned workers import bs4, lxml and docx again, as each stage's own pool did
+    spawn = multiprocessing.get_context("spawn")
+    results = [
+        ("new pool per batch", run(lambda: ProcessPoolExecutor(max_workers=workers, mp_context=spawn),
+                                   lambda executor: executor.shutdown())),
+        ("shared warm pool", run(lambda: get_pool(workers), lambda executor: None)),
+    ]
+    print(f"{batches} batches of {jobs} jobs on {workers} workers ({pool_context().get_start_method()} pool)")
+    for name, (elapsed, work) in results:
+        overhead = (elapsed - work / workers) / total_jobs * 1000
+        print(f"  {name:20}{elapsed:>8.2f}s  {elapsed / total_jobs * 1000:>7.1f} ms/job  "
+              f"~{max(overhead, 0):.1f} ms/job overhead")
+
+def main():
+    """Benchmark the shared worker pool"""
+    parser = argparse.ArgumentParser(description="Measure the per-job overhead of the shared worker pool")
+    parser.add_argument("--batches", type=int, default=5, help="batches, each run as one stage would")
+    parser.add_argument("--jobs", type=int, default=20, help="jobs per batch")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    benchmark(args.batches, args.jobs, args.workers)
+
+if __name__ == "__main__":
+    main()
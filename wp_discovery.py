@@ -0,0 +1,312 @@
+import re
+import sys
+import json
+import html
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from urllib.parse import parse_qs, unquote, urlencode, urljoin, urlsplit
+from bs4 import BeautifulSoup
+from retry_policy import LISTING, fetch
+
+# Posts per REST request; 100 is the most WordPress allows
+PER_PAGE = 100
+
+# Only these post fields are sent back by the REST API
+POST_FIELDS = "id,link,title,date"
+
+# Listing path segments whose REST base differs from the segment; custom
+# taxonomies such as rasailomasail.net's volumes use their own name
+TAXONOMY_REST_BASES = {"category": "categories", "tag": "tags"}
+
+# Sitemap indexes of WordPress core and of the Yoast and Rank Math plugins
+SITEMAP_PATHS = ["wp-sitemap.xml", "sitemap_index.xml", "sitemap.xml"]
+
+# Sitemaps of posts, as opposed to pages, terms and authors, in a sitemap index
+POST_SITEMAP_RE = re.compile(r'(posts-post-\d+|post-sitemap\d*)\.xml')
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+def site_root(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+def listing_term(listing_url):
+    """Return (REST base, slug) of the taxonomy term a listing shows, or None for the whole site"""
+    segments = [s for s in urlsplit(listing_url).path.split('/') if s]
+    if len(segments) >= 2 and segments[-2] == 'page' and segments[-1].isdigit():
+        segments = segments[:-2]
+    if not segments:
+        return None
+    return TAXONOMY_REST_BASES.get(segments[0], segments[0]), unquote(segments[-1])
+
+def plain_title(rendered):
+    """Return the text of a rendered post title"""
+    return html.unescape(re.sub(r'<[^>]+>', '', rendered)).strip()
+
+def slug_title(url):
+    """Return a title made from a post URL's slug, for sources that give no title"""
+    return unquote(url.rstrip('/').split('/')[-1]).replace('-', ' ')
+
+def rest_posts(listing_url):
+    """Return [(title, url)] of a listing's posts from the REST API, newest first, or None if it is unavailable
+
+    A listing of n posts takes two requests to look up its taxonomy and term
+    and one per 100 posts, where the rendered listing takes one per 10. No
+    posts at all is taken as the API not being usable either.
+    """
+    api = urljoin(site_root(listing_url), "wp-json/wp/v2/")
+    params = {"per_page": PER_PAGE, "_fields": POST_FIELDS, "orderby": "date", "order": "desc"}
+    try:
+        term = listing_term(listing_url)
+        if term:
+            rest_base, slug = term
+            # WordPress ignores a query parameter it does not know and returns
+            # every post, so the taxonomy must be one registered for posts
+            taxonomies = fetch(f"{api}taxonomies?{urlencode({'type': 'post'})}",
+                               headers=HEADERS, priority=LISTING).json()
+            if rest_base not in {taxonomy.get("rest_base") for taxonomy in taxonomies.values()}:
+                print(f"REST API has no {rest_base} taxonomy for posts")
+                return None
+            terms = fetch(f"{api}{rest_base}?{urlencode({'slug': slug, '_fields': 'id'})}",
+                          headers=HEADERS, priority=LISTING).json()
+            if not terms:
+                print(f"REST API has no {rest_base} term '{slug}'")
+                return None
+            params[rest_base] = terms[0]["id"]
+
+        posts = []
+        page = total_pages = 1
+        while page <= total_pages:
+            params["page"] = page
+            response = fetch(f"{api}posts?{urlencode(params)}", headers=HEADERS, priority=LISTING)
+            total_pages = int(response.headers.get("X-WP-TotalPages", 1))
+            posts.extend((plain_title(post["title"]["rendered"]), post["link"]) for post in response.json())
+            page += 1
+        if not posts:
+            print(f"REST API lists no posts for {listing_url}")
+            return None
+        return posts
+    except Exception as e:
+        print(f"REST API not available for {listing_url}: {e}")
+        return None
+
+def sitemap_urls(sitemap_url):
+    """Return the page URLs of a sitemap, following an index to its post sitemaps"""
+    root = ET.fromstring(fetch(sitemap_url, headers=HEADERS, priority=LISTING).content)
+    locations = [loc.text.strip() for loc in root.iter(SITEMAP_NS + "loc") if loc.text]
+    if root.tag != SITEMAP_NS + "sitemapindex":
+        return locations
+    urls = []
+    for location in locations:
+        if POST_SITEMAP_RE.search(location):
+            urls.extend(sitemap_urls(location))
+    return urls
+
+def sitemap_posts(listing_url, prefix=None):
+    """Return [(title, url)] of the site's posts from its XML sitemap, or None if there is none
+
+    Sitemaps do not say which posts belong to a category, so they are only
+    used for the whole site, or for posts whose URL path starts with prefix.
+    """
+    if listing_term(listing_url) and not prefix:
+        return None
+    for path in SITEMAP_PATHS:
+        try:
+            urls = sitemap_urls(urljoin(site_root(listing_url), path))
+        except Exception:
+            continue
+        if prefix:
+            urls = [url for url in urls if urlsplit(url).path.startswith(prefix)]
+        if not urls:
+            print(f"The sitemap lists no posts for {listing_url}")
+            return None
+        return [(slug_title(url), url) for url in urls]
+    print(f"No sitemap found for {site_root(listing_url)}")
+    return None
+
+def discover_posts(listing_url, prefix=None):
+    """Return [(title, url)] of a WordPress listing's posts through the REST API or the sitemap
+
+    Returns None when neither is available or lists any post, and the
+    crawler pages through the rendered listing as before.
+    """
+    posts = rest_posts(listing_url)
+    if posts is not None:
+        print(f"Found {len(posts)} posts through the REST API")
+        return posts
+    posts = sitemap_posts(listing_url, prefix)
+    if posts is not None:
+        print(f"Found {len(posts)} posts in the sitemap")
+    return posts
+
+def html_posts(listing_url):
+    """Return [(title, url)] of a listing's posts by paging through the rendered listing"""
+    posts = []
+    page_url = listing_url
+    page = 1
+    while True:
+        try:
+            soup = BeautifulSoup(fetch(page_url, headers=HEADERS, priority=LISTING).text, 'html.parser')
+        except Exception:
+            break
+        titles = soup.find_all(['h2', 'h3'], class_=['entry-title', 'blog-entry-title'])
+        links = [t.find('a', href=True) for t in titles]
+        links = [link for link in links if link]
+        if not links:
+            break
+        posts.extend((link.get_text(strip=True), urljoin(page_url, link['href'])) for link in links)
+        page += 1
+        page_url = urljoin(listing_url.rstrip('/') + '/', f"page/{page}/")
+    return posts
+
+def start_standin_server(posts=250, category_posts=230, rest=True, sitemap=True):
+    """Serve a stand-in WordPress site on a local port; returns (server, request counter)
+
+    Posts are numbered newest first. The first category_posts posts are in
+    category 'books', listed 10 per page at /category/books/.
+    """
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                counter["requests"] += 1
+            parts = urlsplit(self.path)
+            query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+            root = f"http://{self.headers['Host']}/"
+            link = lambda n: f"{root}books/book-{n}/"
+            path = parts.path
+
+            match = re.fullmatch(r'/category/books/(?:page/(\d+)/)?', path)
+            if match:
+                page = int(match.group(1) or 1)
+                items = range((page - 1) * 10, min(page * 10, category_posts))
+                if not items:
+                    return self.reply(404, "text/html", "<html><body>Not found</body></html>")
+                body = "".join(f'<article><h3 class="entry-title"><a href="{link(n)}">Book &#8216;{n}&#8217;</a>'
+                               f'</h3></article>' for n in items)
+                return self.reply(200, "text/html", f"<html><body>{body}</body></html>")
+
+            match = re.fullmatch(r'/books/book-(\d+)/', path)
+            if match:
+                return self.reply(200, "text/html", f'<html><body><h1 class="entry-title">Book {match.group(1)}</h1>'
+                                                    f'<div class="entry-content"><p>Text</p></div></body></html>')
+
+            if rest and path == "/wp-json/wp/v2/taxonomies":
+                return self.reply(200, "application/json", json.dumps(
+                    {"category": {"slug": "category", "rest_base": "categories", "types": ["post"]}}))
+            if rest and path == "/wp-json/wp/v2/categories":
+                return self.reply(200, "application/json", json.dumps([{"id": 7}] if query.get("slug") == "books" else []))
+            if rest and path == "/wp-json/wp/v2/posts":
+                count = category_posts if query.get("categories") == "7" else posts
+                per_page = int(query.get("per_page", 10))
+                page = int(query.get("page", 1))
+                items = range((page - 1) * per_page, min(page * per_page, count))
+                body = json.dumps([{"id": n, "link": link(n), "title": {"rendered": f"Book &#8216;{n}&#8217;"}}
+                                   for n in items])
+                total_pages = str(-(-count // per_page))
+                return self.reply(200, "application/json", body, {"X-WP-Total": str(count), "X-WP-TotalPages": total_pages})
+
+            if sitemap and path == "/wp-sitemap.xml":
+                body = "".join(f"<sitemap><loc>{root}wp-sitemap-{name}-1.xml</loc></sitemap>"
+                               for name in ("posts-post", "posts-page", "taxonomies-category"))
+                return self.reply(200, "application/xml", f'<sitemapindex xmlns="{SITEMAP_NS[1:-1]}">{body}</sitemapindex>')
+            if sitemap and path == "/wp-sitemap-posts-post-1.xml":
+                body = "".join(f"<url><loc>{link(n)}</loc></url>" for n in range(posts))
+                return self.reply(200, "application/xml", f'<urlset xmlns="{SITEMAP_NS[1:-1]}">{body}</urlset>')
+            if sitemap and path.startswith("/wp-sitemap-"):
+                return self.reply(200, "application/xml", f'<urlset xmlns="{SITEMAP_NS[1:-1]}"></urlset>')
+
+            self.reply(404, "text/html", "<html><body>Not found</body></html>")
+
+        def reply(self, status, content_type, body, headers=None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+def selftest():
+    """Discover a stand-in site's posts every way and compare the requests each way takes"""
+    rows = []
+    failures = []
+
+    def run(name, function, expected, **server_options):
+        server, counter = start_standin_server(**server_options)
+        root = f"http://127.0.0.1:{server.server_address[1]}/"
+        try:
+            posts = function(root)
+        finally:
+            server.shutdown()
+        urls = [url for _, url in posts] if posts is not None else None
+        if urls != expected(root):
+            failures.append(name)
+        rows.append((name, len(urls) if urls is not None else "-", counter["requests"]))
+        return posts
+
+    category = lambda root: [f"{root}books/book-{n}/" for n in range(230)]
+    site = lambda root: [f"{root}books/book-{n}/" for n in range(250)]
+
+    run("category, HTML pages", lambda root: html_posts(root + "category/books/"), category)
+    posts = run("category, REST API", lambda root: discover_posts(root + "category/books/"), category)
+    if posts and posts[0][0] != "Book ‘0’":
+        failures.append("REST titles")
+    run("site, REST API", lambda root: discover_posts(root), site)
+    run("site, sitemap", lambda root: discover_posts(root), site, rest=False)
+    run("category, no API", lambda root: discover_posts(root + "category/books/"), lambda root: None,
+        rest=False, sitemap=False)
+    run("unknown taxonomy", lambda root: rest_posts(root + "series/books/"), lambda root: None)
+    run("empty category", lambda root: rest_posts(root + "category/books/"), lambda root: None, category_posts=0)
+
+    print(f"\n{'discovery':24}{'posts':>7}{'requests':>10}")
+    for name, count, requests_made in rows:
+        print(f"{name:24}{count:>7}{requests_made:>10}")
+    if failures:
+        print(f"\nFailed: {', '.join(failures)}")
+        sys.exit(1)
+    print("\nAll discovery methods returned the expected posts.")
+
+def main():
+    """Discover the posts of a WordPress listing, or test discovery against a local stand-in site"""
+    parser = argparse.ArgumentParser(description="List the posts of a WordPress site or category")
+    commands = parser.add_subparsers(dest="command", required=True)
+    discover_parser = commands.add_parser("discover", help="list a listing's posts")
+    discover_parser.add_argument("url", help="site or category listing URL")
+    discover_parser.add_argument("--method", choices=["auto", "rest", "sitemap", "html"], default="auto")
+    discover_parser.add_argument("--prefix", help="only sitemap posts whose path starts with this")
+    commands.add_parser("selftest", help="compare discovery methods against a local stand-in site")
+    args = parser.parse_args()
+
+    if args.command == "selftest":
+        selftest()
+        return
+    methods = {"auto": lambda url: discover_posts(url, args.prefix), "rest": rest_posts,
+               "sitemap": lambda url: sitemap_posts(url, args.prefix), "html": html_posts}
+    posts = methods[args.method](args.url)
+    if posts is None:
+        print("Not available; use --method html")
+        return
+    for title, url in posts:
+        print(f"{url}\t{title}")
+
+if __name__ == "__main__":
+    main()